@@ -0,0 +1,157 @@
+"""
+Schedule analytics for SmartExam Scheduler
+Aggregates the dashboards need (room utilization, slot load, student
+exams per day, back-to-back counts, a downsampled convergence curve) are
+computed once per saved schedule and stored next to it, so dashboards
+download a few kilobytes instead of the full schedule and history.
+"""
+
+from collections import Counter
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, Iterable, List, Tuple
+
+# Points kept from the generation history
+CONVERGENCE_POINTS = 200
+
+CONVERGENCE_FIELDS = ('generation', 'best_fitness', 'avg_fitness', 'hard_conflicts', 'soft_conflicts')
+
+
+def downsample(history: List[Dict], points: int = CONVERGENCE_POINTS) -> List[Dict]:
+    """Evenly spaced subset of ``history`` that always keeps the first and last entry"""
+    n = len(history)
+    if n <= points:
+        chosen = range(n)
+    else:
+        chosen = sorted({round(i * (n - 1) / (points - 1)) for i in range(points)})
+    return [{k: history[i][k] for k in CONVERGENCE_FIELDS if k in history[i]} for i in chosen]
+
+
+def room_utilization(entries: List[Dict], rooms: List[Dict], num_slots: int) -> List[Dict]:
+    """Per room: exams held, share of timeslots in use and seat utilization"""
+    by_room: Dict[str, List[Dict]] = {}
+    for entry in entries:
+        by_room.setdefault(entry['room_id'], []).append(entry)
+
+    report = []
+    for room in rooms:
+        held = by_room.get(room['room_id'], [])
+        capacity = room['capacity']
+        seats = [e['enrolled_count'] / capacity for e in held] if capacity else []
+        slots_used = len({e['timeslot_id'] for e in held})
+        report.append({
+            'room_id': room['room_id'],
+            'capacity': capacity,
+            'exams': len(held),
+            'slots_used': slots_used,
+            'slot_occupancy': slots_used / num_slots if num_slots else 0.0,
+            'mean_seat_utilization': sum(seats) / len(seats) if seats else 0.0,
+            'max_seat_utilization': max(seats) if seats else 0.0,
+            'over_capacity': sum(1 for s in seats if s > 1),
+        })
+    return report
+
+
+def slot_load(entries: List[Dict], timeslots: List[Dict]) -> List[Dict]:
+    """Per timeslot: exams, students sitting and rooms in use"""
+    by_slot: Dict[str, List[Dict]] = {}
+    for entry in entries:
+        by_slot.setdefault(entry['timeslot_id'], []).append(entry)
+
+    report = []
+    for slot in timeslots:
+        held = by_slot.get(slot['timeslot_id'], [])
+        report.append({
+            'timeslot_id': slot['timeslot_id'],
+            'day': slot['day'],
+            'time': slot['time'],
+            'exams': len(held),
+            'students': sum(e['enrolled_count'] for e in held),
+            'rooms': len({e['room_id'] for e in held}),
+        })
+    return report
+
+
+def student_load(
+    entries: List[Dict],
+    timeslots: List[Dict],
+    enrollments: Iterable[Tuple[str, str]]
+) -> Dict:
+    """
+    Exams-per-day distribution and back-to-back counts over all students
+    ``enrollments`` are (student_id, course_id) pairs in student order, read
+    in one pass. Back-to-back means two exams on the same day; consecutive
+    means in adjacent timeslots of that day.
+    """
+    order = {slot['timeslot_id']: i for i, slot in enumerate(timeslots)}
+    day_of = {slot['timeslot_id']: slot['day'] for slot in timeslots}
+    slot_of = {e['course_id']: e['timeslot_id'] for e in entries}
+
+    per_day = Counter()
+    students = same_day_students = same_day_pairs = consecutive_pairs = clashes = 0
+    max_per_day = 0
+    for _, rows in groupby(enrollments, key=itemgetter(0)):
+        slots = sorted(
+            (order.get(slot_of[c], -1), slot_of[c]) for _, c in rows if c in slot_of
+        )
+        if not slots:
+            continue
+        students += 1
+        days = Counter(day_of.get(s, s) for _, s in slots)
+        for count in days.values():
+            per_day[count] += 1
+            same_day_pairs += count * (count - 1) // 2
+        max_per_day = max(max_per_day, max(days.values()))
+        same_day_students += any(count > 1 for count in days.values())
+        for (i, a), (j, b) in zip(slots, slots[1:]):
+            if i == j:
+                clashes += 1
+            elif j == i + 1 and day_of.get(a) == day_of.get(b):
+                consecutive_pairs += 1
+
+    return {
+        'students': students,
+        'exams_per_day': {str(k): per_day[k] for k in sorted(per_day)},
+        'max_exams_per_day': max_per_day,
+        'back_to_back': {
+            'students': same_day_students,
+            'same_day_pairs': same_day_pairs,
+            'consecutive_pairs': consecutive_pairs,
+        },
+        'clashing_pairs': clashes,
+    }
+
+
+def schedule_analytics(
+    schedule_data: Dict,
+    rooms: List[Dict],
+    timeslots: List[Dict],
+    enrollments: Iterable[Tuple[str, str]]
+) -> Dict:
+    """All dashboard aggregates of one schedule"""
+    entries = schedule_data.get('schedule', [])
+    history = schedule_data.get('history', [])
+    metrics = schedule_data.get('metrics', {})
+    return {
+        'summary': {
+            'fitness': metrics.get('fitness'),
+            'hard_conflicts': metrics.get('hard_conflicts'),
+            'soft_conflict_score': metrics.get('soft_conflict_score'),
+            'total_exams': len(entries),
+            'generations': len(history),
+            'initial_fitness': history[0]['best_fitness'] if history else None,
+            'final_fitness': history[-1]['best_fitness'] if history else None,
+            'constraints': metrics.get('constraints', {}),
+        },
+        'rooms': room_utilization(entries, rooms, len(timeslots)),
+        'slots': slot_load(entries, timeslots),
+        'students': student_load(entries, timeslots, enrollments),
+        'convergence': downsample(history),
+    }
+
+
+def build_schedule_analytics(db, schedule_data: Dict) -> Dict:
+    """Aggregates of a schedule against the current rooms, timeslots and enrollments"""
+    return schedule_analytics(
+        schedule_data, db.get_all_rooms(), db.get_all_timeslots(), db.iter_enrollments_by_student()
+    )
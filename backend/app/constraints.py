@@ -0,0 +1,603 @@
+"""
+Constraint registry for SmartExam Scheduler
+Every hard or soft constraint is a small class that declares its weight and
+provides two kernels over the integer representation of a CompiledProblem:
+
+- full score: ``violations``/``exam_violations`` on a whole assignment,
+  sharing intermediate arrays through an ``EvaluationContext``
+- delta score: ``delta``/``apply`` for moving one exam, against count
+  tables kept in a ``ConstraintState``; the GA scores offspring close to
+  its current best this way
+
+New constraints are added with ``@register`` and weighted with
+``build_constraints``; constraints with weight 0 cost nothing in the hot loop.
+"""
+
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple, Type
+
+import numpy as np
+
+
+# Default penalty weights (see README "Fitness Function")
+STUDENT_CLASH_PENALTY = 10000
+PROFESSOR_CLASH_PENALTY = 10000
+ROOM_CAPACITY_PENALTY = 5000
+ROOM_DOUBLE_BOOKING_PENALTY = 8000
+ROOM_UNAVAILABLE_PENALTY = 5000
+BACK_TO_BACK_PENALTY = 50
+ROOM_UNDERUSED_PENALTY = 20
+ROOM_OVERCROWDED_PENALTY = 30
+SLOT_OVERUSE_PENALTY = 10
+MAX_EXAMS_PER_DAY_PENALTY = 0
+
+ROOM_UNDERUSED_RATIO = 0.5
+ROOM_OVERCROWDED_RATIO = 0.95
+SLOT_OVERUSE_THRESHOLD = 3
+MAX_EXAMS_PER_DAY = 2
+
+
+def _counts_at(values: np.ndarray, counts: np.ndarray, at: np.ndarray) -> np.ndarray:
+    """``counts`` of the sorted distinct ``values`` looked up for each entry of ``at``"""
+    return counts[np.searchsorted(values, at)]
+
+
+class EvaluationContext:
+    """Intermediate arrays of one assignment, computed once and shared by all kernels"""
+
+    def __init__(self, problem, rooms: np.ndarray, slots: np.ndarray):
+        self.problem = problem
+        self.rooms = rooms
+        self.slots = slots
+        self.keys = problem.slot_key[slots]
+
+    @cached_property
+    def student_slot_bins(self) -> np.ndarray:
+        p = self.problem
+        return p.enroll_student * p.num_keys + self.keys[p.enroll_exam]
+
+    @cached_property
+    def student_slot(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Occupied (student, key) bins and their enrollment counts, sorted over the
+        enrollments rather than histogrammed over every student and key"""
+        return np.unique(self.student_slot_bins, return_counts=True)
+
+    @cached_property
+    def occupied(self) -> np.ndarray:
+        if 'student_slot' in self.__dict__:
+            return self.student_slot[0]
+        return np.unique(self.student_slot_bins)
+
+    @cached_property
+    def occupied_day(self) -> np.ndarray:
+        p = self.problem
+        K = p.num_keys
+        return (self.occupied // K) * p.num_days + p.key_day[self.occupied % K]
+
+    @cached_property
+    def enroll_day(self) -> np.ndarray:
+        p = self.problem
+        return p.enroll_student * p.num_days + p.key_day[self.keys[p.enroll_exam]]
+
+    @cached_property
+    def capacity(self) -> np.ndarray:
+        return self.problem.room_capacity[self.rooms]
+
+    @cached_property
+    def utilization(self) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.problem.exam_size / self.capacity
+
+    @cached_property
+    def usage(self) -> np.ndarray:
+        return np.bincount(self.keys, minlength=self.problem.num_keys)
+
+
+class Constraint:
+    """
+    One weighted constraint
+    ``violations`` is the count multiplied by ``weight``; ``exam_violations``
+    attributes violations to the exams taking part in them. The delta kernel
+    works on the state returned by ``init_state``: ``delta`` is the change
+    in violations if ``exam`` moved to ``(room, slot)``, ``apply`` commits it
+    (called before the assignment arrays are updated).
+    """
+    name = ''
+    hard = False
+    default_weight = 0
+
+    def __init__(self, weight: Optional[float] = None):
+        self.weight = self.default_weight if weight is None else weight
+
+    def applies_to(self, problem) -> bool:
+        return self.weight != 0
+
+    def violations(self, ctx: EvaluationContext) -> int:
+        raise NotImplementedError
+
+    def exam_violations(self, ctx: EvaluationContext) -> np.ndarray:
+        raise NotImplementedError
+
+    def init_state(self, ctx: EvaluationContext):
+        return None
+
+    def delta(self, problem, state, assignment: 'ConstraintState', exam: int, room: int, slot: int) -> int:
+        raise NotImplementedError
+
+    def apply(self, problem, state, assignment: 'ConstraintState', exam: int, room: int, slot: int):
+        pass
+
+
+CONSTRAINT_TYPES: Dict[str, Type[Constraint]] = {}
+
+
+def register(cls: Type[Constraint]) -> Type[Constraint]:
+    """Class decorator adding a constraint to the registry under ``cls.name``"""
+    CONSTRAINT_TYPES[cls.name] = cls
+    return cls
+
+
+def _pair_delta(counts: np.ndarray, old_cell: int, new_cell: int) -> int:
+    """Delta of sum(max(count - 1, 0)) when one item moves between cells"""
+    if old_cell == new_cell:
+        return 0
+    return int(counts[new_cell] >= 1) - int(counts[old_cell] >= 2)
+
+
+@register
+class StudentClash(Constraint):
+    """A student sitting two exams in the same (day, time) slot"""
+    name = 'student_clash'
+    hard = True
+    default_weight = STUDENT_CLASH_PENALTY
+
+    def violations(self, ctx):
+        return ctx.problem.num_enrollments - len(ctx.occupied)
+
+    def exam_violations(self, ctx):
+        p = ctx.problem
+        clashing = _counts_at(*ctx.student_slot, ctx.student_slot_bins) > 1
+        return np.bincount(p.enroll_exam[clashing], minlength=p.num_exams)
+
+    def init_state(self, ctx):
+        # Dense (student, key) table: each move reads a few cells of it
+        p = ctx.problem
+        return np.bincount(ctx.student_slot_bins, minlength=p.num_students * p.num_keys)
+
+    def delta(self, problem, counts, assignment, exam, room, slot):
+        K = problem.num_keys
+        k0, k1 = assignment.keys[exam], problem.slot_key[slot]
+        if k0 == k1:
+            return 0
+        students = problem.students_of(exam) * K
+        return int((counts[students + k1] >= 1).sum()) - int((counts[students + k0] >= 2).sum())
+
+    def apply(self, problem, counts, assignment, exam, room, slot):
+        K = problem.num_keys
+        students = problem.students_of(exam) * K
+        counts[students + assignment.keys[exam]] -= 1
+        counts[students + problem.slot_key[slot]] += 1
+
+
+@register
+class RoomDoubleBooking(Constraint):
+    """Two exams in the same room and slot"""
+    name = 'room_double_booking'
+    hard = True
+    default_weight = ROOM_DOUBLE_BOOKING_PENALTY
+
+    def _cells(self, problem, rooms, keys):
+        return rooms * problem.num_keys + keys
+
+    def violations(self, ctx):
+        return ctx.problem.num_exams - len(np.unique(self._cells(ctx.problem, ctx.rooms, ctx.keys)))
+
+    def exam_violations(self, ctx):
+        _, inverse, counts = np.unique(
+            self._cells(ctx.problem, ctx.rooms, ctx.keys), return_inverse=True, return_counts=True
+        )
+        return (counts[inverse] > 1).astype(np.int64)
+
+    def init_state(self, ctx):
+        p = ctx.problem
+        return np.bincount(self._cells(p, ctx.rooms, ctx.keys), minlength=p.num_rooms * p.num_keys)
+
+    def _move(self, problem, assignment, exam, room, slot):
+        K = problem.num_keys
+        return (assignment.rooms[exam] * K + assignment.keys[exam],
+                room * K + problem.slot_key[slot])
+
+    def delta(self, problem, counts, assignment, exam, room, slot):
+        return _pair_delta(counts, *self._move(problem, assignment, exam, room, slot))
+
+    def apply(self, problem, counts, assignment, exam, room, slot):
+        old, new = self._move(problem, assignment, exam, room, slot)
+        counts[old] -= 1
+        counts[new] += 1
+
+
+@register
+class ProfessorClash(Constraint):
+    """A professor invigilating two exams in the same slot"""
+    name = 'professor_clash'
+    hard = True
+    default_weight = PROFESSOR_CLASH_PENALTY
+
+    def _cells(self, problem, keys):
+        return problem.professor_index * problem.num_keys + keys
+
+    def violations(self, ctx):
+        return ctx.problem.num_exams - len(np.unique(self._cells(ctx.problem, ctx.keys)))
+
+    def exam_violations(self, ctx):
+        _, inverse, counts = np.unique(
+            self._cells(ctx.problem, ctx.keys), return_inverse=True, return_counts=True
+        )
+        return (counts[inverse] > 1).astype(np.int64)
+
+    def init_state(self, ctx):
+        p = ctx.problem
+        return np.bincount(self._cells(p, ctx.keys), minlength=p.num_professors * p.num_keys)
+
+    def _move(self, problem, assignment, exam, slot):
+        base = problem.professor_index[exam] * problem.num_keys
+        return base + assignment.keys[exam], base + problem.slot_key[slot]
+
+    def delta(self, problem, counts, assignment, exam, room, slot):
+        return _pair_delta(counts, *self._move(problem, assignment, exam, slot))
+
+    def apply(self, problem, counts, assignment, exam, room, slot):
+        old, new = self._move(problem, assignment, exam, slot)
+        counts[old] -= 1
+        counts[new] += 1
+
+
+@register
+class RoomCapacity(Constraint):
+    """Exam enrollment larger than its room"""
+    name = 'room_capacity'
+    hard = True
+    default_weight = ROOM_CAPACITY_PENALTY
+
+    def violations(self, ctx):
+        return int(np.count_nonzero(ctx.problem.exam_size > ctx.capacity))
+
+    def exam_violations(self, ctx):
+        return (ctx.problem.exam_size > ctx.capacity).astype(np.int64)
+
+    def delta(self, problem, state, assignment, exam, room, slot):
+        size, capacity = problem.exam_size[exam], problem.room_capacity
+        return int(size > capacity[room]) - int(size > capacity[assignment.rooms[exam]])
+
+
+@register
+class RoomAvailability(Constraint):
+    """Exam placed in a room that is unavailable in that slot"""
+    name = 'room_availability'
+    hard = True
+    default_weight = ROOM_UNAVAILABLE_PENALTY
+
+    def applies_to(self, problem):
+        return self.weight != 0 and problem.room_availability is not None
+
+    def violations(self, ctx):
+        return int(np.count_nonzero(~ctx.problem.room_availability[ctx.rooms, ctx.slots]))
+
+    def exam_violations(self, ctx):
+        return (~ctx.problem.room_availability[ctx.rooms, ctx.slots]).astype(np.int64)
+
+    def delta(self, problem, state, assignment, exam, room, slot):
+        available = problem.room_availability
+        return (int(not available[room, slot])
+                - int(not available[assignment.rooms[exam], assignment.slots[exam]]))
+
+
+@register
+class BackToBack(Constraint):
+    """More than one exam slot on the same day for a student"""
+    name = 'back_to_back'
+    default_weight = BACK_TO_BACK_PENALTY
+
+    def violations(self, ctx):
+        return len(ctx.occupied) - len(np.unique(ctx.occupied_day))
+
+    def exam_violations(self, ctx):
+        p = ctx.problem
+        crowded = _counts_at(*np.unique(ctx.occupied_day, return_counts=True), ctx.enroll_day) > 1
+        return np.bincount(p.enroll_exam[crowded], minlength=p.num_exams)
+
+    def init_state(self, ctx):
+        p = ctx.problem
+        counts = np.bincount(ctx.student_slot_bins, minlength=p.num_students * p.num_keys)
+        distinct = np.bincount(ctx.occupied_day, minlength=p.num_students * p.num_days)
+        return counts, distinct
+
+    def _cells(self, problem, assignment, exam, slot):
+        students = problem.students_of(exam)
+        k0, k1 = assignment.keys[exam], problem.slot_key[slot]
+        K, D = problem.num_keys, problem.num_days
+        return (students * K + k0, students * K + k1,
+                students * D + problem.key_day[k0], students * D + problem.key_day[k1])
+
+    def delta(self, problem, state, assignment, exam, room, slot):
+        counts, distinct = state
+        if assignment.keys[exam] == problem.slot_key[slot]:
+            return 0
+        old_key, new_key, old_day, new_day = self._cells(problem, assignment, exam, slot)
+        # Leaving a slot only frees it when no other exam of the student is there
+        freed = counts[old_key] == 1
+        taken = counts[new_key] == 0
+        remaining = distinct[new_day] - (freed & (old_day == new_day))
+        return int((taken & (remaining >= 1)).sum()) - int((freed & (distinct[old_day] >= 2)).sum())
+
+    def apply(self, problem, state, assignment, exam, room, slot):
+        counts, distinct = state
+        if assignment.keys[exam] == problem.slot_key[slot]:
+            return
+        old_key, new_key, old_day, new_day = self._cells(problem, assignment, exam, slot)
+        distinct[old_day] -= counts[old_key] == 1
+        counts[old_key] -= 1
+        distinct[new_day] += counts[new_key] == 0
+        counts[new_key] += 1
+
+
+class _RoomUtilization(Constraint):
+    """Shared kernels for the per-exam utilization constraints"""
+
+    def _bad(self, utilization):
+        raise NotImplementedError
+
+    def violations(self, ctx):
+        return int(np.count_nonzero(self._bad(ctx.utilization)))
+
+    def exam_violations(self, ctx):
+        return self._bad(ctx.utilization).astype(np.int64)
+
+    def delta(self, problem, state, assignment, exam, room, slot):
+        size, capacity = problem.exam_size[exam], problem.room_capacity
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (int(self._bad(size / capacity[room]))
+                    - int(self._bad(size / capacity[assignment.rooms[exam]])))
+
+
+@register
+class RoomUnderused(_RoomUtilization):
+    """Room less than half full"""
+    name = 'room_underused'
+    default_weight = ROOM_UNDERUSED_PENALTY
+
+    def _bad(self, utilization):
+        return utilization < ROOM_UNDERUSED_RATIO
+
+
+@register
+class RoomOvercrowded(_RoomUtilization):
+    """Room more than 95% full"""
+    name = 'room_overcrowded'
+    default_weight = ROOM_OVERCROWDED_PENALTY
+
+    def _bad(self, utilization):
+        return utilization > ROOM_OVERCROWDED_RATIO
+
+
+@register
+class SlotOveruse(Constraint):
+    """Every exam in a slot holding more than SLOT_OVERUSE_THRESHOLD exams"""
+    name = 'slot_overuse'
+    default_weight = SLOT_OVERUSE_PENALTY
+
+    def violations(self, ctx):
+        usage = ctx.usage
+        return int(usage[usage > SLOT_OVERUSE_THRESHOLD].sum())
+
+    def exam_violations(self, ctx):
+        return (ctx.usage[ctx.keys] > SLOT_OVERUSE_THRESHOLD).astype(np.int64)
+
+    def init_state(self, ctx):
+        return ctx.usage.copy()
+
+    @staticmethod
+    def _cost(usage: int) -> int:
+        return usage if usage > SLOT_OVERUSE_THRESHOLD else 0
+
+    def delta(self, problem, usage, assignment, exam, room, slot):
+        k0, k1 = assignment.keys[exam], problem.slot_key[slot]
+        if k0 == k1:
+            return 0
+        u0, u1 = int(usage[k0]), int(usage[k1])
+        return (self._cost(u0 - 1) - self._cost(u0)) + (self._cost(u1 + 1) - self._cost(u1))
+
+    def apply(self, problem, usage, assignment, exam, room, slot):
+        usage[assignment.keys[exam]] -= 1
+        usage[problem.slot_key[slot]] += 1
+
+
+@register
+class MaxExamsPerDay(Constraint):
+    """Each exam a student sits on a day beyond ``limit`` (off unless weighted)"""
+    name = 'max_exams_per_day'
+    default_weight = MAX_EXAMS_PER_DAY_PENALTY
+
+    def __init__(self, weight: Optional[float] = None, limit: int = MAX_EXAMS_PER_DAY):
+        super().__init__(weight)
+        self.limit = limit
+
+    def violations(self, ctx):
+        _, per_day = np.unique(ctx.enroll_day, return_counts=True)
+        return int(np.maximum(per_day - self.limit, 0).sum())
+
+    def exam_violations(self, ctx):
+        p = ctx.problem
+        over = _counts_at(*np.unique(ctx.enroll_day, return_counts=True), ctx.enroll_day) > self.limit
+        return np.bincount(p.enroll_exam[over], minlength=p.num_exams)
+
+    def init_state(self, ctx):
+        p = ctx.problem
+        return np.bincount(ctx.enroll_day, minlength=p.num_students * p.num_days)
+
+    def _cells(self, problem, assignment, exam, slot):
+        students = problem.students_of(exam) * problem.num_days
+        return (students + problem.key_day[assignment.keys[exam]],
+                students + problem.key_day[problem.slot_key[slot]])
+
+    def delta(self, problem, per_day, assignment, exam, room, slot):
+        key_day = problem.key_day
+        if key_day[assignment.keys[exam]] == key_day[problem.slot_key[slot]]:
+            return 0
+        old_day, new_day = self._cells(problem, assignment, exam, slot)
+        return int((per_day[new_day] >= self.limit).sum()) - int((per_day[old_day] > self.limit).sum())
+
+    def apply(self, problem, per_day, assignment, exam, room, slot):
+        old_day, new_day = self._cells(problem, assignment, exam, slot)
+        per_day[old_day] -= 1
+        per_day[new_day] += 1
+
+
+class ConstraintSet:
+    """The weighted constraints a CompiledProblem is scored against"""
+
+    def __init__(self, constraints: List[Constraint]):
+        self.constraints = constraints
+
+    def active(self, problem) -> List[Constraint]:
+        return [c for c in self.constraints if c.applies_to(problem)]
+
+    def evaluate(self, problem, rooms: np.ndarray, slots: np.ndarray, per_exam: bool = False) -> Tuple:
+        """
+        Score one assignment
+        Returns ``(fitness, hard_conflicts, soft_penalty)`` and, with
+        ``per_exam``, the weighted penalty each exam takes part in.
+        ``hard_conflicts`` counts hard violations, whatever their weights.
+        """
+        ctx = EvaluationContext(problem, rooms, slots)
+        hard_penalty = 0
+        hard_conflicts = 0
+        soft_penalty = 0
+        conflicts = np.zeros(problem.num_exams) if per_exam else None
+        for constraint in self.active(problem):
+            violations = constraint.violations(ctx)
+            if constraint.hard:
+                hard_penalty += constraint.weight * violations
+                hard_conflicts += violations
+            else:
+                soft_penalty += constraint.weight * violations
+            if per_exam:
+                conflicts += constraint.weight * constraint.exam_violations(ctx)
+
+        hard_penalty = int(hard_penalty)
+        soft_penalty = int(soft_penalty)
+        result = (hard_penalty + soft_penalty, int(hard_conflicts), soft_penalty)
+        return result + (conflicts,) if per_exam else result
+
+    def costs(self, problem, rooms: np.ndarray, slots: np.ndarray) -> Dict[str, Dict]:
+        """Violations and penalty reported per constraint"""
+        ctx = EvaluationContext(problem, rooms, slots)
+        report = {}
+        for constraint in self.active(problem):
+            violations = int(constraint.violations(ctx))
+            report[constraint.name] = {
+                'hard': constraint.hard,
+                'weight': constraint.weight,
+                'violations': violations,
+                'penalty': constraint.weight * violations,
+            }
+        return report
+
+    def exam_hard_violations(self, problem, rooms: np.ndarray, slots: np.ndarray) -> np.ndarray:
+        """Unweighted number of hard violations each exam takes part in"""
+        ctx = EvaluationContext(problem, rooms, slots)
+        violations = np.zeros(problem.num_exams, dtype=np.int64)
+        for constraint in self.active(problem):
+            if constraint.hard:
+                violations += constraint.exam_violations(ctx)
+        return violations
+
+
+class ConstraintState:
+    """
+    Incremental scoring of single-exam moves
+    Keeps the assignment, every active constraint's count tables and its
+    violation count, so ``delta`` and ``move`` cost O(students of the exam)
+    instead of a full evaluation
+    """
+
+    def __init__(self, problem, rooms: np.ndarray, slots: np.ndarray):
+        self.problem = problem
+        self.rooms = rooms.copy()
+        self.slots = slots.copy()
+        self.keys = problem.slot_key[self.slots]
+        self.constraints = problem.constraints.active(problem)
+        ctx = EvaluationContext(problem, self.rooms, self.slots)
+        self.states = [c.init_state(ctx) for c in self.constraints]
+        self.violations = [int(c.violations(ctx)) for c in self.constraints]
+
+    def delta(self, exam: int, room: int, slot: int) -> float:
+        """Change in weighted penalty if ``exam`` moved to ``(room, slot)``"""
+        return sum(
+            c.weight * c.delta(self.problem, state, self, exam, room, slot)
+            for c, state in zip(self.constraints, self.states)
+        )
+
+    def move(self, exam: int, room: int, slot: int):
+        """Commit a move"""
+        for i, (c, state) in enumerate(zip(self.constraints, self.states)):
+            self.violations[i] += c.delta(self.problem, state, self, exam, room, slot)
+            c.apply(self.problem, state, self, exam, room, slot)
+        self.rooms[exam] = room
+        self.slots[exam] = slot
+        self.keys[exam] = self.problem.slot_key[slot]
+
+    def scores(self) -> Tuple:
+        """``(fitness, hard_conflicts, soft_penalty)`` as ``ConstraintSet.evaluate`` returns them"""
+        hard_penalty = 0
+        hard_conflicts = 0
+        soft_penalty = 0
+        for constraint, violations in zip(self.constraints, self.violations):
+            if constraint.hard:
+                hard_penalty += constraint.weight * violations
+                hard_conflicts += violations
+            else:
+                soft_penalty += constraint.weight * violations
+        hard_penalty = int(hard_penalty)
+        soft_penalty = int(soft_penalty)
+        return hard_penalty + soft_penalty, int(hard_conflicts), soft_penalty
+
+    def score_nearby(self, rooms: np.ndarray, slots: np.ndarray, max_moves: int) -> Optional[Tuple]:
+        """
+        Scores of an assignment differing from this one in at most ``max_moves``
+        exams, found by moving those exams and back; None when more differ
+        """
+        moved = np.flatnonzero((rooms != self.rooms) | (slots != self.slots))
+        if len(moved) > max_moves:
+            return None
+        moved = moved.tolist()
+        undo = [(exam, self.rooms[exam], self.slots[exam]) for exam in moved]
+        violations = list(self.violations)
+        for exam in moved:
+            self.move(exam, rooms[exam], slots[exam])
+        result = self.scores()
+        # Reverting only needs the count tables; the totals are restored whole
+        for exam, room, slot in reversed(undo):
+            for c, state in zip(self.constraints, self.states):
+                c.apply(self.problem, state, self, exam, room, slot)
+            self.rooms[exam] = room
+            self.slots[exam] = slot
+            self.keys[exam] = self.problem.slot_key[slot]
+        self.violations = violations
+        return result
+
+
+def default_constraints() -> ConstraintSet:
+    """Every registered constraint at its default weight"""
+    return ConstraintSet([cls() for cls in CONSTRAINT_TYPES.values()])
+
+
+def build_constraints(weights: Optional[Dict[str, float]] = None) -> ConstraintSet:
+    """Default constraint set with the given weights overridden by name"""
+    weights = dict(weights or {})
+    unknown = set(weights) - set(CONSTRAINT_TYPES)
+    if unknown:
+        raise ValueError(f"Unknown constraints: {sorted(unknown)}")
+    return ConstraintSet([
+        cls(weights.get(name)) for name, cls in CONSTRAINT_TYPES.items()
+    ])
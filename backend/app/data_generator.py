@@ -3,12 +3,25 @@ Synthetic Data Generator for SmartExam Scheduler
 Generates realistic test data for exam scheduling
 """
 
+import argparse
 import csv
-import random
-from faker import Faker
+from typing import Iterator, List, Optional
+
+import numpy as np
 from pathlib import Path
 
-fake = Faker()
+from .datasets import write_problem_to_database
+from .problem import CompiledProblem
+from .rng import make_seed_sequence, derive_int_seed
+
+
+# Vectorized mode: names are combined from pools of this many first and last names
+NAME_POOL_SIZE = 500
+
+# Students generated per block; keeps the block's (students x courses) key matrix small
+ENROLLMENT_BLOCK_ELEMENTS = 4_000_000
+
+ROOM_CAPACITIES = [30, 40, 50, 60, 80, 100, 120, 150]
 
 
 class DataGenerator:
@@ -19,12 +32,27 @@ class DataGenerator:
         num_students=500,
         num_courses=40,
         num_rooms=10,
-        num_timeslots=15
+        num_timeslots=15,
+        seed: Optional[int] = None,
+        popularity_skew: float = 0.5,
+        cohort_boost: float = 8.0
     ):
         self.num_students = num_students
         self.num_courses = num_courses
         self.num_rooms = num_rooms
         self.num_timeslots = num_timeslots
+        # Vectorized mode only: Zipf exponent of course popularity, and how
+        # much more likely students pick courses of their own program
+        self.popularity_skew = popularity_skew
+        self.cohort_boost = cohort_boost
+        self._name_pool = None
+        self._fake = None
+        
+        # Seeded streams so a dataset can be regenerated exactly
+        self.seed_sequence = make_seed_sequence(seed)
+        self.seed = self.seed_sequence.entropy
+        self.rng = np.random.default_rng(self.seed_sequence)
+        self.faker_seed = derive_int_seed(self.seed_sequence)
         
         # Course subjects for realistic names
         self.subjects = [
@@ -40,18 +68,27 @@ class DataGenerator:
         self.days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
         self.times = ["09:00-12:00", "13:00-16:00", "17:00-20:00"]
     
+    @property
+    def fake(self):
+        """Seeded Faker, imported on first use (loading its locales is slow)"""
+        if self._fake is None:
+            from faker import Faker
+            self._fake = Faker()
+            self._fake.seed_instance(self.faker_seed)
+        return self._fake
+    
     def generate_courses(self) -> list:
         """Generate course data"""
         courses = []
         
         for i in range(1, self.num_courses + 1):
-            subject = random.choice(self.subjects)
-            level = random.choice(self.course_levels)
+            subject = self.subjects[self.rng.integers(len(self.subjects))]
+            level = self.course_levels[self.rng.integers(len(self.course_levels))]
             
             course = {
                 'course_id': f"CS{i:03d}",
                 'course_name': f"{subject} {level}",
-                'professor_id': f"P{random.randint(1, 20):02d}"
+                'professor_id': f"P{self.rng.integers(1, 21):02d}"
             }
             courses.append(course)
         
@@ -64,7 +101,7 @@ class DataGenerator:
         for i in range(1, self.num_students + 1):
             student = {
                 'student_id': f"S{i:04d}",
-                'student_name': fake.name()
+                'student_name': self.fake.name()
             }
             students.append(student)
         
@@ -73,12 +110,11 @@ class DataGenerator:
     def generate_rooms(self) -> list:
         """Generate room data with varying capacities"""
         rooms = []
-        capacities = [30, 40, 50, 60, 80, 100, 120, 150]
         
         for i in range(1, self.num_rooms + 1):
             room = {
                 'room_id': f"Room{i:03d}",
-                'capacity': random.choice(capacities)
+                'capacity': int(self.rng.choice(ROOM_CAPACITIES))
             }
             rooms.append(room)
         
@@ -110,18 +146,124 @@ class DataGenerator:
         
         for student in students:
             # Each student takes 3-5 courses
-            num_courses_enrolled = random.randint(3, 5)
-            selected_courses = random.sample(courses, num_courses_enrolled)
+            num_courses_enrolled = int(self.rng.integers(3, 6))
+            selected_courses = self.rng.choice(
+                len(courses), size=num_courses_enrolled, replace=False
+            )
             
-            for course in selected_courses:
+            for c in selected_courses:
                 enrollment = {
                     'student_id': student['student_id'],
-                    'course_id': course['course_id']
+                    'course_id': courses[c]['course_id']
                 }
                 enrollments.append(enrollment)
         
         return enrollments
     
+    # Vectorized generation: whole columns at once, no per-record dicts
+    
+    def name_pool(self):
+        """First and last name pools, drawn from Faker once on first use"""
+        if self._name_pool is None:
+            self._name_pool = (
+                np.array([self.fake.first_name() for _ in range(NAME_POOL_SIZE)], dtype=object),
+                np.array([self.fake.last_name() for _ in range(NAME_POOL_SIZE)], dtype=object)
+            )
+        return self._name_pool
+    
+    def iter_student_names(self, block: int = 10000) -> Iterator[str]:
+        """Lazily yield ``num_students`` names combined from the pools"""
+        first, last = self.name_pool()
+        for start in range(0, self.num_students, block):
+            size = min(block, self.num_students - start)
+            picks = zip(first[self.rng.integers(len(first), size=size)],
+                        last[self.rng.integers(len(last), size=size)])
+            for a, b in picks:
+                yield f"{a} {b}"
+    
+    def generate_enrollment_arrays(self, course_subject: np.ndarray):
+        """
+        Correlated enrollments as ``(student_index, course_index)`` arrays
+        Every student belongs to a program (one subject) and takes 3-5
+        distinct courses, drawn without replacement with weights
+        proportional to a Zipf course popularity, boosted ``cohort_boost``
+        times for courses of the student's program (Gumbel top-k sampling,
+        a block of students at a time)
+        """
+        C = self.num_courses
+        rank = self.rng.permutation(C)
+        log_weight = (-self.popularity_skew * np.log1p(rank)).astype(np.float32)
+        program = self.rng.integers(len(self.subjects), size=self.num_students)
+        taken = np.minimum(self.rng.integers(3, 6, size=self.num_students), C)
+        K = int(taken.max()) if self.num_students else 0
+        
+        block = max(1, ENROLLMENT_BLOCK_ELEMENTS // max(C, 1))
+        students, courses = [], []
+        for start in range(0, self.num_students, block):
+            stop = min(start + block, self.num_students)
+            # Gumbel noise; the offset keeps log() away from zero
+            uniform = self.rng.random((stop - start, C), dtype=np.float32) + np.finfo(np.float32).tiny
+            keys = log_weight - np.log(-np.log(uniform))
+            keys += np.float32(np.log(self.cohort_boost)) * (
+                course_subject[None, :] == program[start:stop, None]
+            )
+            if K < C:
+                top = np.argpartition(-keys, K - 1, axis=1)[:, :K]
+            else:
+                top = np.broadcast_to(np.arange(C), keys.shape)
+            order = np.argsort(-np.take_along_axis(keys, top, axis=1), axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            keep = np.arange(K)[None, :] < taken[start:stop, None]
+            students.append(np.broadcast_to(np.arange(start, stop)[:, None], top.shape)[keep])
+            courses.append(top[keep])
+        if not students:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(students).astype(np.int64), np.concatenate(courses).astype(np.int64)
+    
+    def generate_problem(self) -> CompiledProblem:
+        """Generate a whole dataset as a CompiledProblem, vectorized"""
+        C, N = self.num_courses, self.num_students
+        course_width = max(3, len(str(C)))
+        student_width = max(4, len(str(N)))
+        num_professors = max(20, C // 2)
+        professor_width = max(2, len(str(num_professors)))
+        
+        subject = self.rng.integers(len(self.subjects), size=C)
+        level = self.rng.integers(len(self.course_levels), size=C)
+        professor = self.rng.integers(1, num_professors + 1, size=C)
+        capacity = self.rng.choice(ROOM_CAPACITIES, size=self.num_rooms)
+        timeslots = self.generate_timeslots()
+        enroll_student, enroll_course = self.generate_enrollment_arrays(subject)
+        
+        return CompiledProblem(
+            exam_ids=[f"CS{i:0{course_width}d}" for i in range(1, C + 1)],
+            exam_names=[
+                f"{self.subjects[s]} {self.course_levels[l]}"
+                for s, l in zip(subject.tolist(), level.tolist())
+            ],
+            professor_ids=[f"P{p:0{professor_width}d}" for p in professor.tolist()],
+            room_ids=[f"Room{i:03d}" for i in range(1, self.num_rooms + 1)],
+            room_capacity=capacity.astype(np.int64),
+            slot_ids=[t['timeslot_id'] for t in timeslots],
+            slot_days=[t['day'] for t in timeslots],
+            slot_times=[t['time'] for t in timeslots],
+            enroll_student=enroll_student,
+            enroll_exam=enroll_course,
+            num_students=N,
+            student_ids=np.array([f"S{i:0{student_width}d}" for i in range(1, N + 1)], dtype=object),
+        )
+    
+    def write_to_database(self, database, clear: bool = True) -> CompiledProblem:
+        """Generate vectorized and stream the rows straight into SQLite, no CSV round-trip"""
+        problem = self.generate_problem()
+        write_problem_to_database(
+            problem, database, clear=clear,
+            student_names=self.iter_student_names(), source='synthetic'
+        )
+        print(f"Generated {problem.num_students} students, {problem.num_exams} courses, "
+              f"{problem.num_enrollments} enrollments (seed {self.seed})")
+        return problem
+    
     def save_to_csv(self, data: list, filename: str, output_dir: str = "data"):
         """Save data to CSV file"""
         output_path = Path(output_dir)
@@ -168,6 +310,7 @@ class DataGenerator:
         print(f"Total Rooms: {len(rooms)}")
         print(f"Total Time Slots: {len(timeslots)}")
         print(f"Total Enrollments: {len(enrollments)}")
+        print(f"Seed: {self.seed}")
         print("="*60 + "\n")
         
         return {
@@ -175,15 +318,36 @@ class DataGenerator:
             'students': students,
             'rooms': rooms,
             'timeslots': timeslots,
-            'enrollments': enrollments
+            'enrollments': enrollments,
+            'seed': self.seed
         }
 
 
-if __name__ == "__main__":
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Generate synthetic exam data")
+    parser.add_argument('--students', type=int, default=500)
+    parser.add_argument('--courses', type=int, default=40)
+    parser.add_argument('--rooms', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--vectorized', action='store_true',
+                        help="vectorized generation with cohorts and popularity skew, "
+                             "loaded straight into the application database")
+    parser.add_argument('--output-dir', default='data')
+    args = parser.parse_args(argv)
+
     generator = DataGenerator(
-        num_students=500,
-        num_courses=40,
-        num_rooms=10,
-        num_timeslots=15
+        num_students=args.students,
+        num_courses=args.courses,
+        num_rooms=args.rooms,
+        num_timeslots=15,
+        seed=args.seed
     )
-    generator.generate_all()
+    if args.vectorized:
+        from .database import db
+        generator.write_to_database(db)
+    else:
+        generator.generate_all(args.output_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,32 +3,106 @@ Database models and operations for SmartExam Scheduler
 Uses SQLite for data persistence
 """
 
+import asyncio
 import sqlite3
 import csv
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
 from pathlib import Path
-from typing import List, Dict
+from typing import Dict, Iterator, List, Optional, Tuple
 import json
+import secrets
+
+from .metrics import db_query_duration, import_duration, import_rows
+
+
+# Tables whose row counts are kept in the metadata table, by statistics key
+COUNTED_TABLES = {
+    'courses': 'total_courses',
+    'students': 'total_students',
+    'rooms': 'total_rooms',
+    'timeslots': 'total_timeslots',
+    'enrollment': 'total_enrollments',
+    'schedules': 'total_schedules',
+}
+REFERENCE_TABLES = [t for t in COUNTED_TABLES if t != 'schedules']
+
+
+def timed_query(method):
+    """Record the latency of a Database method in the metrics registry"""
+    name = method.__name__
+    
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            db_query_duration.observe(time.perf_counter() - start, name)
+    
+    return wrapper
 
 
 class Database:
-    """Handle all database operations"""
+    """
+    Handle all database operations
+    Every thread gets its own connection, so endpoints, background tasks and
+    the async query pool never serialize on one shared connection. WAL mode
+    lets readers proceed while a schedule or an import is being written.
+    Constructing one touches nothing on disk: the file and schema are created
+    on first use, or by ``initialize()`` from the app's startup hook.
+    """
     
     def __init__(self, db_path: str = "database/scheduler.db"):
         self.db_path = db_path
-        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-        self.conn = None
-        self.init_database()
+        self._local = threading.local()
+        self._connections: Dict[threading.Thread, sqlite3.Connection] = {}
+        self._lock = threading.Lock()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._epoch = None
+    
+    def initialize(self):
+        """Create the database file and schema once"""
+        with self._init_lock:
+            if not self._initialized:
+                Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+                self.init_database()
+                self._initialized = True
+    
+    @property
+    def epoch(self) -> str:
+        """Random ID of this database file, part of every HTTP cache validator"""
+        if not self._initialized:
+            self.initialize()
+        return self._epoch
     
     def get_connection(self):
-        """Get database connection"""
-        if not self.conn:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.row_factory = sqlite3.Row
-        return self.conn
+        """Get this thread's database connection, initializing the database on first use"""
+        if not self._initialized:
+            self.initialize()
+        return self._thread_connection()
+    
+    def _thread_connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            with self._lock:
+                # Worker threads come and go; drop the connections of finished ones
+                for thread in [t for t in self._connections if not t.is_alive()]:
+                    self._connections.pop(thread).close()
+                self._connections[threading.current_thread()] = conn
+        return conn
     
     def init_database(self):
         """Initialize database tables"""
-        conn = self.get_connection()
+        conn = self._thread_connection()
         cursor = conn.cursor()
         
         # Courses table
@@ -76,6 +150,23 @@ class Database:
             )
         ''')
         
+        # Slots in which a room cannot be used (room_availability constraint)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS room_unavailability (
+                room_id TEXT NOT NULL,
+                timeslot_id TEXT NOT NULL,
+                PRIMARY KEY (room_id, timeslot_id),
+                FOREIGN KEY (room_id) REFERENCES rooms(room_id),
+                FOREIGN KEY (timeslot_id) REFERENCES timeslots(timeslot_id)
+            )
+        ''')
+        
+        # Student-ordered scans (timetable exports) walk this index
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_enrollment_student
+            ON enrollment (student_id, course_id)
+        ''')
+        
         # Generated schedules table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS schedules (
@@ -85,31 +176,106 @@ class Database:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 fitness REAL,
                 hard_conflicts INTEGER,
-                soft_conflicts INTEGER
+                soft_conflicts INTEGER,
+                seed TEXT
+            )
+        ''')
+        
+        # Dashboard aggregates, computed once per saved schedule
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schedule_analytics (
+                schedule_id INTEGER PRIMARY KEY,
+                analytics TEXT NOT NULL,
+                FOREIGN KEY (schedule_id) REFERENCES schedules(id)
             )
         ''')
         
+        # Databases created before runs were seeded lack the seed column
+        columns = {row['name'] for row in cursor.execute('PRAGMA table_info(schedules)')}
+        if 'seed' not in columns:
+            cursor.execute('ALTER TABLE schedules ADD COLUMN seed TEXT')
+        
+        # Key/value bookkeeping: a random epoch per database file, a version
+        # bumped whenever the reference data changes (HTTP cache validators)
+        # and the row count of every table (statistics without COUNT(*) scans)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS metadata (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+        ''')
+        cursor.executemany(
+            'INSERT OR IGNORE INTO metadata (key, value) VALUES (?, ?)',
+            [('epoch', secrets.token_hex(4)), ('data_version', '0'), ('data_modified', str(time.time()))]
+        )
+        self._epoch = cursor.execute("SELECT value FROM metadata WHERE key = 'epoch'").fetchone()[0]
+        
+        # Recount once per start, in case the file was edited outside the app
+        self.refresh_row_counts(cursor, COUNTED_TABLES)
+        
         conn.commit()
         print("Database initialized successfully")
     
+    def refresh_row_counts(self, cursor, tables: List[str]):
+        """Store the row counts of ``tables`` inside the caller's transaction"""
+        for table in tables:
+            cursor.execute(
+                "INSERT OR REPLACE INTO metadata (key, value) "
+                f"VALUES (?, (SELECT COUNT(*) FROM {table}))",
+                (f'rows.{table}',)
+            )
+    
+    def mark_data_changed(self, cursor):
+        """
+        Record a reference data change inside the caller's write transaction
+        Bumps the data version and recounts the reference tables: one count
+        per import instead of six per statistics request, and cheaper than
+        per-row triggers, which slow bulk loads and clears down noticeably
+        """
+        self.refresh_row_counts(cursor, REFERENCE_TABLES)
+        cursor.execute(
+            "UPDATE metadata SET value = CAST(value AS INTEGER) + 1 WHERE key = 'data_version'"
+        )
+        cursor.execute(
+            "UPDATE metadata SET value = ? WHERE key = 'data_modified'", (str(time.time()),)
+        )
+    
+    @timed_query
+    def get_data_version(self) -> Tuple[int, float]:
+        """Current reference data version and the time it last changed"""
+        rows = dict(self.get_connection().execute(
+            "SELECT key, value FROM metadata WHERE key IN ('data_version', 'data_modified')"
+        ).fetchall())
+        return int(rows['data_version']), float(rows['data_modified'])
+    
+    @timed_query
     def clear_all_data(self):
         """Clear all data from tables"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        tables = ['enrollment', 'courses', 'students', 'rooms', 'timeslots']
+        tables = ['enrollment', 'room_unavailability', 'courses', 'students', 'rooms', 'timeslots']
         for table in tables:
             cursor.execute(f'DELETE FROM {table}')
+        self.mark_data_changed(cursor)
         
         conn.commit()
         print("All data cleared from database")
     
+    @timed_query
     def import_csv_data(self, csv_dir: str = "data"):
-        """Import data from CSV files into database"""
+        """
+        Import data from CSV files into database
+        ``room_unavailability.csv`` (room_id, timeslot_id) is optional
+        """
+        start = time.perf_counter()
         conn = self.get_connection()
         cursor = conn.cursor()
         
         csv_path = Path(csv_dir)
+        imported = dict.fromkeys(
+            ['courses', 'students', 'rooms', 'timeslots', 'enrollment'], 0
+        )
         
         # Import courses
         with open(csv_path / 'courses.csv', 'r', encoding='utf-8') as f:
@@ -119,6 +285,7 @@ class Database:
                     INSERT OR REPLACE INTO courses (course_id, course_name, professor_id)
                     VALUES (?, ?, ?)
                 ''', (row['course_id'], row['course_name'], row['professor_id']))
+                imported['courses'] += 1
         
         # Import students
         with open(csv_path / 'students.csv', 'r', encoding='utf-8') as f:
@@ -128,6 +295,7 @@ class Database:
                     INSERT OR REPLACE INTO students (student_id, student_name)
                     VALUES (?, ?)
                 ''', (row['student_id'], row['student_name']))
+                imported['students'] += 1
         
         # Import rooms
         with open(csv_path / 'rooms.csv', 'r', encoding='utf-8') as f:
@@ -137,6 +305,7 @@ class Database:
                     INSERT OR REPLACE INTO rooms (room_id, capacity)
                     VALUES (?, ?)
                 ''', (row['room_id'], int(row['capacity'])))
+                imported['rooms'] += 1
         
         # Import timeslots
         with open(csv_path / 'timeslots.csv', 'r', encoding='utf-8') as f:
@@ -146,6 +315,7 @@ class Database:
                     INSERT OR REPLACE INTO timeslots (timeslot_id, day, time)
                     VALUES (?, ?, ?)
                 ''', (row['timeslot_id'], row['day'], row['time']))
+                imported['timeslots'] += 1
         
         # Import enrollments
         with open(csv_path / 'enrollment.csv', 'r', encoding='utf-8') as f:
@@ -155,10 +325,28 @@ class Database:
                     INSERT INTO enrollment (student_id, course_id)
                     VALUES (?, ?)
                 ''', (row['student_id'], row['course_id']))
+                imported['enrollment'] += 1
+        
+        # Import room unavailability, when provided
+        if (csv_path / 'room_unavailability.csv').exists():
+            imported['room_unavailability'] = 0
+            with open(csv_path / 'room_unavailability.csv', 'r', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                for row in reader:
+                    cursor.execute('''
+                        INSERT OR IGNORE INTO room_unavailability (room_id, timeslot_id)
+                        VALUES (?, ?)
+                    ''', (row['room_id'], row['timeslot_id']))
+                    imported['room_unavailability'] += 1
         
+        self.mark_data_changed(cursor)
         conn.commit()
+        for table, count in imported.items():
+            import_rows.inc(count, table)
+        import_duration.observe(time.perf_counter() - start, 'csv')
         print("CSV data imported successfully")
     
+    @timed_query
     def get_all_courses(self) -> List[Dict]:
         """Get all courses"""
         conn = self.get_connection()
@@ -166,6 +354,7 @@ class Database:
         cursor.execute('SELECT * FROM courses')
         return [dict(row) for row in cursor.fetchall()]
     
+    @timed_query
     def get_all_students(self) -> List[Dict]:
         """Get all students"""
         conn = self.get_connection()
@@ -173,6 +362,7 @@ class Database:
         cursor.execute('SELECT * FROM students')
         return [dict(row) for row in cursor.fetchall()]
     
+    @timed_query
     def get_all_rooms(self) -> List[Dict]:
         """Get all rooms"""
         conn = self.get_connection()
@@ -180,6 +370,7 @@ class Database:
         cursor.execute('SELECT * FROM rooms')
         return [dict(row) for row in cursor.fetchall()]
     
+    @timed_query
     def get_all_timeslots(self) -> List[Dict]:
         """Get all timeslots"""
         conn = self.get_connection()
@@ -187,6 +378,15 @@ class Database:
         cursor.execute('SELECT * FROM timeslots')
         return [dict(row) for row in cursor.fetchall()]
     
+    @timed_query
+    def get_room_unavailability(self) -> List[Tuple[str, str]]:
+        """(room_id, timeslot_id) pairs in which the room cannot be used"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT room_id, timeslot_id FROM room_unavailability')
+        return [tuple(row) for row in cursor.fetchall()]
+    
+    @timed_query
     def get_enrollments_by_course(self, course_id: str) -> List[str]:
         """Get all student IDs enrolled in a specific course"""
         conn = self.get_connection()
@@ -197,6 +397,7 @@ class Database:
         ''', (course_id,))
         return [row['student_id'] for row in cursor.fetchall()]
     
+    @timed_query
     def get_all_enrollments(self) -> List[Dict]:
         """Get all enrollments"""
         conn = self.get_connection()
@@ -204,6 +405,32 @@ class Database:
         cursor.execute('SELECT * FROM enrollment')
         return [dict(row) for row in cursor.fetchall()]
     
+    @timed_query
+    def get_enrollment_pairs(self) -> List[Tuple[str, str]]:
+        """All enrollments as (student_id, course_id) tuples"""
+        conn = self.get_connection()
+        cursor = conn.execute('SELECT student_id, course_id FROM enrollment')
+        return [tuple(row) for row in cursor]
+    
+    def iter_enrollments_by_student(self) -> Iterator[Tuple[str, str]]:
+        """
+        Stream (student_id, course_id) pairs in student order without loading them all
+        The generator owns its connection, closed when it finishes or is
+        closed, so its cursor never shares a thread's connection
+        """
+        if not self._initialized:
+            self.initialize()
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        try:
+            cursor = conn.execute(
+                'SELECT student_id, course_id FROM enrollment ORDER BY student_id, course_id'
+            )
+            for row in cursor:
+                yield row[0], row[1]
+        finally:
+            conn.close()
+    
+    @timed_query
     def save_schedule(self, schedule_name: str, schedule_data: Dict):
         """Save generated schedule to database"""
         conn = self.get_connection()
@@ -214,27 +441,32 @@ class Database:
         cursor.execute('''
             INSERT INTO schedules (
                 schedule_name, schedule_data, fitness, 
-                hard_conflicts, soft_conflicts
+                hard_conflicts, soft_conflicts, seed
             )
-            VALUES (?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?)
         ''', (
             schedule_name,
             json.dumps(schedule_data),
             metrics.get('fitness', 0),
             metrics.get('hard_conflicts', 0),
-            metrics.get('soft_conflict_score', 0)
+            metrics.get('soft_conflict_score', 0),
+            schedule_data.get('seed')
         ))
+        cursor.execute(
+            "UPDATE metadata SET value = CAST(value AS INTEGER) + 1 WHERE key = 'rows.schedules'"
+        )
         
         conn.commit()
         return cursor.lastrowid
     
+    @timed_query
     def get_latest_schedule(self) -> Dict:
         """Get the most recently generated schedule"""
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('''
             SELECT * FROM schedules
-            ORDER BY created_at DESC
+            ORDER BY created_at DESC, id DESC
             LIMIT 1
         ''')
         
@@ -245,18 +477,20 @@ class Database:
             return schedule
         return None
     
+    @timed_query
     def get_all_schedules(self) -> List[Dict]:
         """Get all saved schedules"""
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('''
             SELECT id, schedule_name, created_at, fitness, 
-                   hard_conflicts, soft_conflicts
+                   hard_conflicts, soft_conflicts, seed
             FROM schedules
-            ORDER BY created_at DESC
+            ORDER BY created_at DESC, id DESC
         ''')
         return [dict(row) for row in cursor.fetchall()]
     
+    @timed_query
     def get_schedule_by_id(self, schedule_id: int) -> Dict:
         """Get a specific schedule by ID"""
         conn = self.get_connection()
@@ -273,38 +507,121 @@ class Database:
             return schedule
         return None
     
+    @timed_query
+    def get_schedule_row(self, schedule_id: int) -> Optional[Dict]:
+        """A schedule with ``schedule_data`` left as the stored JSON text, or None"""
+        conn = self.get_connection()
+        row = conn.execute('SELECT * FROM schedules WHERE id = ?', (schedule_id,)).fetchone()
+        return dict(row) if row else None
+    
+    @timed_query
+    def get_latest_schedule_id(self) -> Optional[int]:
+        """ID of the most recently generated schedule, or None"""
+        conn = self.get_connection()
+        row = conn.execute(
+            'SELECT id FROM schedules ORDER BY created_at DESC, id DESC LIMIT 1'
+        ).fetchone()
+        return row['id'] if row else None
+    
+    @timed_query
+    def save_schedule_analytics(self, schedule_id: int, analytics: Dict) -> str:
+        """Store the aggregates of a schedule; returns them as JSON text"""
+        text = json.dumps(analytics)
+        conn = self.get_connection()
+        conn.execute(
+            'INSERT OR REPLACE INTO schedule_analytics (schedule_id, analytics) VALUES (?, ?)',
+            (schedule_id, text)
+        )
+        conn.commit()
+        return text
+    
+    @timed_query
+    def get_schedule_analytics(self, schedule_id: int) -> Optional[str]:
+        """Stored aggregates of a schedule as JSON text, or None"""
+        conn = self.get_connection()
+        row = conn.execute(
+            'SELECT analytics FROM schedule_analytics WHERE schedule_id = ?', (schedule_id,)
+        ).fetchone()
+        return row['analytics'] if row else None
+    
+    @timed_query
     def get_statistics(self) -> Dict:
-        """Get database statistics"""
+        """Get database statistics from the maintained row counts"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        stats = {}
-        
-        cursor.execute('SELECT COUNT(*) as count FROM courses')
-        stats['total_courses'] = cursor.fetchone()['count']
-        
-        cursor.execute('SELECT COUNT(*) as count FROM students')
-        stats['total_students'] = cursor.fetchone()['count']
-        
-        cursor.execute('SELECT COUNT(*) as count FROM rooms')
-        stats['total_rooms'] = cursor.fetchone()['count']
-        
-        cursor.execute('SELECT COUNT(*) as count FROM timeslots')
-        stats['total_timeslots'] = cursor.fetchone()['count']
-        
-        cursor.execute('SELECT COUNT(*) as count FROM enrollment')
-        stats['total_enrollments'] = cursor.fetchone()['count']
-        
-        cursor.execute('SELECT COUNT(*) as count FROM schedules')
-        stats['total_schedules'] = cursor.fetchone()['count']
-        
-        return stats
+        counts = dict(conn.execute(
+            "SELECT key, value FROM metadata WHERE key LIKE 'rows.%'"
+        ).fetchall())
+        return {
+            stat: int(counts.get(f'rows.{table}', 0))
+            for table, stat in COUNTED_TABLES.items()
+        }
     
     def close(self):
-        """Close database connection"""
-        if self.conn:
-            self.conn.close()
+        """Close every thread's database connection"""
+        with self._lock:
+            for conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+class AsyncDatabase:
+    """
+    Awaitable access to a Database for async endpoints
+    Calls run on a small dedicated thread pool, so a slow query (or building
+    a large response) never stalls the event loop:
+    
+        courses = await adb.get_all_courses()
+        response = await adb.run(JSONResponse, payload)
+    """
+    
+    def __init__(self, database: Database, max_workers: Optional[int] = None):
+        self.database = database
+        # Workers beyond the cores only fight the event loop for the GIL
+        if max_workers is None:
+            max_workers = min(4, (os.cpu_count() or 1) + 1)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='db')
+    
+    async def run(self, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` on the query pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(fn, *args, **kwargs))
+    
+    async def iterate(self, fn, *args, **kwargs):
+        """
+        Async iterator over the items of ``fn(*args, **kwargs)``, a sync iterator
+        The iterator is created, advanced and closed on one dedicated
+        thread, so a cursor it opens is only ever used where it was opened
+        (the shared pool would hand successive steps to different threads)
+        """
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-stream')
+        done = object()
+        iterator = None
+        try:
+            iterator = await loop.run_in_executor(executor, partial(fn, *args, **kwargs))
+            while True:
+                item = await loop.run_in_executor(executor, next, iterator, done)
+                if item is done:
+                    break
+                yield item
+        finally:
+            if hasattr(iterator, 'close'):
+                await loop.run_in_executor(executor, iterator.close)
+            executor.shutdown(wait=False)
+    
+    def __getattr__(self, name):
+        method = getattr(self.database, name)
+        if not callable(method):
+            return method
+        
+        @wraps(method)
+        async def call(*args, **kwargs):
+            return await self.run(method, *args, **kwargs)
+        
+        return call
 
 
-# Singleton instance
+# Singleton instances; nothing is opened until first use
 db = Database()
+adb = AsyncDatabase(db)
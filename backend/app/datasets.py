@@ -0,0 +1,276 @@
+"""
+Dataset loaders for SmartExam Scheduler
+Streams the standard exam timetabling formats (Toronto, ITC2007) and the
+application database straight into a CompiledProblem, optionally copying a
+loaded benchmark into the SQLite tables
+"""
+
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .metrics import import_duration, import_rows
+from .problem import CompiledProblem
+
+
+# Number of periods used in the literature for the Toronto instances
+TORONTO_PERIODS = {
+    'car-f-92': 32, 'car-s-91': 35, 'ear-f-83': 24, 'hec-s-92': 18,
+    'kfu-s-93': 20, 'lse-f-91': 18, 'pur-s-93': 42, 'rye-s-93': 23,
+    'sta-f-83': 13, 'tre-s-92': 23, 'uta-s-92': 35, 'ute-s-92': 10,
+    'yor-f-83': 21,
+}
+
+INSERT_BATCH_SIZE = 10000
+
+
+def _normalize_exam_id(token: str) -> str:
+    """Toronto files zero-pad exam IDs inconsistently between .crs and .stu"""
+    return token.lstrip('0') or '0'
+
+
+def load_toronto(crs_path, num_periods: Optional[int] = None) -> CompiledProblem:
+    """
+    Stream a Toronto instance (``name.crs`` + ``name.stu``)
+    Each ``.stu`` line is one student's exams; enrollments are appended to
+    flat integer buffers as the file is read. Toronto is uncapacitated, so
+    every exam gets its own room sized to the largest exam.
+    """
+    crs_path = Path(crs_path)
+    num_periods = num_periods or TORONTO_PERIODS.get(crs_path.stem, 20)
+
+    exam_index: Dict[str, int] = {}
+    with open(crs_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.split()
+            if parts:
+                exam_index.setdefault(_normalize_exam_id(parts[0]), len(exam_index))
+
+    enroll_student = array('q')
+    enroll_exam = array('q')
+    num_students = 0
+    with open(crs_path.with_suffix('.stu'), 'r', encoding='utf-8') as f:
+        for line in f:
+            tokens = line.split()
+            if not tokens:
+                continue
+            for exam_id in dict.fromkeys(_normalize_exam_id(t) for t in tokens):
+                enroll_student.append(num_students)
+                enroll_exam.append(exam_index.setdefault(exam_id, len(exam_index)))
+            num_students += 1
+
+    exam_ids = list(exam_index)
+    exam_size = np.bincount(np.frombuffer(enroll_exam, dtype=np.int64), minlength=len(exam_ids))
+    largest = int(exam_size.max()) if len(exam_size) else 1
+
+    return CompiledProblem(
+        exam_ids=exam_ids,
+        exam_names=[f"Exam {e}" for e in exam_ids],
+        professor_ids=[""] * len(exam_ids),
+        room_ids=[f"R{i}" for i in range(len(exam_ids))],
+        room_capacity=np.full(len(exam_ids), largest, dtype=np.int64),
+        slot_ids=[f"P{p}" for p in range(num_periods)],
+        slot_days=[f"Period{p}" for p in range(num_periods)],
+        slot_times=[""] * num_periods,
+        enroll_student=np.frombuffer(enroll_student, dtype=np.int64),
+        enroll_exam=np.frombuffer(enroll_exam, dtype=np.int64),
+        num_students=num_students,
+    )
+
+
+def load_itc2007(path) -> CompiledProblem:
+    """
+    Stream an ITC2007 examination track file (``*.exam``)
+    Exams, periods and rooms are taken over; durations, period/room
+    penalties and the hard-constraint sections are not part of this model
+    and are skipped.
+    """
+    path = Path(path)
+    enroll_student = array('q')
+    enroll_exam = array('q')
+    num_exams = 0
+    slot_days: List[str] = []
+    slot_times: List[str] = []
+    capacities: List[int] = []
+    section = None
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for raw in f:
+            line = raw.strip()
+            if not line:
+                continue
+            if line.startswith('['):
+                section = line[1:].split(':')[0].split(']')[0]
+                continue
+            fields = line.split(',')
+            if section == 'Exams':
+                for token in fields[1:]:
+                    token = token.strip()
+                    if token:
+                        enroll_student.append(int(token))
+                        enroll_exam.append(num_exams)
+                num_exams += 1
+            elif section == 'Periods':
+                slot_days.append(fields[0].strip())
+                slot_times.append(fields[1].strip())
+            elif section == 'Rooms':
+                capacities.append(int(fields[0]))
+
+    # Compress the raw student numbers into a dense 0..N-1 index
+    student_ids, student_index = np.unique(
+        np.frombuffer(enroll_student, dtype=np.int64), return_inverse=True
+    )
+    exam_ids = [str(i) for i in range(num_exams)]
+
+    return CompiledProblem(
+        exam_ids=exam_ids,
+        exam_names=[f"Exam {e}" for e in exam_ids],
+        professor_ids=[""] * num_exams,
+        room_ids=[f"R{i}" for i in range(len(capacities))],
+        room_capacity=np.array(capacities, dtype=np.int64),
+        slot_ids=[f"P{p}" for p in range(len(slot_days))],
+        slot_days=slot_days,
+        slot_times=slot_times,
+        enroll_student=student_index,
+        enroll_exam=np.frombuffer(enroll_exam, dtype=np.int64),
+        num_students=len(student_ids),
+        student_ids=student_ids,
+    )
+
+
+def load_benchmark(path) -> CompiledProblem:
+    """Load a Toronto (``.crs``) or ITC2007 (``.exam``) file by extension"""
+    path = Path(path)
+    if path.suffix == '.crs':
+        return load_toronto(path)
+    if path.suffix == '.exam':
+        return load_itc2007(path)
+    raise ValueError(f"Unknown benchmark format: {path}")
+
+
+def write_problem_to_database(
+    problem: CompiledProblem,
+    database,
+    clear: bool = True,
+    student_names: Optional[Iterable[str]] = None,
+    source: str = 'benchmark'
+):
+    """
+    Copy a compiled problem into the SQLite tables with streamed inserts
+    ``student_names`` (one per student, in index order) defaults to the IDs
+    """
+    start = time.perf_counter()
+    if clear:
+        database.clear_all_data()
+    conn = database.get_connection()
+    cursor = conn.cursor()
+
+    cursor.executemany(
+        'INSERT OR REPLACE INTO courses (course_id, course_name, professor_id) VALUES (?, ?, ?)',
+        zip(problem.exam_ids, problem.exam_names, problem.professor_ids)
+    )
+    cursor.executemany(
+        'INSERT OR REPLACE INTO rooms (room_id, capacity) VALUES (?, ?)',
+        zip(problem.room_ids, problem.room_capacity.tolist())
+    )
+    cursor.executemany(
+        'INSERT OR REPLACE INTO timeslots (timeslot_id, day, time) VALUES (?, ?, ?)',
+        zip(problem.slot_ids, problem.slot_days, problem.slot_times)
+    )
+    # executemany consumes the generators lazily, so rows are never all in memory
+    student_ids = map(problem.student_id, range(problem.num_students))
+    if student_names is None:
+        student_names = map(problem.student_id, range(problem.num_students))
+    cursor.executemany(
+        'INSERT OR REPLACE INTO students (student_id, student_name) VALUES (?, ?)',
+        zip(student_ids, student_names)
+    )
+    for offset in range(0, problem.num_enrollments, INSERT_BATCH_SIZE):
+        students = problem.enroll_student[offset:offset + INSERT_BATCH_SIZE].tolist()
+        exams = problem.enroll_exam[offset:offset + INSERT_BATCH_SIZE].tolist()
+        cursor.executemany(
+            'INSERT INTO enrollment (student_id, course_id) VALUES (?, ?)',
+            ((problem.student_id(s), problem.exam_ids[e]) for s, e in zip(students, exams))
+        )
+    if problem.room_availability is not None:
+        rooms, slots = np.nonzero(~problem.room_availability)
+        cursor.executemany(
+            'INSERT OR IGNORE INTO room_unavailability (room_id, timeslot_id) VALUES (?, ?)',
+            ((problem.room_ids[r], problem.slot_ids[s]) for r, s in zip(rooms.tolist(), slots.tolist()))
+        )
+
+    database.mark_data_changed(cursor)
+    conn.commit()
+    import_rows.inc(problem.num_exams, 'courses')
+    import_rows.inc(problem.num_rooms, 'rooms')
+    import_rows.inc(problem.num_slots, 'timeslots')
+    import_rows.inc(problem.num_students, 'students')
+    import_rows.inc(problem.num_enrollments, 'enrollment')
+    import_duration.observe(time.perf_counter() - start, source)
+    print(f"Imported {problem.num_exams} exams and {problem.num_enrollments} enrollments")
+
+
+def load_problem_from_database(database) -> CompiledProblem:
+    """
+    Compile the problem stored in the application database
+    Enrollments are read with a single streaming cursor instead of one
+    query per course
+    """
+    courses = database.get_all_courses()
+    rooms = database.get_all_rooms()
+    timeslots = database.get_all_timeslots()
+
+    # Rooms x timeslots, only when some room is unavailable somewhere
+    room_availability = None
+    unavailable = database.get_room_unavailability()
+    if unavailable:
+        room_index = {r['room_id']: i for i, r in enumerate(rooms)}
+        slot_index = {t['timeslot_id']: i for i, t in enumerate(timeslots)}
+        room_availability = np.ones((len(rooms), len(timeslots)), dtype=bool)
+        for room_id, timeslot_id in unavailable:
+            if room_id in room_index and timeslot_id in slot_index:
+                room_availability[room_index[room_id], slot_index[timeslot_id]] = False
+
+    exam_index = {c['course_id']: i for i, c in enumerate(courses)}
+    student_index: Dict[str, int] = {}
+    enroll_student = array('q')
+    enroll_exam = array('q')
+
+    cursor = database.get_connection().cursor()
+    cursor.execute('SELECT student_id, course_id FROM enrollment ORDER BY id')
+    for student_id, course_id in cursor:
+        exam = exam_index.get(course_id)
+        if exam is None:
+            continue
+        enroll_student.append(student_index.setdefault(student_id, len(student_index)))
+        enroll_exam.append(exam)
+
+    return CompiledProblem(
+        exam_ids=[c['course_id'] for c in courses],
+        exam_names=[c['course_name'] for c in courses],
+        professor_ids=[c['professor_id'] for c in courses],
+        room_ids=[r['room_id'] for r in rooms],
+        room_capacity=np.array([r['capacity'] for r in rooms], dtype=np.int64),
+        slot_ids=[t['timeslot_id'] for t in timeslots],
+        slot_days=[t['day'] for t in timeslots],
+        slot_times=[t['time'] for t in timeslots],
+        enroll_student=np.frombuffer(enroll_student, dtype=np.int64),
+        enroll_exam=np.frombuffer(enroll_exam, dtype=np.int64),
+        num_students=len(student_index),
+        student_ids=np.array(list(student_index), dtype=object),
+        room_availability=room_availability,
+    )
+
+
+if __name__ == "__main__":
+    import sys
+    from .database import db
+
+    problem = load_benchmark(sys.argv[1])
+    print(f"{problem.num_exams} exams, {problem.num_students} students, "
+          f"{problem.num_enrollments} enrollments, {problem.num_slots} periods")
+    if '--to-db' in sys.argv:
+        write_problem_to_database(problem, db)
@@ -0,0 +1,340 @@
+"""
+Conflict-graph decomposition for SmartExam Scheduler
+Splits the exam conflict graph into connected components and low-cut
+clusters, solves the clusters concurrently in a process pool under disjoint
+room budgets, then merges them and repairs the combined schedule
+"""
+
+import contextlib
+import heapq
+import io
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .genetic_algorithm import GeneticAlgorithm, Timetable
+from .problem import CompiledProblem
+from .rng import make_seed_sequence
+from .warm_start import WarmStart
+
+
+CLUSTER_ENGINES = ('ga', 'exact')
+
+# Default cluster size: the number of clusters follows the problem, not the
+# host, so a seed gives the same decomposition on any machine
+CLUSTER_EXAMS = 40
+
+# Share of a time limit spent solving clusters; the rest goes to the repair
+SOLVE_TIME_SHARE = 0.7
+
+# Repair budget when neither ``repair_generations`` nor ``generations`` is given
+REPAIR_GENERATIONS = 200
+
+
+def conflict_edges(problem: CompiledProblem) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Exam conflict graph as weighted edges ``(u, v, shared_students)`` with u < v
+    Built by sorting enrollments by student and pairing each enrollment with
+    the ones ``d`` positions later that belong to the same student
+    """
+    order = np.lexsort((problem.enroll_exam, problem.enroll_student))
+    students = problem.enroll_student[order]
+    exams = problem.enroll_exam[order]
+    max_load = int(np.bincount(students).max()) if len(students) else 0
+
+    keys = []
+    for d in range(1, max_load):
+        same = students[d:] == students[:-d]
+        a, b = exams[:-d][same], exams[d:][same]
+        distinct = a != b
+        a, b = a[distinct], b[distinct]
+        keys.append(np.minimum(a, b) * problem.num_exams + np.maximum(a, b))
+
+    if not keys:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    pairs, weights = np.unique(np.concatenate(keys), return_counts=True)
+    return pairs // problem.num_exams, pairs % problem.num_exams, weights
+
+
+def connected_components(num_nodes: int, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """Component label per node (min-label propagation until stable)"""
+    labels = np.arange(num_nodes)
+    while True:
+        previous = labels.copy()
+        low = np.minimum(labels[u], labels[v])
+        np.minimum.at(labels, u, low)
+        np.minimum.at(labels, v, low)
+        # Pointer jumping collapses long chains quickly
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def _adjacency(num_nodes: int, u, v, w) -> List[Dict[int, int]]:
+    adjacency: List[Dict[int, int]] = [dict() for _ in range(num_nodes)]
+    for a, b, weight in zip(u.tolist(), v.tolist(), w.tolist()):
+        adjacency[a][b] = weight
+        adjacency[b][a] = weight
+    return adjacency
+
+
+def _grow_split(nodes: List[int], adjacency: List[Dict[int, int]], parts: int) -> List[List[int]]:
+    """
+    Split a connected component into ``parts`` pieces with a small cut
+    Greedy graph growing: start from a low-degree node and keep adding the
+    frontier node most strongly connected to the piece being grown
+    """
+    remaining = set(nodes)
+    target = math.ceil(len(nodes) / parts)
+    pieces = []
+
+    while remaining and len(pieces) < parts - 1:
+        seed = min(remaining, key=lambda n: (len(adjacency[n]), n))
+        piece, gain, frontier = [], {}, [(0, seed)]
+        while frontier and len(piece) < target:
+            _, node = heapq.heappop(frontier)
+            if node not in remaining:
+                continue
+            remaining.discard(node)
+            piece.append(node)
+            for neighbour, weight in adjacency[node].items():
+                if neighbour in remaining:
+                    gain[neighbour] = gain.get(neighbour, 0) + weight
+                    heapq.heappush(frontier, (-gain[neighbour], neighbour))
+            if not frontier and remaining and len(piece) < target:
+                frontier.append((0, next(iter(remaining))))
+        pieces.append(piece)
+
+    if remaining:
+        pieces.append(sorted(remaining))
+    return pieces
+
+
+def partition_exams(problem: CompiledProblem, num_parts: int) -> Tuple[List[np.ndarray], int]:
+    """
+    Partition exams into at most ``num_parts`` clusters
+    Components are kept whole where possible and packed largest-first into
+    the lightest cluster; components bigger than a fair share are split with
+    a greedy low-cut growth first. Returns ``(clusters, cut_weight)``.
+    """
+    u, v, w = conflict_edges(problem)
+    labels = connected_components(problem.num_exams, u, v)
+    _, component = np.unique(labels, return_inverse=True)
+    components = [np.flatnonzero(component == c).tolist() for c in range(component.max() + 1)]
+
+    fair_share = math.ceil(problem.num_exams / num_parts)
+    adjacency = None
+    pieces: List[List[int]] = []
+    for nodes in components:
+        if len(nodes) > fair_share and num_parts > 1:
+            adjacency = adjacency or _adjacency(problem.num_exams, u, v, w)
+            pieces.extend(_grow_split(nodes, adjacency, math.ceil(len(nodes) / fair_share)))
+        else:
+            pieces.append(nodes)
+
+    # Longest-processing-time packing by enrollment load
+    load = problem.exam_size
+    bins: List[List[int]] = [[] for _ in range(min(num_parts, len(pieces)))]
+    bin_load = [0] * len(bins)
+    for piece in sorted(pieces, key=lambda p: -int(load[p].sum())):
+        target = bin_load.index(min(bin_load))
+        bins[target].extend(piece)
+        bin_load[target] += int(load[piece].sum()) + len(piece)
+
+    clusters = [np.array(sorted(b), dtype=np.int64) for b in bins if b]
+    assignment = np.empty(problem.num_exams, dtype=np.int64)
+    for c, exams in enumerate(clusters):
+        assignment[exams] = c
+    cut = int(w[assignment[u] != assignment[v]].sum())
+    return clusters, cut
+
+
+def allocate_rooms(problem: CompiledProblem, clusters: List[np.ndarray]) -> List[np.ndarray]:
+    """
+    Give every cluster a disjoint room budget proportional to its exam count
+    Rooms are dealt largest-first to the cluster furthest below its quota,
+    so each cluster gets a share of the big rooms
+    """
+    demand = np.array([len(c) for c in clusters], dtype=float)
+    quota = np.maximum(1, np.floor(problem.num_rooms * demand / demand.sum())).astype(int)
+    while quota.sum() < problem.num_rooms:
+        quota[np.argmax(demand / quota)] += 1
+    while quota.sum() > problem.num_rooms:
+        quota[np.argmax(np.where(quota > 1, quota / demand, -1))] -= 1
+
+    assigned: List[List[int]] = [[] for _ in clusters]
+    for room in np.argsort(-problem.room_capacity, kind='stable').tolist():
+        open_clusters = [c for c in range(len(clusters)) if len(assigned[c]) < quota[c]]
+        c = min(open_clusters, key=lambda c: len(assigned[c]) / quota[c])
+        assigned[c].append(room)
+    return [np.array(sorted(r), dtype=np.int64) for r in assigned]
+
+
+def _solve_cluster(subproblem: CompiledProblem, params: Dict, seed_sequence, engine: str = 'ga') -> Tuple:
+    """Worker entry point: solve one cluster and return its local assignment"""
+    if engine == 'exact':
+        from .exact import ExactSolver  # deferred: app.exact imports conflict_edges from here
+
+        # Clusters run side by side, so the exact solver gets no polish here
+        # (the repair GA comes after the merge)
+        params = {k: v for k, v in params.items() if k != 'generations'}
+        ga = ExactSolver(subproblem, seed_sequence=seed_sequence, polish_generations=0, **params)
+    else:
+        ga = GeneticAlgorithm.from_problem(subproblem, seed_sequence=seed_sequence, **params)
+    with contextlib.redirect_stdout(io.StringIO()):
+        best = ga.evolve()
+    info = getattr(ga, 'info', None)
+    return best.rooms, best.slots, best.fitness, len(ga.generation_history), ga.evaluations, info
+
+
+class DecomposedSolver:
+    """
+    Solve clusters of the conflict graph in parallel, then merge and repair
+    Clusters are evolved by the GA, or solved by ExactSolver with
+    ``cluster_engine='exact'``. ``clusters`` defaults to one per
+    CLUSTER_EXAMS exams (at least two); ``workers`` only sizes the process
+    pool. A ``time_limit`` covers the whole run: SOLVE_TIME_SHARE of it for
+    the clusters, the rest for the repair. The repair runs for
+    ``repair_generations``, by default the same ``generations`` as each
+    cluster; ``generations`` is that budget, the one ``evolve`` reports
+    progress against. Exposes ``evolve``/``get_schedule_dict`` like
+    GeneticAlgorithm
+    """
+
+    def __init__(
+        self,
+        problem: CompiledProblem,
+        workers: Optional[int] = None,
+        repair_generations: Optional[int] = None,
+        seed: Optional[int] = None,
+        cluster_engine: str = 'ga',
+        clusters: Optional[int] = None,
+        **ga_params
+    ):
+        if cluster_engine not in CLUSTER_ENGINES:
+            raise ValueError(f"cluster_engine must be one of {CLUSTER_ENGINES}")
+        if clusters is not None and clusters < 1:
+            raise ValueError("clusters must be positive")
+        self.problem = problem
+        self.workers = workers or os.cpu_count() or 1
+        self.clusters = clusters
+        if repair_generations is None:
+            repair_generations = ga_params.get('generations', REPAIR_GENERATIONS)
+        self.generations = repair_generations
+        self.cluster_engine = cluster_engine
+        self.ga_params = ga_params
+        self.seed_sequence = make_seed_sequence(seed)
+        self.seed = self.seed_sequence.entropy
+        self.repair: Optional[GeneticAlgorithm] = None
+        self.info: Dict = {}
+        self.cluster_evaluations = 0
+
+    @property
+    def timing_history(self) -> List[Dict]:
+        return self.repair.timing_history if self.repair else []
+
+    @property
+    def generation_history(self) -> List[Dict]:
+        return self.repair.generation_history if self.repair else []
+
+    @property
+    def evaluations(self) -> int:
+        return self.cluster_evaluations + (self.repair.evaluations if self.repair else 0)
+
+    def evolve(self, callback=None) -> Timetable:
+        problem = self.problem
+        num_parts = self.clusters or max(2, math.ceil(problem.num_exams / CLUSTER_EXAMS))
+        num_parts = max(1, min(num_parts, problem.num_rooms, problem.num_exams))
+        started = time.perf_counter()
+
+        clusters, cut = partition_exams(problem, num_parts)
+        budgets = allocate_rooms(problem, clusters)
+        print(f"Decomposed {problem.num_exams} exams into {len(clusters)} clusters "
+              f"(cut weight {cut})")
+
+        cluster_seeds, repair_seed = self.seed_sequence.spawn(2)
+        rooms = np.zeros(problem.num_exams, dtype=np.int64)
+        slots = np.zeros(problem.num_exams, dtype=np.int64)
+        cluster_info = []
+
+        pool_size = min(self.workers, len(clusters))
+        cluster_params = dict(self.ga_params)
+        time_limit = self.ga_params.get('time_limit')
+        if time_limit:
+            # Clusters beyond the pool size run in later waves
+            waves = math.ceil(len(clusters) / pool_size)
+            cluster_params['time_limit'] = SOLVE_TIME_SHARE * time_limit / waves
+        if self.cluster_engine == 'exact':
+            from .exact import EXACT_WORKERS  # deferred, see _solve_cluster
+
+            # Clusters solve side by side: share the CP-SAT workers between
+            # them rather than starting a full portfolio in every process
+            cluster_params['workers'] = max(1, max(EXACT_WORKERS, os.cpu_count() or 1) // pool_size)
+
+        with ProcessPoolExecutor(max_workers=pool_size, mp_context=get_context('spawn')) as pool:
+            futures = [
+                pool.submit(_solve_cluster, problem.subproblem(exams, budget), cluster_params, child,
+                            self.cluster_engine)
+                for exams, budget, child in zip(clusters, budgets, cluster_seeds.spawn(len(clusters)))
+            ]
+            for exams, budget, future in zip(clusters, budgets, futures):
+                local_rooms, local_slots, fitness, generations, evaluations, exact = future.result()
+                self.cluster_evaluations += evaluations
+                rooms[exams] = budget[local_rooms]
+                slots[exams] = local_slots
+                cluster_info.append({
+                    'exams': len(exams), 'rooms': len(budget),
+                    'fitness': fitness, 'generations': generations
+                })
+                if exact is not None:
+                    cluster_info[-1]['exact'] = exact
+        solved = time.perf_counter()
+
+        # Repair: warm-start a GA on the merged schedule, moving only exams
+        # left in hard violation (cut-edge clashes and the like)
+        touched = problem.exam_hard_violations(rooms, slots) > 0
+        warm_start = WarmStart(
+            rooms=rooms, slots=slots,
+            original=np.ones(problem.num_exams, dtype=bool),
+            touched=touched,
+            reasons={'hard_violation_after_merge': int(touched.sum())}
+        )
+        repair_params = dict(self.ga_params, generations=self.generations)
+        if time_limit:
+            # Whatever the clusters left; the repair still runs one generation
+            repair_params['time_limit'] = max(time_limit - (solved - started), 1e-3)
+        self.repair = GeneticAlgorithm.from_problem(
+            problem,
+            seed_sequence=repair_seed,
+            warm_start=warm_start,
+            perturbation_weight=0,
+            stall_generations=50,
+            **repair_params
+        )
+        best = self.repair.evolve(callback=callback)
+
+        self.info = {
+            'clusters': cluster_info,
+            'workers': pool_size,
+            'cut_weight': cut,
+            'solve_seconds': solved - started,
+            'repair_seconds': time.perf_counter() - solved,
+            'repaired_exams': int(touched.sum()),
+        }
+        return best
+
+    @property
+    def best_solution(self) -> Optional[Timetable]:
+        return self.repair.best_solution if self.repair else None
+
+    def get_schedule_dict(self) -> Dict:
+        schedule = self.repair.get_schedule_dict()
+        schedule['seed'] = str(self.seed)
+        schedule['decomposition'] = self.info
+        return schedule
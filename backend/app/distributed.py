@@ -0,0 +1,490 @@
+"""
+Distributed fitness evaluation for SmartExam Scheduler
+Brokers farm batches of chromosomes out to worker processes and hand the
+scores back. The optimizers only talk to the ``Broker`` interface, so the
+transport is pluggable:
+
+- ``ProcessPoolBroker``: local spawn process pool
+- ``ManagerBroker``: TCP broker built on ``multiprocessing.managers``;
+  workers on any host connect with
+
+      python -m app.distributed --connect HOST:PORT --authkey KEY
+
+Each worker receives the problem once per job and caches it; every task is
+a batch of chromosomes whose results travel back in a single message. Tasks
+that fail or outlive their lease (which starts when a worker takes them)
+are resubmitted automatically; a broker no worker takes tasks from gives up
+instead of waiting forever.
+"""
+
+import argparse
+import itertools
+import os
+import queue
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from multiprocessing.managers import BaseManager
+from typing import Dict, List, Optional, Tuple
+
+from .problem import CompiledProblem
+
+
+# One score tuple per chromosome:
+# (fitness, hard, soft, moved_exams, rooms, unplaced, per-exam conflicts)
+Result = Tuple
+
+# Queued once per local worker when a ManagerBroker closes
+STOP = 'stop'
+
+# Seconds an idle worker waits on the task queue before asking again
+WORKER_POLL = 1.0
+
+
+def build_evaluator(problem: CompiledProblem, options: Dict):
+    """GeneticAlgorithm used purely for its ``evaluate`` method"""
+    from .genetic_algorithm import GeneticAlgorithm
+    return GeneticAlgorithm.from_problem(problem, **options)
+
+
+def evaluate_genes(evaluator, genes: List[Tuple]) -> List[Result]:
+    """Score a batch of ``(rooms, slots)`` pairs with ``evaluator``"""
+    from .genetic_algorithm import Timetable
+    results = []
+    for rooms, slots in genes:
+        timetable = Timetable(evaluator.problem, rooms, slots)
+        evaluator.evaluate(timetable)
+        results.append((
+            timetable.fitness, timetable.hard_conflicts, timetable.soft_conflict_score,
+            timetable.moved_exams, timetable.rooms, timetable.unplaced, timetable.conflicts
+        ))
+    return results
+
+
+class Broker:
+    """
+    Transport-independent task interface
+    ``start`` ships a job (problem plus evaluator options); ``submit`` queues
+    one batch and returns its task id; ``poll`` returns finished
+    ``(task_id, results)`` pairs, waiting at most ``timeout`` seconds for the
+    first one. ``map`` builds a blocking batch evaluation on top.
+    """
+    workers = 1
+
+    def start(self, problem: CompiledProblem, options: Dict):
+        raise NotImplementedError
+
+    def submit(self, genes: List[Tuple]) -> int:
+        raise NotImplementedError
+
+    def poll(self, timeout: Optional[float] = None) -> List[Tuple[int, List[Result]]]:
+        raise NotImplementedError
+
+    @property
+    def pending(self) -> int:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def map(self, genes: List[Tuple], batch_size: int = 8) -> List[Result]:
+        """Evaluate all ``genes`` and return their results in order"""
+        offsets = {}
+        for offset in range(0, len(genes), batch_size):
+            offsets[self.submit(genes[offset:offset + batch_size])] = offset
+        results: List[Optional[Result]] = [None] * len(genes)
+        while offsets:
+            for task_id, batch in self.poll():
+                offset = offsets.pop(task_id, None)
+                if offset is not None:
+                    results[offset:offset + len(batch)] = batch
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Local process pool
+
+_pool_evaluator = None
+
+
+def _init_pool_worker(problem: CompiledProblem, options: Dict):
+    global _pool_evaluator
+    _pool_evaluator = build_evaluator(problem, options)
+
+
+def _evaluate_in_pool(genes: List[Tuple]) -> List[Result]:
+    return evaluate_genes(_pool_evaluator, genes)
+
+
+class ProcessPoolBroker(Broker):
+    """Spawn process pool on this machine; the problem travels via the initializer"""
+
+    def __init__(self, workers: Optional[int] = None, max_attempts: int = 3):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_attempts = max_attempts
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._job: Optional[Tuple[CompiledProblem, Dict]] = None
+        # future -> [task_id, genes, attempts]
+        self._futures: Dict = {}
+        self._ids = itertools.count()
+
+    def start(self, problem: CompiledProblem, options: Dict):
+        self.close()
+        self._job = (problem, options)
+        self._start_pool()
+
+    def _start_pool(self):
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=get_context('spawn'),
+            initializer=_init_pool_worker,
+            initargs=self._job
+        )
+
+    def _dispatch(self, task_id: int, genes: List[Tuple], attempts: int):
+        if attempts >= self.max_attempts:
+            raise RuntimeError(f"Task {task_id} failed {attempts} times")
+        self._futures[self._pool.submit(_evaluate_in_pool, genes)] = [task_id, genes, attempts + 1]
+
+    def submit(self, genes: List[Tuple]) -> int:
+        task_id = next(self._ids)
+        self._dispatch(task_id, genes, 0)
+        return task_id
+
+    def poll(self, timeout: Optional[float] = None) -> List[Tuple[int, List[Result]]]:
+        if not self._futures:
+            return []
+        done, _ = wait(self._futures, timeout=timeout, return_when=FIRST_COMPLETED)
+        finished, failed = [], []
+        for future in done:
+            task_id, genes, attempts = self._futures.pop(future)
+            try:
+                finished.append((task_id, future.result()))
+            except BrokenProcessPool:
+                failed.append((task_id, genes, attempts))
+            except Exception:
+                print(f"Task {task_id} failed, resubmitting:\n{traceback.format_exc()}")
+                self._dispatch(task_id, genes, attempts)
+
+        if failed:
+            # A dead worker breaks the whole pool: rebuild it and resubmit
+            # everything that was still in flight
+            print(f"Worker process died, resubmitting {len(failed) + len(self._futures)} tasks")
+            failed.extend(self._futures.values())
+            self._futures = {}
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._start_pool()
+            for task_id, genes, attempts in failed:
+                self._dispatch(task_id, genes, attempts)
+        return finished
+
+    @property
+    def pending(self) -> int:
+        return len(self._futures)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        self._futures = {}
+
+
+# TCP broker
+
+class _BrokerState:
+    """
+    Object served to workers: current job and the task/result queues
+    Runs in the broker process, so ``get_task`` stamps when each task was
+    taken (the start of its lease) and when each worker last asked for work.
+    """
+
+    def __init__(self):
+        self.tasks: queue.Queue = queue.Queue()
+        self.results: queue.Queue = queue.Queue()
+        self._job: Optional[Tuple[int, CompiledProblem, Dict]] = None
+        self._lock = threading.Lock()
+        # task_id -> time taken; worker name -> time of its last request
+        self._taken: Dict[int, float] = {}
+        self._seen: Dict[str, float] = {}
+
+    def job(self):
+        return self._job
+
+    def get_task(self, worker: str = '', timeout: float = WORKER_POLL):
+        with self._lock:
+            self._seen[worker] = time.monotonic()
+        try:
+            task = self.tasks.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if task != STOP:
+            with self._lock:
+                self._taken[task[1]] = time.monotonic()
+        return task
+
+    def put_result(self, message):
+        self.results.put(message)
+
+    def taken(self) -> Dict[int, float]:
+        with self._lock:
+            return dict(self._taken)
+
+    def release(self, task_id: int):
+        with self._lock:
+            self._taken.pop(task_id, None)
+
+    def clear_leases(self):
+        with self._lock:
+            self._taken.clear()
+
+    def active_workers(self, within: float) -> int:
+        """Workers that asked for a task in the last ``within`` seconds"""
+        now = time.monotonic()
+        with self._lock:
+            return sum(1 for last in self._seen.values() if now - last <= within)
+
+
+class _WorkerManager(BaseManager):
+    pass
+
+
+_WorkerManager.register('state')
+
+
+class ManagerBroker(Broker):
+    """
+    TCP broker served from this process by a ``BaseManager``
+    Tasks are leased from the moment a worker takes them: a batch not
+    answered within ``task_timeout`` seconds (dead or stuck worker) or
+    answered with an error is queued again, up to ``max_attempts`` times;
+    batches still waiting in the queue never expire, but ``poll`` raises once
+    tasks have waited ``idle_timeout`` seconds with no worker connected and
+    none of them taken. ``authkey`` defaults to a random key, which only
+    workers started by this process know.
+    ``local_workers`` starts that many worker processes on this machine,
+    which is enough for tests on one box.
+    """
+
+    def __init__(
+        self,
+        address: Tuple[str, int] = ('127.0.0.1', 0),
+        authkey: Optional[bytes] = None,
+        task_timeout: float = 30.0,
+        max_attempts: int = 3,
+        local_workers: int = 0,
+        idle_timeout: float = 60.0
+    ):
+        if authkey is None:
+            authkey = os.urandom(32)
+        self.state = _BrokerState()
+        # A manager class per broker, since register() works on the class
+        manager_cls = type('BrokerManager', (BaseManager,), {})
+        manager_cls.register('state', callable=lambda: self.state)
+        manager = manager_cls(address=address, authkey=authkey)
+        self._server = manager.get_server()
+        self.address = self._server.address
+        self.authkey = authkey
+        # serve_forever would create the stop event only once it runs; the
+        # per-connection loops check it too, so it must exist up front
+        self._stop = self._server.stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+        self.task_timeout = task_timeout
+        self.max_attempts = max_attempts
+        self.idle_timeout = idle_timeout
+        # When the queue was last seen waiting with no worker around
+        self._idle_since: Optional[float] = None
+        self._job_ids = itertools.count(1)
+        self._job_id = 0
+        self._ids = itertools.count()
+        # task_id -> [genes, attempts]
+        self._inflight: Dict[int, List] = {}
+
+        ctx = get_context('spawn')
+        self._local = [
+            ctx.Process(target=run_worker, args=(self.address, authkey), daemon=True)
+            for _ in range(local_workers)
+        ]
+        for process in self._local:
+            process.start()
+
+    def _serve(self):
+        """
+        Accept worker connections until ``close``
+        Replaces ``Server.serve_forever``, whose accept loop never ends
+        """
+        server = self._server
+        while not self._stop.is_set():
+            try:
+                connection = server.listener.accept()
+            except Exception:
+                # Failed handshakes, and the wake-up connection from close()
+                continue
+            threading.Thread(target=server.handle_request, args=(connection,), daemon=True).start()
+
+    @property
+    def workers(self) -> int:
+        """Workers that asked for a task within the last lease period (at least one)"""
+        return max(1, len(self._local), self.state.active_workers(self.task_timeout + WORKER_POLL))
+
+    def start(self, problem: CompiledProblem, options: Dict):
+        # Drop tasks of any previous job; workers refetch the problem when
+        # they see the new job id
+        while not self.state.tasks.empty():
+            self.state.tasks.get_nowait()
+        self._inflight.clear()
+        self.state.clear_leases()
+        self._idle_since = None
+        self._job_id = next(self._job_ids)
+        self.state._job = (self._job_id, problem, options)
+
+    def _enqueue(self, task_id: int):
+        entry = self._inflight[task_id]
+        entry[1] += 1
+        self.state.release(task_id)
+        self.state.tasks.put((self._job_id, task_id, entry[0]))
+
+    def submit(self, genes: List[Tuple]) -> int:
+        task_id = next(self._ids)
+        self._inflight[task_id] = [genes, 0]
+        self._enqueue(task_id)
+        return task_id
+
+    def _retry(self, task_id: int, reason: str):
+        attempts = self._inflight[task_id][1]
+        if attempts >= self.max_attempts:
+            raise RuntimeError(f"Task {task_id} failed {attempts} times: {reason}")
+        print(f"Resubmitting task {task_id} ({reason})")
+        self._enqueue(task_id)
+
+    def poll(self, timeout: Optional[float] = None) -> List[Tuple[int, List[Result]]]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        finished = []
+        while self._inflight and not finished:
+            now = time.monotonic()
+            # Only tasks a worker has taken are leased
+            leases = self.state.taken()
+            for task_id, taken in leases.items():
+                if task_id in self._inflight and taken + self.task_timeout < now:
+                    self._retry(task_id, 'lease expired')
+            self._check_idle(bool(leases), now)
+            block = 0.5 if deadline is None else max(0.0, min(0.5, deadline - now))
+            try:
+                message = self.state.results.get(timeout=block)
+            except queue.Empty:
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                continue
+            while message is not None:
+                job_id, task_id, ok, payload = message
+                # Late duplicates of resubmitted tasks and stale jobs are dropped
+                if job_id == self._job_id and task_id in self._inflight:
+                    if ok:
+                        del self._inflight[task_id]
+                        self.state.release(task_id)
+                        finished.append((task_id, payload))
+                    else:
+                        self._retry(task_id, payload.strip().splitlines()[-1])
+                try:
+                    message = self.state.results.get_nowait()
+                except queue.Empty:
+                    message = None
+        return finished
+
+    def _check_idle(self, leased: bool, now: float):
+        """Raise once queued tasks have waited ``idle_timeout`` with nobody to take them"""
+        if leased or self.state.active_workers(2 * WORKER_POLL):
+            self._idle_since = None
+        elif self._idle_since is None:
+            self._idle_since = now
+        elif now - self._idle_since > self.idle_timeout:
+            self._idle_since = None
+            host, port = self.address
+            raise RuntimeError(
+                f"No evaluation worker has taken a task for {self.idle_timeout:.0f}s; "
+                f"start workers with: python -m app.distributed --connect {host}:{port}"
+            )
+
+    @property
+    def pending(self) -> int:
+        return len(self._inflight)
+
+    def close(self):
+        for _ in self._local:
+            self.state.tasks.put(STOP)
+        for process in self._local:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._local = []
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        # Wake the accept loop with a throwaway connection, then stop it
+        host, port = self.address
+        try:
+            socket.create_connection(('127.0.0.1' if host in ('', '0.0.0.0') else host, port), timeout=1).close()
+        except OSError:
+            pass
+        self._thread.join(timeout=5)
+        self._server.listener.close()
+
+
+def run_worker(address: Tuple[str, int], authkey: bytes):
+    """
+    Worker loop: connect, fetch the job once, evaluate batches until told to stop
+    Exits quietly when the broker goes away
+    """
+    manager = _WorkerManager(address=address, authkey=authkey)
+    manager.connect()
+    state = manager.state()
+    name = f"{socket.gethostname()}:{os.getpid()}"
+    job_id, evaluator = None, None
+
+    while True:
+        try:
+            task = state.get_task(name)
+        except (EOFError, ConnectionError, BrokenPipeError):
+            return
+        if task is None:
+            continue
+        if task == STOP:
+            return
+        task_job, task_id, genes = task
+        try:
+            if task_job != job_id:
+                job_id, problem, options = state.job()
+                evaluator = build_evaluator(problem, options)
+            state.put_result((task_job, task_id, True, evaluate_genes(evaluator, genes)))
+        except (EOFError, ConnectionError, BrokenPipeError):
+            return
+        except Exception:
+            state.put_result((task_job, task_id, False, traceback.format_exc()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SmartExam evaluation worker")
+    parser.add_argument('--connect', required=True, help="broker address HOST:PORT")
+    parser.add_argument('--authkey', default=os.environ.get('SMARTEXAM_BROKER_AUTHKEY'),
+                        help="broker secret (default: $SMARTEXAM_BROKER_AUTHKEY)")
+    args = parser.parse_args(argv)
+    if not args.authkey:
+        parser.error("--authkey or SMARTEXAM_BROKER_AUTHKEY is required")
+
+    host, port = args.connect.rsplit(':', 1)
+    print(f"Worker {os.getpid()} connecting to {host}:{port}")
+    run_worker((host, int(port)), args.authkey.encode())
+
+
+if __name__ == "__main__":
+    main()
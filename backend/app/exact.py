@@ -0,0 +1,526 @@
+"""
+Exact engine for SmartExam Scheduler
+Models a CompiledProblem for the OR-Tools CP-SAT solver with the same
+weighted constraints the genetic algorithm scores, so small (or decomposed)
+instances are solved to proven optimality under a time limit and large ones
+still get lower bounds on their hard and soft cost. OR-Tools is optional and
+only imported when an exact model is built.
+
+Every active constraint has an exact linearization in ``EXACT_TERMS``; the
+model's objective equals ``CompiledProblem.evaluate`` for every assignment.
+"""
+
+import importlib.util
+import os
+import time
+from functools import cached_property
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .constraints import SLOT_OVERUSE_THRESHOLD, Constraint
+from .decomposition import SOLVE_TIME_SHARE, conflict_edges
+from .genetic_algorithm import GeneticAlgorithm, Timetable
+from .problem import CompiledProblem
+from .rng import make_seed_sequence
+from .warm_start import WarmStart
+
+# Default solver budget in seconds when no time limit is given
+EXACT_TIME_LIMIT = 60.0
+
+# CP-SAT's portfolio (LP, core-based and local-search workers) is what
+# proves lower bounds; below ~8 workers it degrades to plain search even
+# on machines with fewer cores
+EXACT_WORKERS = 8
+
+
+def ortools_available() -> bool:
+    """Whether OR-Tools is installed"""
+    return importlib.util.find_spec('ortools') is not None
+
+
+def _cp_model():
+    try:
+        from ortools.sat.python import cp_model
+    except ImportError as e:
+        raise RuntimeError("The exact engine needs OR-Tools (pip install ortools)") from e
+    return cp_model
+
+
+EXACT_TERMS: Dict[str, Callable] = {}
+
+
+def greedy_clique(problem: CompiledProblem, starts: int = 10) -> List[int]:
+    """
+    Large set of exams that pairwise share a student, grown greedily from the
+    ``starts`` highest-degree exams of the conflict graph
+    """
+    u, v, _ = conflict_edges(problem)
+    neighbours = [set() for _ in range(problem.num_exams)]
+    for a, b in zip(u.tolist(), v.tolist()):
+        neighbours[a].add(b)
+        neighbours[b].add(a)
+
+    best: List[int] = []
+    for start in sorted(range(problem.num_exams), key=lambda e: -len(neighbours[e]))[:starts]:
+        clique, candidates = [start], set(neighbours[start])
+        while candidates:
+            pick = max(candidates, key=lambda e: (len(neighbours[e] & candidates), -e))
+            clique.append(pick)
+            candidates &= neighbours[pick]
+        if len(clique) > len(best):
+            best = clique
+    return best
+
+
+def exact_term(name: str):
+    """Decorator registering the CP-SAT violation count of constraint ``name``"""
+    def decorator(fn):
+        EXACT_TERMS[name] = fn
+        return fn
+    return decorator
+
+
+class ExactModel:
+    """
+    CP-SAT model of a compiled problem
+    ``x[e][r][s]`` places exam ``e`` in room ``r`` at timeslot ``s``; derived
+    variables are created on first use by the constraint terms. Students
+    with identical exam lists are merged and weighted by their number.
+    """
+
+    def __init__(self, problem: CompiledProblem):
+        cp_model = _cp_model()
+        self.cp_model = cp_model
+        self.problem = problem
+        self.model = cp_model.CpModel()
+        m = self.model
+        E, R, S = problem.num_exams, problem.num_rooms, problem.num_slots
+
+        self.x = [[[m.new_bool_var(f"x_{e}_{r}_{s}") for s in range(S)] for r in range(R)]
+                  for e in range(E)]
+        for e in range(E):
+            m.add_exactly_one(v for row in self.x[e] for v in row)
+
+        # Violation count expression of every active constraint
+        self.terms: Dict[str, Tuple[Constraint, object]] = {}
+        for constraint in problem.constraints.active(problem):
+            if constraint.name not in EXACT_TERMS:
+                raise ValueError(f"No exact model for constraint '{constraint.name}'")
+            if constraint.weight < 0 or constraint.weight != int(constraint.weight):
+                raise ValueError(
+                    f"The exact engine needs non-negative integer weights ({constraint.name}={constraint.weight})"
+                )
+            self.terms[constraint.name] = (constraint, EXACT_TERMS[constraint.name](self, constraint))
+
+        self.hard = sum(int(c.weight) * count for c, count in self.terms.values() if c.hard)
+        self.soft = sum(int(c.weight) * count for c, count in self.terms.values() if not c.hard)
+        # Unweighted, like the hard_conflicts the GA reports
+        self.hard_violations = sum(count for c, count in self.terms.values() if c.hard)
+        m.minimize(self.hard + self.soft)
+
+    @cached_property
+    def key_slots(self) -> List[List[int]]:
+        """Timeslots sharing each (day, time) key"""
+        return [np.flatnonzero(self.problem.slot_key == k).tolist() for k in range(self.problem.num_keys)]
+
+    @cached_property
+    def day_keys(self) -> List[List[int]]:
+        return [np.flatnonzero(self.problem.key_day == d).tolist() for d in range(self.problem.num_days)]
+
+    @cached_property
+    def y(self) -> List[List]:
+        """``y[e][k]``: exam ``e`` sits in a slot with key ``k``"""
+        m, y = self.model, []
+        for e, rows in enumerate(self.x):
+            y_e = []
+            for k, slots in enumerate(self.key_slots):
+                v = m.new_bool_var(f"y_{e}_{k}")
+                m.add(v == sum(row[s] for row in rows for s in slots))
+                y_e.append(v)
+            y.append(y_e)
+        return y
+
+    @cached_property
+    def student_groups(self) -> List[Tuple[List[int], int]]:
+        """``(exams, students)`` for every distinct exam list of two or more exams"""
+        p = self.problem
+        order = np.lexsort((p.enroll_exam, p.enroll_student))
+        students, exams = p.enroll_student[order], p.enroll_exam[order]
+        bounds = np.flatnonzero(np.diff(students)) + 1
+        groups: Dict[Tuple[int, ...], int] = {}
+        for group in np.split(exams, bounds):
+            if len(group) > 1:
+                key = tuple(group.tolist())
+                groups[key] = groups.get(key, 0) + 1
+        return [(list(exams), count) for exams, count in groups.items()]
+
+    @cached_property
+    def occupied(self) -> List[List]:
+        """``occupied[g][k]``: students of group ``g`` have an exam at key ``k``"""
+        m, y, occupied = self.model, self.y, []
+        for g, (exams, _) in enumerate(self.student_groups):
+            row = []
+            for k in range(self.problem.num_keys):
+                v = m.new_bool_var(f"occ_{g}_{k}")
+                m.add_max_equality(v, [y[e][k] for e in exams])
+                row.append(v)
+            # Redundant, but it keeps the LP bound of the clash count non-negative
+            m.add(sum(row) <= len(exams))
+            occupied.append(row)
+        return occupied
+
+    def excess(self, expr, limit: int, upper: int, name: str):
+        """Integer variable equal to ``max(expr - limit, 0)`` at any optimum"""
+        v = self.model.new_int_var(0, max(upper - limit, 0), name)
+        self.model.add(v >= expr - limit)
+        return v
+
+    def room_matrix_count(self, bad: np.ndarray):
+        """Number of exams placed in a room where ``bad[e, r]`` holds"""
+        return sum(v for e, r in zip(*np.nonzero(bad)) for v in self.x[e][r])
+
+
+@exact_term('student_clash')
+def _student_clash(model: ExactModel, constraint):
+    clashes = sum(count * (len(exams) - sum(model.occupied[g]))
+                  for g, (exams, count) in enumerate(model.student_groups))
+    # Pigeonhole cut the LP cannot see: exams of a clique sharing one of the
+    # K keys clash at least once per extra exam, so >= |clique| - K clashes
+    forced = len(greedy_clique(model.problem)) - model.problem.num_keys
+    if forced > 0:
+        model.model.add(clashes >= forced)
+    return clashes
+
+
+@exact_term('room_double_booking')
+def _room_double_booking(model: ExactModel, constraint):
+    E = model.problem.num_exams
+    return sum(
+        model.excess(sum(model.x[e][r][s] for e in range(E) for s in slots), 1, E, f"room_{r}_{k}")
+        for r in range(model.problem.num_rooms)
+        for k, slots in enumerate(model.key_slots)
+    )
+
+
+@exact_term('professor_clash')
+def _professor_clash(model: ExactModel, constraint):
+    p = model.problem
+    total = 0
+    for prof in range(p.num_professors):
+        exams = np.flatnonzero(p.professor_index == prof).tolist()
+        if len(exams) > 1:
+            total += sum(
+                model.excess(sum(model.y[e][k] for e in exams), 1, len(exams), f"prof_{prof}_{k}")
+                for k in range(p.num_keys)
+            )
+    return total
+
+
+@exact_term('room_capacity')
+def _room_capacity(model: ExactModel, constraint):
+    p = model.problem
+    return model.room_matrix_count(p.exam_size[:, None] > p.room_capacity[None, :])
+
+
+@exact_term('room_availability')
+def _room_availability(model: ExactModel, constraint):
+    unavailable = ~model.problem.room_availability
+    return sum(
+        row[s] for rows in model.x
+        for r, row in enumerate(rows)
+        for s in np.flatnonzero(unavailable[r]).tolist()
+    )
+
+
+@exact_term('back_to_back')
+def _back_to_back(model: ExactModel, constraint):
+    # Distinct exam slots a student has on a day, beyond the first
+    total = 0
+    for g, (exams, count) in enumerate(model.student_groups):
+        occupied = model.occupied[g]
+        for d, keys in enumerate(model.day_keys):
+            if len(keys) > 1:
+                slots_used = sum(occupied[k] for k in keys)
+                total += count * model.excess(slots_used, 1, min(len(keys), len(exams)), f"b2b_{g}_{d}")
+    return total
+
+
+def _utilization_term(model: ExactModel, constraint):
+    p = model.problem
+    with np.errstate(divide='ignore', invalid='ignore'):
+        utilization = p.exam_size[:, None] / p.room_capacity[None, :]
+    return model.room_matrix_count(constraint._bad(utilization))
+
+
+exact_term('room_underused')(_utilization_term)
+exact_term('room_overcrowded')(_utilization_term)
+
+
+@exact_term('slot_overuse')
+def _slot_overuse(model: ExactModel, constraint):
+    m, E, total = model.model, model.problem.num_exams, 0
+    for k in range(model.problem.num_keys):
+        usage = sum(model.y[e][k] for e in range(E))
+        over = m.new_bool_var(f"overused_{k}")
+        cost = m.new_int_var(0, E, f"overuse_{k}")
+        m.add(usage <= SLOT_OVERUSE_THRESHOLD).only_enforce_if(over.Not())
+        m.add(cost == 0).only_enforce_if(over.Not())
+        m.add(cost == usage).only_enforce_if(over)
+        total += cost
+    return total
+
+
+@exact_term('max_exams_per_day')
+def _max_exams_per_day(model: ExactModel, constraint):
+    total = 0
+    for g, (exams, count) in enumerate(model.student_groups):
+        if len(exams) <= constraint.limit:
+            continue
+        for d, keys in enumerate(model.day_keys):
+            sitting = sum(model.y[e][k] for e in exams for k in keys)
+            total += count * model.excess(sitting, constraint.limit, len(exams), f"per_day_{g}_{d}")
+    return total
+
+
+def _solution_callback(cp_model, solver: 'ExactSolver', callback=None):
+    """CP-SAT callback logging each improving solution like a GA generation
+    (the subclass is defined here because OR-Tools is optional)"""
+
+    class Recorder(cp_model.CpSolverSolutionCallback):
+        def on_solution_callback(self):
+            model = solver.model
+            hard, soft = int(self.value(model.hard)), int(self.value(model.soft))
+            entry = {
+                'generation': len(solver.solutions),
+                'best_fitness': hard + soft,
+                'avg_fitness': hard + soft,
+                'hard_conflicts': int(self.value(model.hard_violations)),
+                'soft_conflicts': soft,
+                'bound': self.best_objective_bound,
+                'seconds': self.wall_time,
+            }
+            solver.solutions.append(entry)
+            if callback:
+                callback(entry)
+
+    return Recorder()
+
+
+class ExactSolver:
+    """
+    Solve a compiled problem with CP-SAT, then hand the result to the GA
+    The solver can be hinted with a warm start (a saved schedule, whose
+    untouched exams stay fixed, or a short GA run with ``hint_generations``).
+    Unless optimality was proven, the best solution seeds a GA that only
+    moves penalized exams for up to ``polish_generations``. ``time_limit``
+    covers the whole run: when a polish follows, the hint and the solves get
+    SOLVE_TIME_SHARE of it and the polish whatever is left. With ``bounds``
+    the two separate bound solves take half of the solve time. Exposes
+    ``evolve``/``get_schedule_dict`` like GeneticAlgorithm; ``info`` carries
+    the status, objective and lower bound.
+    """
+
+    def __init__(
+        self,
+        problem: CompiledProblem,
+        time_limit: Optional[float] = None,
+        workers: Optional[int] = None,
+        seed: Optional[int] = None,
+        seed_sequence: Optional[np.random.SeedSequence] = None,
+        warm_start: Optional[WarmStart] = None,
+        hint_generations: int = 0,
+        polish_generations: int = 200,
+        bounds: bool = False,
+        **ga_params
+    ):
+        self.problem = problem
+        self.time_limit = time_limit or EXACT_TIME_LIMIT
+        self.workers = workers or max(EXACT_WORKERS, os.cpu_count() or 1)
+        self.seed_sequence = seed_sequence or make_seed_sequence(seed)
+        self.seed = self.seed_sequence.entropy
+        self.warm_start = warm_start
+        self.hint_generations = hint_generations
+        self.polish_generations = polish_generations
+        self.bounds = bounds
+        self.ga_params = ga_params
+        self.model = ExactModel(problem)
+        self.solutions: List[Dict] = []
+        self.hint_ga: Optional[GeneticAlgorithm] = None
+        self.polish: Optional[GeneticAlgorithm] = None
+        self.info: Dict = {}
+
+    @property
+    def timing_history(self) -> List[Dict]:
+        return self.polish.timing_history if self.polish else []
+
+    @property
+    def generation_history(self) -> List[Dict]:
+        return self.solutions + (self.polish.generation_history if self.polish else [])
+
+    @property
+    def evaluations(self) -> int:
+        return (len(self.solutions)
+                + (self.hint_ga.evaluations if self.hint_ga else 0)
+                + (self.polish.evaluations if self.polish else 0))
+
+    @property
+    def best_solution(self) -> Optional[Timetable]:
+        return self.polish.best_solution if self.polish else None
+
+    @property
+    def generations(self) -> int:
+        return self.polish.generations if self.polish else self.polish_generations
+
+    def _solver(self, time_limit: float):
+        solver = self.model.cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = time_limit
+        solver.parameters.num_workers = self.workers
+        solver.parameters.random_seed = int(self.seed % (2 ** 31))
+        return solver
+
+    def _add_hint(self, warm_start: WarmStart):
+        """Hint the warm start's assignment; exams it does not let move are fixed"""
+        m, x = self.model.model, self.model.x
+        for e in np.flatnonzero(warm_start.original).tolist():
+            r0, s0 = int(warm_start.rooms[e]), int(warm_start.slots[e])
+            if not warm_start.touched[e]:
+                m.add(x[e][r0][s0] == 1)
+                continue
+            for r, row in enumerate(x[e]):
+                for s, v in enumerate(row):
+                    m.add_hint(v, (r, s) == (r0, s0))
+
+    def _assignment(self, solver) -> Tuple[np.ndarray, np.ndarray]:
+        rooms = np.zeros(self.problem.num_exams, dtype=np.int64)
+        slots = np.zeros(self.problem.num_exams, dtype=np.int64)
+        for e, rows in enumerate(self.model.x):
+            for r, row in enumerate(rows):
+                for s, v in enumerate(row):
+                    if solver.boolean_value(v):
+                        rooms[e], slots[e] = r, s
+        return rooms, slots
+
+    def lower_bounds(self, time_limit: Optional[float] = None) -> Dict[str, Dict]:
+        """
+        Lower bounds on the hard and the soft penalty, each from its own solve
+        No assignment can do better than either bound on that part alone
+        """
+        model = self.model
+        bounds = {}
+        for part, expr in (('hard', model.hard), ('soft', model.soft)):
+            model.model.minimize(expr)
+            solver = self._solver(time_limit or self.time_limit)
+            status = solver.solve(model.model)
+            found = status in (model.cp_model.OPTIMAL, model.cp_model.FEASIBLE)
+            bounds[part] = {
+                'status': solver.status_name(status),
+                'bound': solver.best_objective_bound if found else 0,
+                'best': solver.objective_value if found else None,
+            }
+        model.model.minimize(model.hard + model.soft)
+        return bounds
+
+    def evolve(self, callback=None) -> Timetable:
+        problem = self.problem
+        cp_model = self.model.cp_model
+        hint_seed, polish_seed = self.seed_sequence.spawn(2)
+        started = time.perf_counter()
+        deadline = started + self.time_limit
+        solve_window = (SOLVE_TIME_SHARE if self.polish_generations else 1.0) * self.time_limit
+        bound_limit = solve_window / 4 if self.bounds else 0.0
+        solve_until = started + solve_window - 2 * bound_limit
+
+        warm_start = self.warm_start
+        if warm_start is None and self.hint_generations:
+            # Warm-start the solver from a short GA run
+            self.hint_ga = GeneticAlgorithm.from_problem(
+                problem, seed_sequence=hint_seed,
+                **dict(self.ga_params, generations=self.hint_generations)
+            )
+            hint = self.hint_ga.evolve()
+            warm_start = WarmStart(hint.rooms, hint.slots,
+                                   original=np.ones(problem.num_exams, dtype=bool),
+                                   touched=np.ones(problem.num_exams, dtype=bool))
+        if warm_start is not None:
+            self._add_hint(warm_start)
+
+        proto = self.model.model.proto
+        solve_limit = max(solve_until - time.perf_counter(), 1e-3)
+        print(f"Solving exact model: {len(proto.variables)} variables, "
+              f"{len(proto.constraints)} constraints, {solve_limit:.0f}s limit")
+        solver = self._solver(solve_limit)
+        status = solver.solve(self.model.model, solution_callback=_solution_callback(cp_model, self, callback))
+        lower_bounds = self.lower_bounds(bound_limit) if self.bounds else None
+        solved = time.perf_counter()
+
+        found = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+        optimal = status == cp_model.OPTIMAL
+        if found:
+            rooms, slots = self._assignment(solver)
+        elif warm_start is not None:
+            rooms, slots = warm_start.rooms.copy(), warm_start.slots.copy()
+        else:
+            rooms = np.zeros(problem.num_exams, dtype=np.int64)
+            slots = np.zeros(problem.num_exams, dtype=np.int64)
+
+        # Hand over to the GA: it polishes the exams still taking a penalty
+        # (every exam when the solver found nothing) that may move at all
+        start = Timetable(problem, rooms, slots)
+        start.calculate_fitness(per_exam=True)
+        touched = start.conflicts > 0 if found else np.ones(problem.num_exams, dtype=bool)
+        if self.warm_start is not None:
+            touched &= self.warm_start.touched
+        handover = WarmStart(
+            rooms=rooms, slots=slots,
+            original=np.ones(problem.num_exams, dtype=bool),
+            touched=touched,
+            reasons={'penalized_after_exact': int(touched.sum())}
+        )
+        polish_params = dict(self.ga_params, generations=0 if optimal else self.polish_generations)
+        polish_params.setdefault('stall_generations', 50)
+        # Whatever the solve left; the polish still runs one generation
+        polish_params['time_limit'] = max(deadline - time.perf_counter(), 1e-3)
+        self.polish = GeneticAlgorithm.from_problem(
+            problem,
+            seed_sequence=polish_seed,
+            warm_start=handover,
+            perturbation_weight=0,
+            **polish_params
+        )
+        best = self.polish.evolve(callback=callback)
+
+        objective = solver.objective_value if found else None
+        bound = solver.best_objective_bound
+        self.info = {
+            'status': solver.status_name(status),
+            'optimal': optimal,
+            'objective': objective,
+            'lower_bound': bound,
+            'gap': None if objective is None else (objective - bound) / max(objective, 1),
+            'solutions': len(self.solutions),
+            'variables': len(proto.variables),
+            'constraints': len(proto.constraints),
+            'hinted': warm_start is not None,
+            'solve_seconds': solved - started,
+            'polish_seconds': time.perf_counter() - solved,
+            'polished_exams': int(touched.sum()) if not optimal else 0,
+        }
+        if lower_bounds is not None:
+            self.info['lower_bounds'] = lower_bounds
+        return best
+
+    def get_schedule_dict(self) -> Dict:
+        schedule = self.polish.get_schedule_dict()
+        schedule['seed'] = str(self.seed)
+        schedule['history'] = self.generation_history
+        schedule['exact'] = self.info
+        if self.warm_start is not None:
+            # Report changes against the saved schedule, not the solver's handover
+            best = self.best_solution
+            metrics = schedule['metrics']
+            metrics['moved_exams'] = int(self.warm_start.moved(best.rooms, best.slots).sum())
+            metrics['touched_exams'] = self.warm_start.num_touched
+            metrics['change_reasons'] = self.warm_start.reasons
+        return schedule
+
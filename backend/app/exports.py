@@ -0,0 +1,244 @@
+"""
+Streaming export of personal exam timetables
+Every student's and professor's timetable is produced lazily from a saved
+schedule and the enrollment table (read in student order through one
+cursor), so memory stays bounded by the number of exams plus one output
+chunk however many people are exported (a zip also keeps its small
+central-directory record per file). Formats:
+
+- ``csv``: one file with a row per (person, exam)
+- ``zip``: one CSV or iCalendar (``.ics``) file per person
+"""
+
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime, timedelta, timezone
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+AUDIENCES = ('students', 'professors')
+FORMATS = ('csv', 'zip')
+FILE_FORMATS = ('csv', 'ics')
+
+CSV_COLUMNS = [
+    'person_id', 'course_id', 'course_name', 'professor_id',
+    'day', 'time', 'timeslot_id', 'room_id'
+]
+
+# Yield to the client once this many bytes are buffered
+CHUNK_SIZE = 64 * 1024
+
+# Exam length when a timeslot only gives a start time
+DEFAULT_EXAM_HOURS = 3
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+
+def iter_timetables(
+    entries: List[Dict],
+    audience: str,
+    enrollments: Optional[Iterable[Tuple[str, str]]] = None
+) -> Iterator[Tuple[str, List[Dict]]]:
+    """
+    Yield ``(person_id, exams)`` one person at a time
+    ``entries`` must be in timeslot order. Students come from ``enrollments``
+    sorted by student ID; professors from the schedule itself.
+    """
+    if audience == 'professors':
+        by_professor: Dict[str, List[Dict]] = {}
+        for entry in entries:
+            if entry.get('professor_id'):
+                by_professor.setdefault(entry['professor_id'], []).append(entry)
+        yield from sorted(by_professor.items())
+        return
+
+    position = {entry['course_id']: i for i, entry in enumerate(entries)}
+    for student_id, rows in groupby(enrollments, key=itemgetter(0)):
+        exams = sorted(position[c] for _, c in rows if c in position)
+        if exams:
+            yield student_id, [entries[i] for i in exams]
+
+
+def _csv_row(person_id: str, entry: Dict) -> List:
+    return [person_id] + [entry.get(column, '') for column in CSV_COLUMNS[1:]]
+
+
+def stream_csv(timetables: Iterable[Tuple[str, List[Dict]]]) -> Iterator[bytes]:
+    """All timetables as one CSV, yielded in chunks of about CHUNK_SIZE bytes"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for person_id, exams in timetables:
+        for entry in exams:
+            writer.writerow(_csv_row(person_id, entry))
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def timetable_csv(person_id: str, exams: List[Dict]) -> str:
+    """CSV file of one person's exams"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for entry in exams:
+        writer.writerow(_csv_row(person_id, entry))
+    return buffer.getvalue()
+
+
+class ExamCalendar:
+    """
+    Maps schedule days and times to real dates for iCalendar export
+    Days may be weekday names (placed in the week starting at
+    ``start_date``), dates in ``dd:mm:yyyy`` or ISO form, or any other label
+    (numbered consecutively from ``start_date`` in timeslot order)
+    """
+
+    def __init__(self, days: List[str], start_date: date):
+        self.start_date = start_date
+        self.day_dates: Dict[str, date] = {}
+        for offset, day in enumerate(dict.fromkeys(days)):
+            self.day_dates[day] = self._parse_day(day, offset)
+
+    def _parse_day(self, day: str, offset: int) -> date:
+        name = day.strip().lower()
+        if name in WEEKDAYS:
+            ahead = (WEEKDAYS.index(name) - self.start_date.weekday()) % 7
+            return self.start_date + timedelta(days=ahead)
+        for pattern in ('%d:%m:%Y', '%Y-%m-%d', '%d/%m/%Y'):
+            try:
+                return datetime.strptime(day.strip(), pattern).date()
+            except ValueError:
+                pass
+        return self.start_date + timedelta(days=offset)
+
+    def span(self, entry: Dict) -> Tuple[Optional[datetime], Optional[datetime], date]:
+        """Start and end of an exam, or ``(None, None, day)`` when the time is unknown"""
+        day = self.day_dates.get(entry['day'], self.start_date)
+        times = re.findall(r'(\d{1,2}):(\d{2})', entry.get('time') or '')
+        if not times:
+            return None, None, day
+        start = datetime.combine(day, datetime.min.time()).replace(
+            hour=int(times[0][0]), minute=int(times[0][1])
+        )
+        if len(times) > 1 and (int(times[1][0]), int(times[1][1])) > (start.hour, start.minute):
+            end = start.replace(hour=int(times[1][0]), minute=int(times[1][1]))
+        else:
+            end = start + timedelta(hours=DEFAULT_EXAM_HOURS)
+        return start, end, day
+
+
+def _ics_text(value) -> str:
+    return (str(value).replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\n', '\\n'))
+
+
+def timetable_ics(
+    person_id: str,
+    exams: List[Dict],
+    calendar: ExamCalendar,
+    schedule_id: int,
+    stamp: Optional[datetime] = None
+) -> str:
+    """iCalendar file of one person's exams (floating local times)"""
+    stamp = (stamp or datetime.now(timezone.utc)).strftime('%Y%m%dT%H%M%SZ')
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//SmartExam Scheduler//Exam Timetable//EN',
+        'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:{_ics_text(f"Exams {person_id}")}',
+    ]
+    for entry in exams:
+        start, end, day = calendar.span(entry)
+        if start is None:
+            timing = [f'DTSTART;VALUE=DATE:{day:%Y%m%d}',
+                      f'DTEND;VALUE=DATE:{day + timedelta(days=1):%Y%m%d}']
+        else:
+            timing = [f'DTSTART:{start:%Y%m%dT%H%M%S}', f'DTEND:{end:%Y%m%dT%H%M%S}']
+        lines += [
+            'BEGIN:VEVENT',
+            f'UID:{_ics_text(entry["course_id"])}-{schedule_id}@smartexam',
+            f'DTSTAMP:{stamp}',
+            *timing,
+            f'SUMMARY:{_ics_text(entry["course_id"] + " " + entry.get("course_name", ""))}',
+            f'LOCATION:{_ics_text(entry["room_id"])}',
+            'END:VEVENT',
+        ]
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(lines) + '\r\n'
+
+
+class _ChunkBuffer:
+    """Write-only, unseekable file object: zipfile streams into it"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks, self.size = [], 0
+        return data
+
+
+def stream_zip(files: Iterable[Tuple[str, str]]) -> Iterator[bytes]:
+    """Zip archive of ``(name, text)`` files, yielded as it is written"""
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, text in files:
+            archive.writestr(name, text)
+            if buffer.size >= CHUNK_SIZE:
+                yield buffer.take()
+    yield buffer.take()
+
+
+def export_timetables(
+    schedule_id: int,
+    entries: List[Dict],
+    audience: str,
+    fmt: str = 'csv',
+    file_format: str = 'csv',
+    enrollments: Optional[Iterable[Tuple[str, str]]] = None,
+    start_date: Optional[date] = None,
+    days: Optional[List[str]] = None
+) -> Iterator[bytes]:
+    """
+    Byte chunks of the requested export
+    ``entries`` must be in timeslot order; ``days`` (every timeslot's day,
+    in order) numbers day labels that are neither weekdays nor dates
+    """
+    if audience not in AUDIENCES:
+        raise ValueError(f"audience must be one of {AUDIENCES}")
+    if fmt not in FORMATS or file_format not in FILE_FORMATS:
+        raise ValueError(f"format must be one of {FORMATS}, file_format one of {FILE_FORMATS}")
+    timetables = iter_timetables(entries, audience, enrollments)
+    if fmt == 'csv':
+        return stream_csv(timetables)
+
+    if file_format == 'ics':
+        calendar = ExamCalendar(days or [e['day'] for e in entries], start_date or date.today())
+        stamp = datetime.now(timezone.utc)
+        files = (
+            (f"{audience}/{person_id}.ics", timetable_ics(person_id, exams, calendar, schedule_id, stamp))
+            for person_id, exams in timetables
+        )
+    else:
+        files = (
+            (f"{audience}/{person_id}.csv", timetable_csv(person_id, exams))
+            for person_id, exams in timetables
+        )
+    return stream_zip(files)
@@ -3,11 +3,57 @@ Genetic Algorithm for Exam Timetabling Optimization
 Implements a metaheuristic approach to solve the university exam scheduling problem
 """
 
-import random
+import time
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 from dataclasses import dataclass
-from copy import deepcopy
+
+from .constraints import ConstraintState
+from .distributed import Broker
+from .instrumentation import PhaseTimer, profiled, summarize_timings
+from .problem import CompiledProblem, compile_problem
+from .rng import make_seed_sequence, spawn_generators
+from .warm_start import WarmStart
+
+
+MUTATION_MODES = ('uniform', 'directed')
+
+# 'direct' genes carry a room and a slot; 'slot' genes carry only the slot
+# and rooms are packed per slot by CompiledProblem.pack_rooms
+ENCODINGS = ('direct', 'slot')
+
+# Share of the mutation budget steered towards conflicting genes in
+# 'directed' mode; the rest stays uniform so every gene remains reachable
+DIRECTED_SHARE = 0.8
+
+# Adaptive rates: 1/5th success rule for mutation, success comparison for crossover
+TARGET_SUCCESS_RATE = 0.2
+MUTATION_ADAPT_FACTOR = 0.85
+CROSSOVER_ADAPT_STEP = 0.02
+CROSSOVER_RATE_BOUNDS = (0.3, 0.95)
+MAX_MUTATION_RATE = 0.5
+
+# Offspring identical to a member of the population are dropped before
+# evaluation, at most DUPLICATE_BUDGET x population_size per generation;
+# past that the population has converged and duplicates are let through
+# until the next generation (or a restart brings diversity back)
+DUPLICATE_BUDGET = 1.0
+
+# Partial restarts: after RESTART_GENERATIONS without improvement, or once
+# the mean Hamming distance drops below RESTART_MIN_DIVERSITY of the movable
+# exams (at most every RESTART_COOLDOWN generations), the worst RESTART_SHARE
+# of the non-elite population is replaced by random and heuristic newcomers
+RESTART_GENERATIONS = 30
+RESTART_MIN_DIVERSITY = 0.02
+RESTART_COOLDOWN = 10
+RESTART_SHARE = 0.5
+# Heuristic newcomers also re-draw this share of the best's conflict-free exams
+RESTART_NOISE = 0.1
+
+# Offspring differing from the current best in at most this share of the
+# exams are scored by the delta kernels (ConstraintState) rather than a full
+# evaluation; past about 4% of the exams replaying moves costs more
+DELTA_MOVE_SHARE = 0.03
 
 
 @dataclass
@@ -34,260 +80,632 @@ class Room:
     capacity: int
 
 
-@dataclass
-class ScheduleGene:
-    """Represents a single scheduling decision (exam -> room + timeslot)"""
-    exam: Exam
-    room: Room
-    timeslot: TimeSlot
-
-
 class Timetable:
-    """Represents a complete exam timetable (chromosome in GA terms)"""
+    """
+    Represents a complete exam timetable (chromosome in GA terms)
+    Gene ``i`` assigns exam ``i`` to room ``rooms[i]`` and timeslot ``slots[i]``
+    (indexes into the compiled problem)
+    """
     
-    def __init__(self, genes: List[ScheduleGene]):
-        self.genes = genes
+    def __init__(self, problem: CompiledProblem, rooms: np.ndarray, slots: np.ndarray):
+        self.problem = problem
+        self.rooms = rooms
+        self.slots = slots
         self.fitness = 0
         self.hard_conflicts = 0
         self.soft_conflict_score = 0
+        self.moved_exams = 0
+        self.unplaced: Optional[np.ndarray] = None
+        # Per-gene penalty (directed mutation) and the better parent's
+        # fitness plus how the child was made (rate adaptation)
+        self.conflicts: Optional[np.ndarray] = None
+        self.parent_fitness: Optional[float] = None
+        self.from_crossover = False
+    
+    def copy(self) -> 'Timetable':
+        """Copy the assignment arrays and the scores, sharing the problem"""
+        clone = Timetable(self.problem, self.rooms.copy(), self.slots.copy())
+        clone.fitness = self.fitness
+        clone.hard_conflicts = self.hard_conflicts
+        clone.soft_conflict_score = self.soft_conflict_score
+        clone.moved_exams = self.moved_exams
+        clone.unplaced = self.unplaced
+        clone.conflicts = self.conflicts
+        return clone
     
-    def calculate_fitness(self) -> float:
+    def calculate_fitness(self, per_exam: bool = False) -> float:
         """
         Calculate the fitness of this timetable
         Lower score is better
         Hard constraints have extreme penalties
         """
-        hard_penalty = 0
-        soft_penalty = 0
-        
-        # Check hard constraints
-        # 1. No student in two exams at the same time
-        student_schedule = {}
-        for gene in self.genes:
-            timeslot_key = f"{gene.timeslot.day}_{gene.timeslot.time}"
-            
-            for student_id in gene.exam.enrolled_students:
-                if student_id in student_schedule:
-                    if timeslot_key in student_schedule[student_id]:
-                        hard_penalty += 10000  # Massive penalty
-                        self.hard_conflicts += 1
-                    else:
-                        student_schedule[student_id].add(timeslot_key)
-                else:
-                    student_schedule[student_id] = {timeslot_key}
-        
-        # 2. Room capacity check
-        for gene in self.genes:
-            if len(gene.exam.enrolled_students) > gene.room.capacity:
-                hard_penalty += 5000  # Large penalty for capacity violation
-        
-        # 3. No room double-booking
-        room_schedule = {}
-        for gene in self.genes:
-            key = f"{gene.room.room_id}_{gene.timeslot.day}_{gene.timeslot.time}"
-            if key in room_schedule:
-                hard_penalty += 8000  # Severe penalty
-            else:
-                room_schedule[key] = True
-        
-        # Check soft constraints
-        # 1. Minimize back-to-back exams for students
-        for student_id, slots in student_schedule.items():
-            slots_list = sorted(list(slots))
-            for i in range(len(slots_list) - 1):
-                # Simple heuristic: if slots are on same day, check if back-to-back
-                # This is simplified - in production, would parse actual times
-                if slots_list[i].split('_')[0] == slots_list[i+1].split('_')[0]:
-                    soft_penalty += 50
-        
-        # 2. Prefer filling rooms efficiently (not too empty, not overcrowded)
-        for gene in self.genes:
-            utilization = len(gene.exam.enrolled_students) / gene.room.capacity
-            if utilization < 0.5:
-                soft_penalty += 20  # Room too empty
-            elif utilization > 0.95:
-                soft_penalty += 30  # Room too crowded
-        
-        # 3. Spread exams evenly across time slots
-        slot_usage = {}
-        for gene in self.genes:
-            key = f"{gene.timeslot.day}_{gene.timeslot.time}"
-            slot_usage[key] = slot_usage.get(key, 0) + 1
-        
-        # Penalize overused slots
-        for count in slot_usage.values():
-            if count > 3:
-                soft_penalty += count * 10
-        
-        self.hard_conflicts = hard_penalty // 10000
-        self.soft_conflict_score = soft_penalty
-        self.fitness = hard_penalty + soft_penalty
-        
+        if per_exam:
+            self.fitness, self.hard_conflicts, self.soft_conflict_score, self.conflicts = \
+                self.problem.evaluate(self.rooms, self.slots, per_exam=True)
+        else:
+            self.fitness, self.hard_conflicts, self.soft_conflict_score = \
+                self.problem.evaluate(self.rooms, self.slots)
         return self.fitness
 
 
 class GeneticAlgorithm:
     """
     Genetic Algorithm for Exam Timetabling
+    Either pass ``exams``/``rooms``/``timeslots`` objects or an already
+    compiled ``problem`` (see ``from_problem``)
     """
     
     def __init__(
         self,
-        exams: List[Exam],
-        rooms: List[Room],
-        timeslots: List[TimeSlot],
+        exams: Optional[List[Exam]] = None,
+        rooms: Optional[List[Room]] = None,
+        timeslots: Optional[List[TimeSlot]] = None,
         population_size: int = 100,
         generations: int = 1000,
         crossover_rate: float = 0.8,
         mutation_rate: float = 0.2,
-        elitism_count: int = 5
+        elitism_count: int = 5,
+        seed: Optional[int] = None,
+        seed_sequence: Optional[np.random.SeedSequence] = None,
+        problem: Optional[CompiledProblem] = None,
+        profile_dir: Optional[str] = None,
+        warm_start: Optional[WarmStart] = None,
+        perturbation_weight: int = 100,
+        stall_generations: Optional[int] = None,
+        mutation_mode: str = 'uniform',
+        adaptive_rates: bool = False,
+        encoding: str = 'direct',
+        time_limit: Optional[float] = None,
+        broker: Optional[Broker] = None,
+        evaluation_batch_size: int = 8,
+        restart_generations: Optional[int] = RESTART_GENERATIONS,
+        restart_diversity: float = RESTART_MIN_DIVERSITY,
+        delta_move_share: float = DELTA_MOVE_SHARE
     ):
+        if mutation_mode not in MUTATION_MODES:
+            raise ValueError(f"mutation_mode must be one of {MUTATION_MODES}")
+        if encoding not in ENCODINGS:
+            raise ValueError(f"encoding must be one of {ENCODINGS}")
+        
         self.exams = exams
         self.rooms = rooms
         self.timeslots = timeslots
+        self.problem = problem if problem is not None else compile_problem(exams, rooms, timeslots)
         self.population_size = population_size
         self.generations = generations
         self.crossover_rate = crossover_rate
         self.mutation_rate = mutation_rate
         self.elitism_count = elitism_count
+        self.stall_generations = stall_generations
+        # Wall-clock budget in seconds; generations then only caps the run
+        self.time_limit = time_limit
+        
+        # 'directed' mutation samples genes in proportion to the penalty they
+        # take part in; adaptive_rates tunes both rates from offspring success
+        self.mutation_mode = mutation_mode
+        self.adaptive_rates = adaptive_rates
+        self.success_rate: Optional[float] = None
+        self.encoding = encoding
+        
+        # Optional remote evaluation: population scored in batches by a broker
+        self.broker = broker
+        self.evaluation_batch_size = evaluation_batch_size
+        
+        # Duplicate offspring are rejected by chromosome hash; stalls and
+        # diversity collapse trigger partial restarts (None disables them)
+        self.restart_generations = restart_generations
+        self.restart_diversity = restart_diversity
+        self.population_keys: set = set()
+        self.duplicates_rejected = 0
+        self.restarts = 0
+        self._duplicate_budget = int(DUPLICATE_BUDGET * population_size)
+        
+        # Warm start: seed from a published schedule, only move touched exams
+        # and pay perturbation_weight per exam moved away from it
+        self.warm_start = warm_start
+        self.perturbation_weight = perturbation_weight
+        self.mutable = warm_start.touched if warm_start is not None else None
+        
+        # Incremental scoring around the current best (uniform mode only:
+        # directed mutation needs every offspring's per-exam penalties);
+        # a share of 0 disables it
+        self.delta_moves = int(delta_move_share * self.problem.num_exams)
+        self.use_delta = delta_move_share > 0 and mutation_mode == 'uniform'
+        self.delta_state: Optional[ConstraintState] = None
+        
+        # Each run owns its RNG stream; islands/workers receive a spawned
+        # child sequence so they never share state with their parent
+        self.seed_sequence = seed_sequence or make_seed_sequence(seed)
+        self.seed = self.seed_sequence.entropy
+        self.rng = np.random.default_rng(self.seed_sequence)
         
         self.population: List[Timetable] = []
         self.best_solution: Timetable = None
         self.generation_history: List[Dict] = []
+        self.evaluations = 0
+        
+        # Per-generation phase timings; cProfile dump only when profile_dir is set
+        self.timer = PhaseTimer()
+        self.timing_history: List[Dict] = []
+        self.profile_dir = profile_dir
+        self.profile_path: Optional[str] = None
+    
+    @classmethod
+    def from_problem(cls, problem: CompiledProblem, **kwargs) -> 'GeneticAlgorithm':
+        """Build a GA directly over a compiled problem"""
+        return cls(problem=problem, **kwargs)
+    
+    def spawn_rngs(self, n: int) -> List[np.random.Generator]:
+        """Independent RNG streams for ``n`` parallel workers or islands"""
+        return spawn_generators(self.seed_sequence, n)
     
     def initialize_population(self):
         """Create initial random population of timetables"""
         self.population = []
         
+        n = self.problem.num_exams
+        
+        if self.warm_start is not None:
+            self._initialize_from_warm_start()
+            return
+        
         for _ in range(self.population_size):
-            genes = []
-            for exam in self.exams:
-                # Randomly assign room and timeslot
-                room = random.choice(self.rooms)
-                timeslot = random.choice(self.timeslots)
-                genes.append(ScheduleGene(exam, room, timeslot))
-            
-            timetable = Timetable(genes)
-            self.population.append(timetable)
+            # Randomly assign room and timeslot
+            rooms = self.rng.integers(self.problem.num_rooms, size=n)
+            slots = self.rng.integers(self.problem.num_slots, size=n)
+            self.population.append(Timetable(self.problem, rooms, slots))
+    
+    def _initialize_from_warm_start(self):
+        """
+        Seed the population around the published schedule
+        The first individual is the published schedule itself (with unplaced
+        exams assigned at random); the others also re-draw about half of the
+        touched exams
+        """
+        ws = self.warm_start
+        unplaced = ~ws.original
+        
+        for i in range(self.population_size):
+            redraw = unplaced.copy()
+            if i > 0:
+                redraw |= ws.touched & (self.rng.random(len(ws.touched)) < 0.5)
+            rooms = ws.rooms.copy()
+            slots = ws.slots.copy()
+            rooms[redraw] = self.rng.integers(self.problem.num_rooms, size=int(redraw.sum()))
+            slots[redraw] = self.rng.integers(self.problem.num_slots, size=int(redraw.sum()))
+            self.population.append(Timetable(self.problem, rooms, slots))
     
     def evaluate_population(self):
         """Calculate fitness for all timetables in population"""
-        for timetable in self.population:
-            timetable.calculate_fitness()
+        if self.broker is not None:
+            genes = [(t.rooms, t.slots) for t in self.population]
+            for timetable, result in zip(self.population,
+                                         self.broker.map(genes, self.evaluation_batch_size)):
+                self.apply_result(timetable, result)
+        else:
+            for timetable in self.population:
+                self.evaluate(timetable)
+        self.evaluations += len(self.population)
+        self.timer.count_evaluations(len(self.population))
+        if self.adaptive_rates:
+            self.adapt_rates()
         
         # Sort by fitness (lower is better)
         self.population.sort(key=lambda t: t.fitness)
         
         # Update best solution
         if self.best_solution is None or self.population[0].fitness < self.best_solution.fitness:
-            self.best_solution = deepcopy(self.population[0])
+            self.best_solution = self.population[0].copy()
+        self.update_delta_state(self.population[0])
+    
+    def update_delta_state(self, timetable: Timetable):
+        """Re-centre the delta kernels on ``timetable`` unless they already are"""
+        if not self.use_delta or self.broker is not None:
+            return
+        state = self.delta_state
+        if (state is None or not np.array_equal(state.rooms, timetable.rooms)
+                or not np.array_equal(state.slots, timetable.slots)):
+            self.delta_state = ConstraintState(self.problem, timetable.rooms, timetable.slots)
+    
+    def evaluate(self, timetable: Timetable):
+        """Decode (slot encoding) and score one timetable, including the perturbation term"""
+        if self.encoding == 'slot':
+            # Rooms are a pure function of the slots: decode before scoring
+            timetable.rooms, timetable.unplaced = self.problem.pack_rooms(timetable.slots)
+        scores = None
+        if self.delta_state is not None:
+            scores = self.delta_state.score_nearby(timetable.rooms, timetable.slots, self.delta_moves)
+        if scores is None:
+            timetable.calculate_fitness(self.mutation_mode == 'directed')
+        else:
+            timetable.fitness, timetable.hard_conflicts, timetable.soft_conflict_score = scores
+        if self.warm_start is not None:
+            timetable.moved_exams = int(self.warm_start.moved(timetable.rooms, timetable.slots).sum())
+            timetable.fitness += self.perturbation_weight * timetable.moved_exams
+    
+    def apply_result(self, timetable: Timetable, result: Tuple):
+        """Copy a remotely computed score (see ``distributed.evaluate_genes``) onto ``timetable``"""
+        (timetable.fitness, timetable.hard_conflicts, timetable.soft_conflict_score,
+         timetable.moved_exams, timetable.rooms, timetable.unplaced,
+         timetable.conflicts) = result
+    
+    def evaluator_options(self) -> Dict:
+        """Options a remote worker needs to score exactly like ``evaluate``"""
+        return {
+            'encoding': self.encoding,
+            'mutation_mode': self.mutation_mode,
+            'warm_start': self.warm_start,
+            'perturbation_weight': self.perturbation_weight,
+        }
+    
+    def adapt_rates(self, children: Optional[List[Timetable]] = None):
+        """
+        Adjust operator rates from how often offspring beat their better parent
+        Mutation follows the 1/5th success rule: above a fifth the search is
+        too timid and the rate grows, below it the rate shrinks. Crossover
+        moves towards whichever of crossed or merely mutated children
+        succeeded more often this generation (or among ``children``).
+        """
+        if children is None:
+            children = [t for t in self.population if t.parent_fitness is not None]
+        if not children:
+            return
+        
+        success = np.array([t.fitness < t.parent_fitness for t in children])
+        crossed = np.array([t.from_crossover for t in children])
+        self.success_rate = float(success.mean())
+        
+        if self.success_rate > TARGET_SUCCESS_RATE:
+            self.mutation_rate /= MUTATION_ADAPT_FACTOR
+        elif self.success_rate < TARGET_SUCCESS_RATE:
+            self.mutation_rate *= MUTATION_ADAPT_FACTOR
+        self.mutation_rate = float(np.clip(
+            self.mutation_rate, 1.0 / max(self.problem.num_exams, 1), MAX_MUTATION_RATE
+        ))
+        
+        if crossed.any() and not crossed.all():
+            if success[crossed].mean() > success[~crossed].mean():
+                self.crossover_rate += CROSSOVER_ADAPT_STEP
+            elif success[crossed].mean() < success[~crossed].mean():
+                self.crossover_rate -= CROSSOVER_ADAPT_STEP
+            self.crossover_rate = float(np.clip(self.crossover_rate, *CROSSOVER_RATE_BOUNDS))
     
     def tournament_selection(self, tournament_size: int = 5) -> Timetable:
         """Select a timetable using tournament selection"""
-        tournament = random.sample(self.population, tournament_size)
-        return min(tournament, key=lambda t: t.fitness)
+        picks = self.rng.choice(len(self.population), size=tournament_size, replace=False)
+        return min((self.population[i] for i in picks), key=lambda t: t.fitness)
     
     def crossover(self, parent1: Timetable, parent2: Timetable) -> Tuple[Timetable, Timetable]:
         """
         Perform uniform crossover
         Randomly mix genes from both parents
         """
-        if random.random() > self.crossover_rate:
-            return deepcopy(parent1), deepcopy(parent2)
-        
-        # Uniform crossover
-        child1_genes = []
-        child2_genes = []
-        
-        for gene1, gene2 in zip(parent1.genes, parent2.genes):
-            if random.random() < 0.5:
-                child1_genes.append(deepcopy(gene1))
-                child2_genes.append(deepcopy(gene2))
-            else:
-                child1_genes.append(deepcopy(gene2))
-                child2_genes.append(deepcopy(gene1))
+        parent_fitness = min(parent1.fitness, parent2.fitness)
+        if self.rng.random() > self.crossover_rate:
+            child1, child2 = parent1.copy(), parent2.copy()
+            child1.parent_fitness = child2.parent_fitness = parent_fitness
+            return child1, child2
         
-        return Timetable(child1_genes), Timetable(child2_genes)
+        # Uniform crossover: each exam keeps its (room, timeslot) pair together
+        keep = self.rng.random(self.problem.num_exams) < 0.5
+        child1 = Timetable(
+            self.problem,
+            np.where(keep, parent1.rooms, parent2.rooms),
+            np.where(keep, parent1.slots, parent2.slots)
+        )
+        child2 = Timetable(
+            self.problem,
+            np.where(keep, parent2.rooms, parent1.rooms),
+            np.where(keep, parent2.slots, parent1.slots)
+        )
+        # Genes carry their parent's conflict estimate until re-evaluated
+        if parent1.conflicts is not None and parent2.conflicts is not None:
+            child1.conflicts = np.where(keep, parent1.conflicts, parent2.conflicts)
+            child2.conflicts = np.where(keep, parent2.conflicts, parent1.conflicts)
+        for child in (child1, child2):
+            child.parent_fitness = parent_fitness
+            child.from_crossover = True
+        return child1, child2
     
     def mutate(self, timetable: Timetable):
         """
         Mutate a timetable by randomly changing some assignments
         """
-        for gene in timetable.genes:
-            if random.random() < self.mutation_rate:
-                # Randomly change room or timeslot
-                if random.random() < 0.5:
-                    gene.room = random.choice(self.rooms)
-                else:
-                    gene.timeslot = random.choice(self.timeslots)
+        n = self.problem.num_exams
+        mutated = self.rng.random(n) < self.mutation_probabilities(timetable)
+        if self.mutable is not None:
+            mutated &= self.mutable
+        # Randomly change room or timeslot
+        room_move = mutated & (self.rng.random(n) < 0.5)
+        slot_move = mutated & ~room_move
+        if self.encoding == 'slot':
+            # Rooms are decoded, so room moves are no-ops; slots keep moving
+            # at the same per-gene rate as in the direct encoding
+            room_move[:] = False
+        timetable.rooms[room_move] = self.rng.integers(
+            self.problem.num_rooms, size=int(room_move.sum())
+        )
+        timetable.slots[slot_move] = self.rng.integers(
+            self.problem.num_slots, size=int(slot_move.sum())
+        )
+    
+    def mutation_probabilities(self, timetable: Timetable):
+        """
+        Per-gene mutation probability
+        Uniform mode uses ``mutation_rate`` everywhere. Directed mode keeps the
+        same expected number of mutated genes but hands DIRECTED_SHARE of them
+        out in proportion to each gene's penalty, so conflict-free exams are
+        rarely disturbed.
+        """
+        weights = timetable.conflicts
+        if self.mutation_mode != 'directed' or weights is None:
+            return self.mutation_rate
+        if self.mutable is not None:
+            weights = np.where(self.mutable, weights, 0)
+        total = weights.sum()
+        if total <= 0:
+            return self.mutation_rate
+        
+        movable = self.problem.num_exams if self.mutable is None else int(self.mutable.sum())
+        budget = self.mutation_rate * movable
+        directed = DIRECTED_SHARE * budget * weights / total
+        return np.minimum(directed + (1 - DIRECTED_SHARE) * self.mutation_rate, 1.0)
     
     def evolve(self, callback=None):
         """
         Main evolution loop
+        Runs under cProfile when ``profile_dir`` was given
         """
+        if self.broker is not None:
+            # Ships the problem to the workers once for this run
+            self.broker.start(self.problem, self.evaluator_options())
+        with profiled(self.profile_dir, f"ga-{self.seed}") as profile:
+            best = self._evolve(callback)
+        self.profile_path = profile['path']
+        return best
+    
+    def _evolve(self, callback=None):
         print("Initializing population...")
         self.initialize_population()
         
         print(f"Evolving for {self.generations} generations...")
         
+        timer = self.timer
+        timer.start_generation()
+        self._best_so_far, self._stalled, self._since_restart = None, 0, 0
+        self._started = time.perf_counter()
+        
         for generation in range(self.generations):
             # Evaluate current population
-            self.evaluate_population()
-            
-            # Track progress
-            best_fitness = self.population[0].fitness
-            avg_fitness = sum(t.fitness for t in self.population) / len(self.population)
-            
-            self.generation_history.append({
-                'generation': generation,
-                'best_fitness': best_fitness,
-                'avg_fitness': avg_fitness,
-                'hard_conflicts': self.population[0].hard_conflicts,
-                'soft_conflicts': self.population[0].soft_conflict_score
-            })
+            with timer.phase('evaluation'):
+                self.evaluate_population()
             
-            # Print progress
-            if generation % 50 == 0:
-                print(f"Generation {generation}: Best Fitness = {best_fitness:.2f}, "
-                      f"Hard Conflicts = {self.population[0].hard_conflicts}, "
-                      f"Soft Penalty = {self.population[0].soft_conflict_score}")
-            
-            # Callback for real-time updates
-            if callback:
-                callback(self.generation_history[-1])
-            
-            # Check for perfect solution
-            if self.population[0].hard_conflicts == 0 and self.population[0].soft_conflict_score < 500:
-                print(f"\nOptimal solution found at generation {generation}!")
+            if self.record_generation(generation, callback):
+                self.timing_history.append(timer.end_generation(generation))
                 break
             
             # Create next generation
             new_population = []
             
             # Elitism: keep best solutions
-            new_population.extend(deepcopy(t) for t in self.population[:self.elitism_count])
+            with timer.phase('copying'):
+                new_population.extend(t.copy() for t in self.population[:self.elitism_count])
+            seen = {self.chromosome_key(t) for t in new_population}
             
-            # Generate rest of population through crossover and mutation
+            # Generate rest of population through crossover and mutation,
+            # dropping offspring identical to an individual already in it
             while len(new_population) < self.population_size:
-                # Selection
-                parent1 = self.tournament_selection()
-                parent2 = self.tournament_selection()
-                
-                # Crossover
-                child1, child2 = self.crossover(parent1, parent2)
-                
-                # Mutation
-                self.mutate(child1)
-                self.mutate(child2)
-                
-                new_population.extend([child1, child2])
+                new_population.extend(self.reject_duplicates(self.breed(), seen))
             
             # Trim to population size
             self.population = new_population[:self.population_size]
+            self.timing_history.append(timer.end_generation(generation))
         
         # Final evaluation
         self.evaluate_population()
+        self.print_summary()
+        
+        return self.best_solution
+    
+    def breed(self) -> List[Timetable]:
+        """Select two parents and return their crossed, mutated children"""
+        timer = self.timer
+        
+        # Selection
+        with timer.phase('selection'):
+            parent1 = self.tournament_selection()
+            parent2 = self.tournament_selection()
+        
+        # Crossover
+        with timer.phase('crossover'):
+            child1, child2 = self.crossover(parent1, parent2)
+        
+        # Mutation
+        with timer.phase('mutation'):
+            self.mutate(child1)
+            self.mutate(child2)
+        
+        return [child1, child2]
+    
+    def record_generation(self, generation: int, callback=None) -> bool:
+        """
+        Log progress for a (sorted) population and report it to ``callback``
+        Returns True when a stopping condition is met; otherwise the
+        population may be partially restarted (see ``maybe_restart``)
+        """
+        # Track progress
+        best = self.population[0]
+        best_fitness = best.fitness
+        avg_fitness = sum(t.fitness for t in self.population) / len(self.population)
+        with self.timer.phase('diversity'):
+            unique, mean_hamming = self.diversity()
+        
+        self.generation_history.append({
+            'generation': generation,
+            'best_fitness': best_fitness,
+            'avg_fitness': avg_fitness,
+            'hard_conflicts': best.hard_conflicts,
+            'soft_conflicts': best.soft_conflict_score,
+            'mutation_rate': self.mutation_rate,
+            'crossover_rate': self.crossover_rate,
+            'success_rate': self.success_rate,
+            'unique_chromosomes': unique,
+            'mean_hamming': mean_hamming,
+            'restarted': False
+        })
+        
+        # Print progress
+        if generation % 50 == 0:
+            print(f"Generation {generation}: Best Fitness = {best_fitness:.2f}, "
+                  f"Hard Conflicts = {best.hard_conflicts}, "
+                  f"Soft Penalty = {best.soft_conflict_score}")
+        
+        # Callback for real-time updates
+        if callback:
+            callback(self.generation_history[-1])
+        
+        # Check for perfect solution
+        if best.hard_conflicts == 0 and best.soft_conflict_score < 500:
+            print(f"\nOptimal solution found at generation {generation}!")
+            return True
+        
+        # Stop once the best fitness has not improved for a while
+        if self._best_so_far is None or best_fitness < self._best_so_far:
+            self._best_so_far, self._stalled = best_fitness, 0
+        else:
+            self._stalled += 1
+        if self.stall_generations and self._stalled >= self.stall_generations:
+            print(f"\nNo improvement for {self._stalled} generations, stopping at {generation}")
+            return True
+        
+        if self.time_limit and time.perf_counter() - self._started >= self.time_limit:
+            print(f"\nTime limit of {self.time_limit}s reached at generation {generation}")
+            return True
+        
+        self.generation_history[-1]['restarted'] = self.maybe_restart(generation, mean_hamming)
+        self._duplicate_budget = int(DUPLICATE_BUDGET * self.population_size)
+        return False
+    
+    def chromosome_key(self, timetable: Timetable) -> int:
+        """Hash of the genes the search controls (only slots under the slot encoding)"""
+        if self.encoding == 'slot':
+            return hash(timetable.slots.tobytes())
+        return hash((timetable.rooms.tobytes(), timetable.slots.tobytes()))
+    
+    def reject_duplicates(self, children: List[Timetable], keys: set, add: bool = True) -> List[Timetable]:
+        """
+        Drop children whose chromosome is already in ``keys``, before they
+        are evaluated; accepted keys are added unless ``add`` is False
+        Nothing is rejected when no exam can move (every child is a copy)
+        or once this generation's rejection budget is spent
+        """
+        if self.mutable is not None and not self.mutable.any():
+            return children
+        accepted = []
+        for child in children:
+            key = self.chromosome_key(child)
+            if key in keys and self._duplicate_budget > 0:
+                self._duplicate_budget -= 1
+                self.duplicates_rejected += 1
+                continue
+            if add:
+                keys.add(key)
+            accepted.append(child)
+        return accepted
+    
+    def diversity(self) -> Tuple[int, float]:
+        """
+        Unique chromosomes and mean pairwise Hamming distance (exams placed
+        in a different room or slot) across the population
+        Pairs agreeing on exam ``e`` number sum C(c, 2) over the counts ``c``
+        of each (room, slot) value, so no pairwise comparison is needed
+        """
+        population = self.population
+        size = len(population)
+        unique = len({self.chromosome_key(t) for t in population})
+        if size < 2:
+            return unique, 0.0
+        
+        problem = self.problem
+        genes = np.stack([t.rooms * problem.num_slots + t.slots for t in population])
+        cells = genes + np.arange(problem.num_exams) * (problem.num_rooms * problem.num_slots)
+        _, counts = np.unique(cells, return_counts=True)
+        pairs = size * (size - 1) // 2
+        agreeing = int((counts * (counts - 1) // 2).sum())
+        return unique, (pairs * problem.num_exams - agreeing) / pairs
+    
+    def maybe_restart(self, generation: int, mean_hamming: float) -> bool:
+        """
+        Partially restart once improvement or diversity has stalled
+        Triggers after ``restart_generations`` without improvement (counted
+        from the last restart at the earliest), or when the mean Hamming
+        distance falls below ``restart_diversity`` of the movable exams
+        """
+        self._since_restart += 1
+        movable = self.problem.num_exams if self.mutable is None else int(self.mutable.sum())
+        if not self.restart_generations or movable == 0:
+            return False
+        
+        stalled = min(self._stalled, self._since_restart) >= self.restart_generations
+        converged = (self._since_restart >= RESTART_COOLDOWN
+                     and mean_hamming < self.restart_diversity * movable)
+        if not (stalled or converged):
+            return False
+        
+        with self.timer.phase('diversity'):
+            replaced = self.restart()
+        self._since_restart = 0
+        self.restarts += 1
+        reason = 'no improvement' if stalled else f'mean Hamming distance {mean_hamming:.2f}'
+        print(f"Restart at generation {generation} ({reason}): replaced {replaced} individuals")
+        return True
+    
+    def restart(self) -> int:
+        """
+        Replace the worst RESTART_SHARE of the non-elite population
+        Half of the newcomers re-draw every movable exam at random; the other
+        half re-draw the best timetable's penalized exams (plus RESTART_NOISE
+        of the rest) and pack their rooms largest-first into the new slots.
+        Returns the number of individuals replaced.
+        """
+        population = self.population
+        count = int(RESTART_SHARE * (len(population) - max(1, self.elitism_count)))
+        if count <= 0:
+            return 0
+        
+        problem = self.problem
+        n = problem.num_exams
+        best = population[0]
+        movable = np.ones(n, dtype=bool) if self.mutable is None else self.mutable
+        penalized = problem.evaluate(best.rooms, best.slots, per_exam=True)[3] > 0
+        
+        newcomers = []
+        for i in range(count):
+            rooms, slots = best.rooms.copy(), best.slots.copy()
+            heuristic = i % 2 == 1
+            redraw = movable & (penalized | (self.rng.random(n) < RESTART_NOISE)) if heuristic else movable
+            slots[redraw] = self.rng.integers(problem.num_slots, size=int(redraw.sum()))
+            if heuristic and self.encoding == 'direct':
+                rooms[redraw] = problem.pack_rooms(slots)[0][redraw]
+            else:
+                rooms[redraw] = self.rng.integers(problem.num_rooms, size=int(redraw.sum()))
+            newcomers.append(Timetable(problem, rooms, slots))
+        
+        survivors = population[:len(population) - count]
+        newcomers = self.reject_duplicates(newcomers, {self.chromosome_key(t) for t in survivors})
+        for timetable in newcomers:
+            self.evaluate(timetable)
+        self.evaluations += len(newcomers)
+        self.timer.count_evaluations(len(newcomers))
         
+        self.population = survivors + newcomers + population[len(survivors) + len(newcomers):]
+        self.population.sort(key=lambda t: t.fitness)
+        self.population_keys = {self.chromosome_key(t) for t in self.population}
+        if self.population[0].fitness < self.best_solution.fitness:
+            self.best_solution = self.population[0].copy()
+        return len(newcomers)
+    
+    def print_summary(self):
         print("\n" + "="*60)
         print("OPTIMIZATION COMPLETE")
         print("="*60)
@@ -295,35 +713,57 @@ class GeneticAlgorithm:
         print(f"Hard Conflicts: {self.best_solution.hard_conflicts}")
         print(f"Soft Conflict Score: {self.best_solution.soft_conflict_score}")
         print("="*60)
-        
-        return self.best_solution
     
     def get_schedule_dict(self) -> Dict:
         """Convert best solution to dictionary format for API response"""
         if not self.best_solution:
             return {}
         
+        problem = self.problem
         schedule = []
-        for gene in self.best_solution.genes:
+        for i, (r, t) in enumerate(zip(self.best_solution.rooms.tolist(),
+                                       self.best_solution.slots.tolist())):
             schedule.append({
-                'course_id': gene.exam.course_id,
-                'course_name': gene.exam.course_name,
-                'professor_id': gene.exam.professor_id,
-                'room_id': gene.room.room_id,
-                'room_capacity': gene.room.capacity,
-                'timeslot_id': gene.timeslot.slot_id,
-                'day': gene.timeslot.day,
-                'time': gene.timeslot.time,
-                'enrolled_count': len(gene.exam.enrolled_students)
+                'course_id': problem.exam_ids[i],
+                'course_name': problem.exam_names[i],
+                'professor_id': problem.professor_ids[i],
+                'room_id': problem.room_ids[r],
+                'room_capacity': int(problem.room_capacity[r]),
+                'timeslot_id': problem.slot_ids[t],
+                'day': problem.slot_days[t],
+                'time': problem.slot_times[t],
+                'enrolled_count': int(problem.exam_size[i])
             })
         
+        metrics = {
+            'fitness': self.best_solution.fitness,
+            'hard_conflicts': self.best_solution.hard_conflicts,
+            'soft_conflict_score': self.best_solution.soft_conflict_score,
+            'total_exams': problem.num_exams,
+            'constraints': problem.constraint_costs(self.best_solution.rooms, self.best_solution.slots)
+        }
+        if self.warm_start is not None:
+            # Report the schedule's own fitness; the perturbation term only steers the search
+            metrics['fitness'] -= self.perturbation_weight * self.best_solution.moved_exams
+            metrics['moved_exams'] = self.best_solution.moved_exams
+            metrics['touched_exams'] = self.warm_start.num_touched
+            metrics['change_reasons'] = self.warm_start.reasons
+        if self.encoding == 'slot':
+            unplaced = np.flatnonzero(self.best_solution.unplaced).tolist()
+            metrics['unplaceable_exams'] = [problem.exam_ids[i] for i in unplaced]
+        
         return {
             'schedule': schedule,
-            'metrics': {
-                'fitness': self.best_solution.fitness,
-                'hard_conflicts': self.best_solution.hard_conflicts,
-                'soft_conflict_score': self.best_solution.soft_conflict_score,
-                'total_exams': len(self.exams)
+            'metrics': metrics,
+            'seed': str(self.seed),
+            'history': self.generation_history,
+            'diversity': {
+                'duplicates_rejected': self.duplicates_rejected,
+                'restarts': self.restarts
             },
-            'history': self.generation_history
+            'instrumentation': {
+                'summary': summarize_timings(self.timing_history),
+                'generations': self.timing_history,
+                'profile_path': self.profile_path
+            }
         }
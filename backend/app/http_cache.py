@@ -0,0 +1,158 @@
+"""
+HTTP response caching for SmartExam Scheduler
+Saved schedules never change and reference data only changes on import, so
+their responses are serialized once and kept as bytes (plus a gzip copy)
+in a small in-memory LRU. Clients revalidate with ETag / Last-Modified and
+get a 304, usually without a database query.
+"""
+
+import gzip
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Hashable, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from .metrics import response_cache_lookups
+
+# Rows per json.dumps call when encoding large listings
+JSON_CHUNK_ROWS = 2000
+
+# Bodies smaller than this are not worth compressing
+GZIP_MIN_BYTES = 1024
+
+# Browsers may keep a copy but must revalidate it
+CACHE_CONTROL = "no-cache"
+
+
+def encode_json(payload: Dict) -> bytes:
+    """
+    Encode a response body, long lists a slice at a time
+    json.dumps holds the GIL for the whole call; encoding 80k enrollments in
+    one go would stall the event loop for ~100 ms even from a worker thread.
+    """
+    parts = []
+    for key, value in payload.items():
+        if isinstance(value, list) and len(value) > JSON_CHUNK_ROWS:
+            slices = (
+                json.dumps(value[i:i + JSON_CHUNK_ROWS])[1:-1]
+                for i in range(0, len(value), JSON_CHUNK_ROWS)
+            )
+            encoded = f"[{', '.join(slices)}]"
+        else:
+            encoded = json.dumps(value)
+        parts.append(f"{json.dumps(key)}: {encoded}")
+    return f"{{{', '.join(parts)}}}".encode()
+
+
+def encode_schedule(row: Dict) -> bytes:
+    """``{"success": true, "schedule": ...}`` around a stored schedule, splicing
+    the stored ``schedule_data`` JSON in without decoding it"""
+    fields = {k: v for k, v in row.items() if k != 'schedule_data'}
+    schedule = f'{json.dumps(fields)[:-1]}, "schedule_data": {row["schedule_data"]}}}'
+    return f'{{"success": true, "schedule": {schedule}}}'.encode()
+
+
+def sqlite_timestamp(value: str) -> float:
+    """Unix time of a SQLite CURRENT_TIMESTAMP value (UTC)"""
+    return datetime.strptime(value, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc).timestamp()
+
+
+class CachedBody:
+    """Serialized response body with its validators"""
+
+    __slots__ = ('body', 'gzipped', 'etag', 'last_modified')
+
+    def __init__(self, body: bytes, etag: str, last_modified: float):
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None
+        self.etag = etag
+        self.last_modified = int(last_modified)
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzipped or b'')
+
+
+class ResponseCache:
+    """
+    LRU cache of CachedBody objects bounded by total size, safe to share
+    between request threads
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[Hashable, CachedBody]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[CachedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        response_cache_lookups.inc(1, 'miss' if entry is None else 'hit')
+        return entry
+
+    def put(self, key: Hashable, entry: CachedBody) -> CachedBody:
+        if entry.size > self.max_bytes:
+            return entry
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[float] = None) -> bool:
+    """Whether the client's copy is current (If-None-Match wins over If-Modified-Since)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag in tags or "*" in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def not_modified_response(etag: str, last_modified: Optional[float] = None) -> Response:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(int(last_modified), usegmt=True)
+    return Response(status_code=304, headers=headers)
+
+
+def cached_response(request: Request, entry: CachedBody) -> Response:
+    """304 when the client is current, otherwise the cached bytes (gzip when accepted)"""
+    if is_not_modified(request, entry.etag, entry.last_modified):
+        return not_modified_response(entry.etag, entry.last_modified)
+
+    headers = {
+        "ETag": entry.etag,
+        "Last-Modified": formatdate(entry.last_modified, usegmt=True),
+        "Cache-Control": CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+    body = entry.body
+    if entry.gzipped is not None and "gzip" in request.headers.get("accept-encoding", ""):
+        body = entry.gzipped
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type="application/json", headers=headers)
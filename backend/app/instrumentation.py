@@ -0,0 +1,100 @@
+"""
+Run instrumentation for SmartExam Scheduler
+Per-generation phase timings for the optimizers and an opt-in cProfile hook
+"""
+
+import cProfile
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+
+PHASES = ('evaluation', 'selection', 'crossover', 'mutation', 'copying', 'diversity')
+
+
+class PhaseTimer:
+    """
+    Accumulates wall time per phase within one generation
+    ``sys.getallocatedblocks`` is sampled at the generation boundaries, which
+    gives the net number of live allocations the generation added at
+    practically no cost
+    """
+
+    def __init__(self):
+        self.start_generation()
+
+    def start_generation(self):
+        """Reset the accumulators at the start of a generation"""
+        self.totals = dict.fromkeys(PHASES, 0.0)
+        self._started = time.perf_counter()
+        self._blocks = sys.getallocatedblocks()
+        self._evaluations = 0
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the enclosed block under ``name``"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[name] += time.perf_counter() - start
+
+    def count_evaluations(self, n: int):
+        self._evaluations += n
+
+    def end_generation(self, generation: int) -> Dict:
+        """Close the generation and return its timing record"""
+        elapsed = time.perf_counter() - self._started
+        record = {
+            'generation': generation,
+            'seconds': elapsed,
+            'phases': dict(self.totals),
+            'evaluations': self._evaluations,
+            'evaluations_per_sec': self._evaluations / elapsed if elapsed > 0 else 0.0,
+            'allocated_blocks': sys.getallocatedblocks() - self._blocks,
+        }
+        self.start_generation()
+        return record
+
+
+def summarize_timings(timings: List[Dict]) -> Dict:
+    """Aggregate per-generation records into run totals and phase shares"""
+    total = sum(t['seconds'] for t in timings)
+    phases = {name: sum(t['phases'][name] for t in timings) for name in PHASES}
+    evaluations = sum(t['evaluations'] for t in timings)
+    return {
+        'generations': len(timings),
+        'seconds': total,
+        'phases': phases,
+        'phase_share': {name: (phases[name] / total if total else 0.0) for name in PHASES},
+        'evaluations': evaluations,
+        'evaluations_per_sec': evaluations / total if total else 0.0,
+        'generations_per_sec': len(timings) / total if total else 0.0,
+    }
+
+
+@contextmanager
+def profiled(output_dir: Optional[str], name: str) -> Iterator[Dict]:
+    """
+    Run the enclosed block under cProfile when ``output_dir`` is set
+    The dump path is written into the yielded dict as ``'path'``; load it
+    with ``pstats`` or snakeviz
+    """
+    info: Dict = {'path': None}
+    if not output_dir:
+        yield info
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield info
+    finally:
+        profiler.disable()
+        path = Path(output_dir)
+        path.mkdir(parents=True, exist_ok=True)
+        dump = path / f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.prof"
+        profiler.dump_stats(str(dump))
+        info['path'] = str(dump)
@@ -0,0 +1,247 @@
+"""
+Prometheus-style metrics for SmartExam Scheduler
+A small dependency-free registry: counters, gauges and histograms with
+labels, rendered in the Prometheus text exposition format by ``/metrics``.
+Every update is a dict lookup plus an addition under a lock, so it is cheap
+enough to leave on in production.
+"""
+
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base class holding the name, help text and label names"""
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonically increasing value per label set"""
+    kind = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(v)}"
+            for labels, v in items
+        ]
+
+
+class Gauge(Metric):
+    """
+    Value that can go up and down
+    With ``function`` set the value is computed at scrape time instead;
+    a function returning None leaves the sample out (value unavailable)
+    """
+    kind = 'gauge'
+
+    def __init__(self, *args, function: Optional[Callable[[], Optional[float]]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+        self._function = function
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, amount: float = 1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, amount: float = 1, *labels):
+        self.inc(-amount, *labels)
+
+    def render(self) -> List[str]:
+        if self._function is not None:
+            value = self._function()
+            if value is None:
+                return self.header()
+            return self.header() + [f"{self.name} {_format_value(value)}"]
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(v)}"
+            for labels, v in items
+        ]
+
+
+class Histogram(Metric):
+    """Cumulative bucketed observations (seconds by convention)"""
+    kind = 'histogram'
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # labels -> [per-bucket counts..., sum, count]
+        self._values: Dict[Tuple, List[float]] = {}
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * len(self.buckets) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, *labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._values.items()]
+        lines = self.header()
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+                )
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{label_str} {series[-1]}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def process_resident_memory_bytes() -> Optional[float]:
+    """
+    Current RSS from /proc on Linux, falling back to the peak RSS on other
+    Unix systems; None where neither is available (Windows)
+    """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+registry = Registry()
+
+http_request_duration = registry.register(Histogram(
+    'smartexam_http_request_duration_seconds',
+    'HTTP request latency by route', ('method', 'route', 'status')
+))
+db_query_duration = registry.register(Histogram(
+    'smartexam_db_query_duration_seconds',
+    'Database method latency', ('query',)
+))
+import_rows = registry.register(Counter(
+    'smartexam_import_rows_total',
+    'Rows imported into the database', ('table',)
+))
+import_duration = registry.register(Histogram(
+    'smartexam_import_duration_seconds',
+    'Wall time of complete data imports', ('source',),
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+))
+optimization_jobs = registry.register(Gauge(
+    'smartexam_optimization_jobs',
+    'Optimization jobs by state', ('state',)
+))
+optimization_runs = registry.register(Counter(
+    'smartexam_optimization_runs_total',
+    'Finished optimization jobs by outcome', ('outcome',)
+))
+generations_per_second = registry.register(Gauge(
+    'smartexam_optimization_generations_per_second',
+    'Generation throughput of the running optimization'
+))
+evaluations_per_second = registry.register(Gauge(
+    'smartexam_optimization_evaluations_per_second',
+    'Fitness evaluation throughput of the running optimization'
+))
+schedule_index_lookups = registry.register(Counter(
+    'smartexam_schedule_index_lookups_total',
+    'Schedule index cache lookups by result', ('result',)
+))
+response_cache_lookups = registry.register(Counter(
+    'smartexam_response_cache_lookups_total',
+    'Serialized response cache lookups by result', ('result',)
+))
+registry.register(Gauge(
+    'process_resident_memory_bytes',
+    'Resident memory size in bytes', function=process_resident_memory_bytes
+))
+
+optimization_jobs.set(0, 'active')
+optimization_jobs.set(0, 'queued')
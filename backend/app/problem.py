@@ -0,0 +1,238 @@
+"""
+Compiled problem representation for SmartExam Scheduler
+Exams, rooms, timeslots and enrollments are mapped to integer indexes and
+flat numpy arrays so fitness evaluation never walks per-student Python lists
+"""
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .constraints import ROOM_OVERCROWDED_RATIO, ConstraintSet, default_constraints
+
+
+@dataclass
+class CompiledProblem:
+    """
+    Integer-indexed exam timetabling problem
+    A chromosome is a pair of arrays ``rooms[i]``/``slots[i]`` giving the room
+    index and timeslot index of exam ``i``
+    """
+    exam_ids: List[str]
+    exam_names: List[str]
+    professor_ids: List[str]
+    room_ids: List[str]
+    room_capacity: np.ndarray
+    slot_ids: List[str]
+    slot_days: List[str]
+    slot_times: List[str]
+    # One entry per enrollment: (student index, exam index)
+    enroll_student: np.ndarray
+    enroll_exam: np.ndarray
+    num_students: int
+    student_ids: Optional[np.ndarray] = None
+    # Optional (rooms x slots) boolean matrix, False where a room is unavailable
+    room_availability: Optional[np.ndarray] = None
+    # Weighted hard/soft constraints; every registered one by default
+    constraints: Optional[ConstraintSet] = field(default=None, repr=False)
+
+    # Derived lookup arrays, filled in __post_init__
+    exam_size: np.ndarray = field(init=False, repr=False)
+    slot_key: np.ndarray = field(init=False, repr=False)
+    key_day: np.ndarray = field(init=False, repr=False)
+    num_keys: int = field(init=False)
+    num_days: int = field(init=False)
+    professor_index: np.ndarray = field(init=False, repr=False)
+    num_professors: int = field(init=False)
+    exam_students: np.ndarray = field(init=False, repr=False)
+    exam_offsets: np.ndarray = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.room_capacity = np.asarray(self.room_capacity, dtype=np.int64)
+        self.enroll_student = np.asarray(self.enroll_student, dtype=np.int64)
+        self.enroll_exam = np.asarray(self.enroll_exam, dtype=np.int64)
+        self.exam_size = np.bincount(self.enroll_exam, minlength=self.num_exams)
+
+        # Timeslots sharing a (day, time) pair are the same slot for
+        # clash purposes, exactly as the original string keys behaved
+        keys: Dict[Tuple[str, str], int] = {}
+        days: Dict[str, int] = {}
+        slot_key, key_day = [], []
+        for day, time in zip(self.slot_days, self.slot_times):
+            if (day, time) not in keys:
+                keys[(day, time)] = len(keys)
+                key_day.append(days.setdefault(day, len(days)))
+            slot_key.append(keys[(day, time)])
+        self.slot_key = np.asarray(slot_key, dtype=np.int64)
+        self.key_day = np.asarray(key_day, dtype=np.int64)
+        self.num_keys = len(keys)
+        self.num_days = len(days)
+
+        # Exams without a professor ("") each get an index of their own so
+        # they never clash with one another
+        professors: Dict[str, int] = {}
+        self.professor_index = np.asarray([
+            professors.setdefault(p or f"\0{i}", len(professors))
+            for i, p in enumerate(self.professor_ids)
+        ], dtype=np.int64)
+        self.num_professors = len(professors)
+
+        # Students of each exam as one CSR array, for the delta kernels
+        order = np.argsort(self.enroll_exam, kind='stable')
+        self.exam_students = self.enroll_student[order]
+        self.exam_offsets = np.concatenate(([0], np.cumsum(self.exam_size))).astype(np.int64)
+
+        if self.room_availability is not None:
+            self.room_availability = np.asarray(self.room_availability, dtype=bool)
+        if self.constraints is None:
+            self.constraints = default_constraints()
+
+    @property
+    def num_exams(self) -> int:
+        return len(self.exam_ids)
+
+    @property
+    def num_rooms(self) -> int:
+        return len(self.room_ids)
+
+    @property
+    def num_slots(self) -> int:
+        return len(self.slot_ids)
+
+    @property
+    def num_enrollments(self) -> int:
+        return len(self.enroll_exam)
+
+    def student_id(self, index: int) -> str:
+        """External ID of a student index"""
+        if self.student_ids is None:
+            return f"S{index}"
+        return str(self.student_ids[index])
+
+    def students_of(self, exam: int) -> np.ndarray:
+        """Student indexes enrolled in one exam"""
+        return self.exam_students[self.exam_offsets[exam]:self.exam_offsets[exam + 1]]
+
+    def evaluate(self, rooms: np.ndarray, slots: np.ndarray, per_exam: bool = False) -> Tuple:
+        """
+        Score one assignment against ``constraints``
+        Returns ``(fitness, hard_conflicts, soft_penalty)``; lower is better.
+        With ``per_exam`` a fourth element gives the penalty each exam takes
+        part in, computed from the same intermediate arrays.
+        """
+        return self.constraints.evaluate(self, rooms, slots, per_exam)
+
+    def constraint_costs(self, rooms: np.ndarray, slots: np.ndarray) -> Dict[str, Dict]:
+        """Violations and penalty of every active constraint"""
+        return self.constraints.costs(self, rooms, slots)
+
+    def pack_rooms(self, slots: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Deterministic room assignment for a slot-only chromosome
+        Within each (day, time) slot exams are placed largest-first into the
+        smallest free room that holds them below the overcrowding threshold,
+        else the smallest free room that holds them at all. Largest-first
+        best-fit places as many exams as any assignment can. Exams that fit
+        no free room get the largest free room (or, with none left, the
+        largest room) and are flagged in the returned ``unplaced`` mask.
+        """
+        rooms = np.zeros(self.num_exams, dtype=np.int64)
+        unplaced = np.zeros(self.num_exams, dtype=bool)
+        keys = self.slot_key[slots]
+        room_order = np.argsort(self.room_capacity, kind='stable')
+        capacities = self.room_capacity[room_order].tolist()
+        largest_room = int(room_order[-1])
+
+        # Exams grouped by slot, largest first within each group
+        order = np.lexsort((-self.exam_size, keys))
+        bounds = np.flatnonzero(np.diff(keys[order])) + 1
+        for group in np.split(order, bounds):
+            free = list(range(len(capacities)))
+            free_caps = list(capacities)
+            for exam, size in zip(group.tolist(), self.exam_size[group].tolist()):
+                if not free:
+                    rooms[exam] = largest_room
+                    unplaced[exam] = True
+                    continue
+                pos = bisect_left(free_caps, size / ROOM_OVERCROWDED_RATIO)
+                if pos == len(free):
+                    pos = bisect_left(free_caps, size)
+                if pos == len(free):
+                    pos -= 1
+                    unplaced[exam] = True
+                rooms[exam] = room_order[free.pop(pos)]
+                free_caps.pop(pos)
+        return rooms, unplaced
+
+    def exam_hard_violations(
+        self, rooms: np.ndarray, slots: np.ndarray, active: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Number of hard-constraint violations each exam takes part in
+        With an ``active`` mask, exams outside it are treated as unscheduled
+        """
+        if active is None:
+            return self.constraints.exam_hard_violations(self, rooms, slots)
+
+        exams = np.flatnonzero(active)
+        violations = np.zeros(self.num_exams, dtype=np.int64)
+        violations[exams] = self.subproblem(exams).exam_hard_violations(rooms[exams], slots[exams])
+        return violations
+
+    def subproblem(self, exams: np.ndarray, rooms: Optional[np.ndarray] = None) -> 'CompiledProblem':
+        """
+        Restrict the problem to the given exam (and optionally room) indexes
+        Students are re-indexed densely; timeslots are kept as they are
+        """
+        exams = np.asarray(exams, dtype=np.int64)
+        rooms = np.arange(self.num_rooms) if rooms is None else np.asarray(rooms, dtype=np.int64)
+
+        exam_map = np.full(self.num_exams, -1, dtype=np.int64)
+        exam_map[exams] = np.arange(len(exams))
+        keep = exam_map[self.enroll_exam] >= 0
+        students, student_index = np.unique(self.enroll_student[keep], return_inverse=True)
+
+        return CompiledProblem(
+            exam_ids=[self.exam_ids[i] for i in exams],
+            exam_names=[self.exam_names[i] for i in exams],
+            professor_ids=[self.professor_ids[i] for i in exams],
+            room_ids=[self.room_ids[i] for i in rooms],
+            room_capacity=self.room_capacity[rooms],
+            slot_ids=list(self.slot_ids),
+            slot_days=list(self.slot_days),
+            slot_times=list(self.slot_times),
+            enroll_student=student_index,
+            enroll_exam=exam_map[self.enroll_exam[keep]],
+            num_students=len(students),
+            student_ids=None if self.student_ids is None else self.student_ids[students],
+            room_availability=None if self.room_availability is None else self.room_availability[rooms],
+            constraints=self.constraints,
+        )
+
+
+def compile_problem(exams: Sequence, rooms: Sequence, timeslots: Sequence) -> CompiledProblem:
+    """Compile ``Exam``/``Room``/``TimeSlot`` objects into a CompiledProblem"""
+    student_index: Dict[str, int] = {}
+    enroll_student: List[int] = []
+    enroll_exam: List[int] = []
+    for i, exam in enumerate(exams):
+        for student_id in exam.enrolled_students:
+            enroll_student.append(student_index.setdefault(student_id, len(student_index)))
+            enroll_exam.append(i)
+
+    return CompiledProblem(
+        exam_ids=[e.course_id for e in exams],
+        exam_names=[e.course_name for e in exams],
+        professor_ids=[e.professor_id for e in exams],
+        room_ids=[r.room_id for r in rooms],
+        room_capacity=np.array([r.capacity for r in rooms], dtype=np.int64),
+        slot_ids=[t.slot_id for t in timeslots],
+        slot_days=[t.day for t in timeslots],
+        slot_times=[t.time for t in timeslots],
+        enroll_student=np.array(enroll_student, dtype=np.int64),
+        enroll_exam=np.array(enroll_exam, dtype=np.int64),
+        num_students=len(student_index),
+        student_ids=np.array(list(student_index), dtype=object),
+    )
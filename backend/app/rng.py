@@ -0,0 +1,28 @@
+"""
+Random number streams for SmartExam Scheduler
+Every run owns a seeded numpy Generator; parallel workers and islands get
+independent child streams split from the same seed
+"""
+
+from typing import List, Optional
+
+import numpy as np
+
+
+def make_seed_sequence(seed: Optional[int] = None) -> np.random.SeedSequence:
+    """
+    Create the root seed sequence for a run
+    When no seed is given, fresh OS entropy is drawn; its value is kept in
+    ``SeedSequence.entropy`` so the run can still be replayed later
+    """
+    return np.random.SeedSequence(seed)
+
+
+def spawn_generators(seed_seq: np.random.SeedSequence, n: int) -> List[np.random.Generator]:
+    """Split a seed sequence into ``n`` statistically independent generators"""
+    return [np.random.default_rng(child) for child in seed_seq.spawn(n)]
+
+
+def derive_int_seed(seed_seq: np.random.SeedSequence) -> int:
+    """Derive a plain 32-bit integer seed (for libraries that cannot take a Generator)"""
+    return int(seed_seq.generate_state(1)[0])
@@ -0,0 +1,143 @@
+"""
+Per-student and per-room lookup indexes for saved schedules
+A saved schedule is a single JSON blob; decoding it per request does not
+scale to exam week, when every student looks up their own exams. An index
+is materialized once per schedule (joined against the enrollment table)
+and kept in a small in-memory LRU cache, so a lookup is two dict reads.
+Indexes of new schedules are built at save time; older schedules are
+indexed on first lookup against the enrollments current at that moment;
+concurrent first lookups of one schedule share a single build.
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .metrics import schedule_index_lookups
+
+
+def timeslot_order(timeslots: List[Dict]) -> Dict[str, int]:
+    """Position of every timeslot ID in ``timeslots``"""
+    return {t['timeslot_id']: i for i, t in enumerate(timeslots)}
+
+
+def sort_by_timeslot(entries: List[Dict], slot_order: Dict[str, int]) -> List[Dict]:
+    """Schedule entries in timeslot order; unknown timeslots go last"""
+    return sorted(entries, key=lambda e: slot_order.get(e['timeslot_id'], len(slot_order)))
+
+
+class ScheduleIndex:
+    """
+    Student -> exams and room -> exams views of one schedule
+    Every view holds references to the same entry dicts, ordered by timeslot
+    """
+
+    def __init__(
+        self,
+        schedule_id: int,
+        entries: List[Dict],
+        enrollments: Iterable[Tuple[str, str]],
+        slot_order: Optional[Dict[str, int]] = None
+    ):
+        self.schedule_id = schedule_id
+        self.entries = sort_by_timeslot(entries, slot_order or {})
+        position = {entry['course_id']: i for i, entry in enumerate(self.entries)}
+
+        students: Dict[str, List[int]] = {}
+        for student_id, course_id in enrollments:
+            i = position.get(course_id)
+            if i is not None:
+                students.setdefault(student_id, []).append(i)
+        self.students = {
+            student_id: [self.entries[i] for i in sorted(exams)]
+            for student_id, exams in students.items()
+        }
+
+        rooms: Dict[str, List[Dict]] = {}
+        for entry in self.entries:
+            rooms.setdefault(entry['room_id'], []).append(entry)
+        self.rooms = rooms
+
+    def student(self, student_id: str) -> Optional[List[Dict]]:
+        """Exams of one student, or None if the student sits none"""
+        return self.students.get(student_id)
+
+    def room(self, room_id: str) -> Optional[List[Dict]]:
+        """Exams held in one room, or None if the room is unused"""
+        return self.rooms.get(room_id)
+
+
+def build_schedule_index(db, schedule_id: int, schedule_data: Optional[Dict] = None) -> Optional[ScheduleIndex]:
+    """Materialize the index of a saved schedule from the database"""
+    if schedule_data is None:
+        schedule = db.get_schedule_by_id(schedule_id)
+        if not schedule:
+            return None
+        schedule_data = schedule['schedule_data']
+    slot_order = timeslot_order(db.get_all_timeslots())
+    return ScheduleIndex(
+        schedule_id, schedule_data.get('schedule', []), db.get_enrollment_pairs(), slot_order
+    )
+
+
+class ScheduleIndexCache:
+    """
+    LRU cache of ScheduleIndex objects, safe to share between request threads
+    Only the ``max_schedules`` most recently used schedules stay in memory.
+    A miss registers the build as in flight, so lookups arriving meanwhile
+    wait for that build instead of each loading the enrollments again.
+    """
+
+    def __init__(self, db, max_schedules: int = 4):
+        self.db = db
+        self.max_schedules = max_schedules
+        self._indexes: 'OrderedDict[int, ScheduleIndex]' = OrderedDict()
+        self._building: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+
+    def get(self, schedule_id: int) -> Optional[ScheduleIndex]:
+        """Index of a schedule, built on first use; None if it does not exist"""
+        with self._lock:
+            index = self._indexes.get(schedule_id)
+            if index is not None:
+                self._indexes.move_to_end(schedule_id)
+                schedule_index_lookups.inc(1, 'hit')
+                return index
+            building = self._building.get(schedule_id)
+            if building is None:
+                building = self._building[schedule_id] = Future()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            schedule_index_lookups.inc(1, 'wait')
+            return building.result()
+
+        schedule_index_lookups.inc(1, 'miss')
+        try:
+            index = build_schedule_index(self.db, schedule_id)
+            if index is not None:
+                self._store(index)
+        except BaseException as exc:
+            building.set_exception(exc)
+            raise
+        else:
+            building.set_result(index)
+        finally:
+            with self._lock:
+                del self._building[schedule_id]
+        return index
+
+    def add(self, schedule_id: int, schedule_data: Dict) -> ScheduleIndex:
+        """Materialize the index of a freshly saved schedule"""
+        index = build_schedule_index(self.db, schedule_id, schedule_data)
+        self._store(index)
+        return index
+
+    def _store(self, index: ScheduleIndex):
+        with self._lock:
+            self._indexes[index.schedule_id] = index
+            self._indexes.move_to_end(index.schedule_id)
+            while len(self._indexes) > self.max_schedules:
+                self._indexes.popitem(last=False)
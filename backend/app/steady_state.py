@@ -0,0 +1,179 @@
+"""
+Steady-state genetic algorithm for SmartExam Scheduler
+Offspring are bred a pair at a time and evaluated by worker processes while
+the main process keeps breeding; every result is inserted into the
+population as soon as it arrives, so no core waits for the slowest
+evaluation of a generation
+"""
+
+import math
+import os
+import time
+from typing import Dict, Optional
+
+from .distributed import ProcessPoolBroker
+from .genetic_algorithm import GeneticAlgorithm, Timetable
+
+
+REPLACEMENT_POLICIES = ('worst', 'tournament')
+
+
+class SteadyStateGA(GeneticAlgorithm):
+    """
+    Steady-state GA with asynchronous, non-blocking evaluation
+    ``generations`` counts generation-equivalents of ``population_size``
+    evaluations each, so runs are comparable with the generational engine
+    at the same evaluation or wall-clock budget. Offspring go to ``broker``
+    when given, otherwise to a local pool of ``workers`` processes;
+    ``workers=0`` evaluates inline in the calling process.
+    """
+
+    def __init__(
+        self,
+        *args,
+        workers: Optional[int] = None,
+        replacement: str = 'worst',
+        replacement_tournament_size: int = 3,
+        batch_size: int = 4,
+        **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        if replacement not in REPLACEMENT_POLICIES:
+            raise ValueError(f"replacement must be one of {REPLACEMENT_POLICIES}")
+        if self.broker is not None:
+            self.workers = self.broker.workers
+        else:
+            self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.replacement = replacement
+        self.replacement_tournament_size = replacement_tournament_size
+        self.batch_size = batch_size
+        self.inserted = 0
+        self.rejected = 0
+
+    def insert(self, child: Timetable) -> bool:
+        """
+        Replace the worst individual ('worst') or the loser of a random
+        tournament ('tournament') when the child beats it; children already
+        in the population are rejected as duplicates
+        """
+        population = self.population
+        key = self.chromosome_key(child)
+        if key in self.population_keys:
+            self.duplicates_rejected += 1
+            return False
+        if self.replacement == 'worst':
+            candidates = range(len(population))
+        else:
+            candidates = self.rng.choice(
+                len(population),
+                size=min(self.replacement_tournament_size, len(population)),
+                replace=False
+            ).tolist()
+        victim = max(candidates, key=lambda i: population[i].fitness)
+        if child.fitness >= population[victim].fitness:
+            self.rejected += 1
+            return False
+
+        self.population_keys.discard(self.chromosome_key(population[victim]))
+        population[victim] = child
+        self.population_keys.add(key)
+        self.inserted += 1
+        if child.fitness < self.best_solution.fitness:
+            self.best_solution = child.copy()
+        return True
+
+    def _evolve(self, callback=None):
+        print("Initializing population...")
+        self.initialize_population()
+
+        timer = self.timer
+        timer.start_generation()
+        self._best_so_far, self._stalled, self._since_restart = None, 0, 0
+        self._started = time.perf_counter()
+        with timer.phase('evaluation'):
+            self.evaluate_population()
+        self.population_keys = {self.chromosome_key(t) for t in self.population}
+
+        print(f"Evolving for {self.generations} generation-equivalents "
+              f"on {self.workers or 'no'} worker processes...")
+
+        # evolve() has already started a caller-supplied broker; a local
+        # pool is owned (started and closed) by this run
+        broker, owned = self.broker, False
+        if broker is None and self.workers > 0:
+            broker, owned = ProcessPoolBroker(self.workers), True
+            broker.start(self.problem, self.evaluator_options())
+        pending: Dict = {}
+        pairs_per_batch = max(1, math.ceil(self.batch_size / 2))
+        generation, window, children = 0, 0, []
+
+        try:
+            while generation < self.generations:
+                if broker is None:
+                    batch = self.reject_duplicates(self.breed(), self.population_keys, add=False)
+                    with timer.phase('evaluation'):
+                        for child in batch:
+                            self.evaluate(child)
+                    finished = [batch]
+                else:
+                    # Keep every worker busy with a queued batch behind it;
+                    # remote workers may join mid-run, so ask the broker each time
+                    while len(pending) < 2 * broker.workers:
+                        batch = [c for _ in range(pairs_per_batch) for c in self.breed()]
+                        batch = self.reject_duplicates(batch, self.population_keys, add=False)
+                        if batch:
+                            pending[broker.submit([(c.rooms, c.slots) for c in batch])] = batch
+                    with timer.phase('evaluation'):
+                        done = broker.poll()
+                    finished = []
+                    for task_id, results in done:
+                        batch = pending.pop(task_id)
+                        for child, result in zip(batch, results):
+                            self.apply_result(child, result)
+                        finished.append(batch)
+
+                with timer.phase('selection'):
+                    for batch in finished:
+                        for child in batch:
+                            self.insert(child)
+                            children.append(child)
+
+                evaluated = sum(len(batch) for batch in finished)
+                self.evaluations += evaluated
+                timer.count_evaluations(evaluated)
+                window += evaluated
+                if window < self.population_size:
+                    continue
+
+                # One generation-equivalent done: report, adapt and check stops
+                window = 0
+                if self.adaptive_rates:
+                    self.adapt_rates(children)
+                children = []
+                self.population.sort(key=lambda t: t.fitness)
+                if broker is None:
+                    self.update_delta_state(self.population[0])
+                stop = self.record_generation(generation, callback)
+                self.timing_history.append(timer.end_generation(generation))
+                if stop:
+                    break
+                generation += 1
+        finally:
+            if owned:
+                broker.close()
+
+        self.population.sort(key=lambda t: t.fitness)
+        self.print_summary()
+        return self.best_solution
+
+    def get_schedule_dict(self) -> Dict:
+        schedule = super().get_schedule_dict()
+        if schedule:
+            schedule['steady_state'] = {
+                'workers': self.workers,
+                'replacement': self.replacement,
+                'batch_size': self.batch_size,
+                'inserted': self.inserted,
+                'rejected': self.rejected,
+            }
+        return schedule
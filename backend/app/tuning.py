@@ -0,0 +1,231 @@
+"""
+Parameter tuning for SmartExam Scheduler
+Successive halving over sampled GA configurations: every configuration gets
+a small evaluation budget, the best 1/eta survive to a budget eta times
+larger, until a final rung of at most eta configurations (but at least two)
+picks the winner. Trials run in parallel worker processes that receive the
+problem once. Configurations are compared on the same seeds (common random
+numbers), and the winner's confidence is the bootstrap probability that it
+beats the runner-up on those paired seeds.
+
+    cd backend
+    python -m app.tuning                           # tune on the current database
+    python -m app.tuning --data data/car-s-91.crs  # or on a benchmark file
+"""
+
+import argparse
+import contextlib
+import io
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from .genetic_algorithm import GeneticAlgorithm
+from .problem import CompiledProblem
+from .rng import make_seed_sequence
+
+
+# Sampled per configuration; everything else keeps the GA defaults
+SEARCH_SPACE = {
+    'population_size': [30, 50, 100, 200],
+    'crossover_rate': (0.5, 0.95),
+    'mutation_rate': (0.02, 0.4),
+    'mutation_mode': ['uniform', 'directed'],
+    'encoding': ['direct', 'slot'],
+}
+
+BOOTSTRAP_SAMPLES = 2000
+
+
+def sample_configurations(n: int, rng: np.random.Generator) -> List[Dict]:
+    """Draw ``n`` configurations (mutation rate log-uniform, crossover uniform)"""
+    low, high = SEARCH_SPACE['mutation_rate']
+    configs = []
+    for _ in range(n):
+        configs.append({
+            'population_size': int(rng.choice(SEARCH_SPACE['population_size'])),
+            'crossover_rate': round(float(rng.uniform(*SEARCH_SPACE['crossover_rate'])), 3),
+            'mutation_rate': round(float(np.exp(rng.uniform(np.log(low), np.log(high)))), 4),
+            'mutation_mode': str(rng.choice(SEARCH_SPACE['mutation_mode'])),
+            'encoding': str(rng.choice(SEARCH_SPACE['encoding'])),
+        })
+    return configs
+
+
+_problem: Optional[CompiledProblem] = None
+
+
+def _init_worker(problem: CompiledProblem):
+    global _problem
+    _problem = problem
+
+
+def run_trial(config: Dict, evaluations: int, seed: int) -> float:
+    """Worker: final fitness of one configuration after about ``evaluations`` evaluations"""
+    generations = max(1, math.ceil(evaluations / config['population_size']))
+    ga = GeneticAlgorithm.from_problem(_problem, generations=generations, seed=seed, **config)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return float(ga.evolve().fitness)
+
+
+def win_probability(winner: List[float], other: List[float], rng: np.random.Generator) -> float:
+    """Bootstrap probability that ``winner`` has the lower mean on paired seeds"""
+    diff = np.asarray(winner) - np.asarray(other)
+    if len(diff) < 2:
+        return float(diff.mean() < 0) if len(diff) else 0.0
+    resamples = rng.integers(len(diff), size=(BOOTSTRAP_SAMPLES, len(diff)))
+    return float((diff[resamples].mean(axis=1) < 0).mean())
+
+
+def successive_halving(
+    problem: CompiledProblem,
+    configurations: int = 27,
+    min_evaluations: int = 1000,
+    eta: int = 3,
+    replicates: int = 3,
+    workers: Optional[int] = None,
+    seed: Optional[int] = None,
+    callback: Optional[Callable[[Dict], None]] = None
+) -> Dict:
+    """
+    Tune GA parameters on ``problem``
+    Rung ``k`` runs every surviving configuration for
+    ``min_evaluations * eta**k`` evaluations on ``replicates`` shared seeds
+    (one more seed per rung, so the final comparison is the best informed).
+    ``callback`` receives a progress dict after every finished trial.
+    """
+    if eta < 2:
+        raise ValueError("eta must be at least 2")
+    if min(configurations, min_evaluations, replicates) < 1:
+        raise ValueError("configurations, min_evaluations and replicates must be positive")
+
+    seed_sequence = make_seed_sequence(seed)
+    rng = np.random.default_rng(seed_sequence)
+    candidates = sample_configurations(configurations, rng)
+    workers = workers or os.cpu_count() or 1
+
+    # Survivors per rung; the last rung still compares up to eta configurations,
+    # and never fewer than two, so the winner always has a runner-up
+    plan = [len(candidates)]
+    while plan[-1] > eta and plan[-1] // eta >= 2:
+        plan.append(plan[-1] // eta)
+    total_trials = sum(n * (replicates + k) for k, n in enumerate(plan))
+
+    started = time.perf_counter()
+    done_trials = 0
+    history = []
+    scores: Dict[int, List[float]] = {}
+    survivors = list(range(len(candidates)))
+
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=get_context('spawn'),
+        initializer=_init_worker, initargs=(problem,)
+    ) as pool:
+        for rung, _ in enumerate(plan):
+            budget = min_evaluations * eta ** rung
+            seeds = rng.integers(2 ** 31, size=replicates + rung).tolist()
+            futures = {
+                pool.submit(run_trial, candidates[c], budget, s): (c, i)
+                for c in survivors for i, s in enumerate(seeds)
+            }
+            results = {c: [0.0] * len(seeds) for c in survivors}
+            for future in as_completed(futures):
+                c, i = futures[future]
+                results[c][i] = future.result()
+                done_trials += 1
+                if callback:
+                    callback({
+                        'rung': rung, 'budget': budget,
+                        'completed': done_trials, 'total': total_trials,
+                        'progress': done_trials / total_trials,
+                    })
+
+            ranked = sorted(survivors, key=lambda c: np.mean(results[c]))
+            scores = results
+            history.append({
+                'rung': rung,
+                'evaluations': budget,
+                'seeds': len(seeds),
+                'configurations': [
+                    {'config': candidates[c], 'mean_fitness': float(np.mean(results[c]))}
+                    for c in ranked
+                ],
+            })
+            print(f"Rung {rung}: {len(survivors)} configurations x {len(seeds)} seeds "
+                  f"at {budget} evaluations, best mean fitness {np.mean(results[ranked[0]]):.0f}")
+            if rung + 1 < len(plan):
+                survivors = ranked[:plan[rung + 1]]
+
+    final = history[-1]['configurations']
+    winner = ranked[0]
+    if len(ranked) > 1:
+        confidence = win_probability(scores[winner], scores[ranked[1]], rng)
+        runner_up = candidates[ranked[1]]
+    else:
+        # A single configuration was never compared against anything
+        confidence, runner_up = None, None
+
+    return {
+        'best_config': candidates[winner],
+        'mean_fitness': final[0]['mean_fitness'],
+        'confidence': confidence,
+        'runner_up': runner_up,
+        'seed': str(seed_sequence.entropy),
+        'trials': done_trials,
+        'seconds': time.perf_counter() - started,
+        'rungs': history,
+    }
+
+
+def _at_least(minimum: int):
+    """argparse type: an integer no smaller than ``minimum``"""
+    def parse(value: str) -> int:
+        number = int(value)
+        if number < minimum:
+            raise argparse.ArgumentTypeError(f"must be at least {minimum}")
+        return number
+    return parse
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune GA parameters by successive halving")
+    parser.add_argument('--data', default=None,
+                        help="Toronto/ITC2007 file (default: the application database)")
+    parser.add_argument('--configurations', type=_at_least(1), default=27)
+    parser.add_argument('--min-evaluations', type=_at_least(1), default=1000)
+    parser.add_argument('--eta', type=_at_least(2), default=3)
+    parser.add_argument('--replicates', type=_at_least(1), default=3)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.data:
+        from .datasets import load_benchmark
+        problem = load_benchmark(args.data)
+    else:
+        from .database import db
+        from .datasets import load_problem_from_database
+        problem = load_problem_from_database(db)
+
+    result = successive_halving(
+        problem,
+        configurations=args.configurations,
+        min_evaluations=args.min_evaluations,
+        eta=args.eta,
+        replicates=args.replicates,
+        workers=args.workers,
+        seed=args.seed
+    )
+    print(f"\nBest configuration: {result['best_config']}")
+    confidence = 'n/a' if result['confidence'] is None else f"{result['confidence']:.2f}"
+    print(f"Mean fitness {result['mean_fitness']:.0f}, confidence {confidence} "
+          f"({result['trials']} trials in {result['seconds']:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
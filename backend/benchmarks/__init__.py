@@ -0,0 +1 @@
+# SmartExam Scheduler benchmark suite
@@ -0,0 +1,82 @@
+"""
+Command-line entry point for the benchmark suite
+
+    cd backend
+    python -m benchmarks --tiers S M --generations 200
+    python -m benchmarks --tiers S --save-baseline
+    python -m benchmarks --tiers S --standard      # also run local Toronto/ITC2007 files
+    python -m benchmarks --tiers M --time-limit 30 --engines ga-default ga-steady
+    python -m benchmarks --tiers S --engines exact decomposed-exact  # needs ortools
+    python -m benchmarks --tiers S --skip-imports  # engines only, no import-time cases
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.import_time import compare_imports_to_baseline, import_violations, run_imports
+from benchmarks.instances import TIERS, DEFAULT_DATA_DIR, discover_standard_instances
+from benchmarks.runner import (
+    ENGINES, RESULTS_DIR, BASELINE_PATH,
+    available_engines, run_suite, write_results, compare_to_baseline
+)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="SmartExam Scheduler benchmarks")
+    parser.add_argument('--tiers', nargs='*', default=['S', 'M'], choices=list(TIERS))
+    parser.add_argument('--engines', nargs='*', default=available_engines(), choices=list(ENGINES),
+                        help="default: every engine whose dependencies are installed")
+    parser.add_argument('--generations', type=int, default=None,
+                        help="generations per case (default 200, unbounded with --time-limit)")
+    parser.add_argument('--time-limit', type=float, default=None,
+                        help="wall-clock budget in seconds per case, for equal-time comparisons")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--standard', action='store_true',
+                        help="also run Toronto/ITC2007 files found in --data-dir")
+    parser.add_argument('--data-dir', type=Path, default=DEFAULT_DATA_DIR)
+    parser.add_argument('--output', type=Path, default=None)
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    parser.add_argument('--skip-imports', action='store_true',
+                        help="do not measure module import times")
+    args = parser.parse_args(argv)
+
+    specs = list(args.tiers)
+    if args.standard:
+        specs += [str(p) for p in discover_standard_instances(args.data_dir)]
+
+    generations = args.generations
+    if generations is None:
+        generations = 10 ** 9 if args.time_limit else 200
+
+    results = run_suite(specs, args.engines, generations, args.seed, args.time_limit)
+    imports = [] if args.skip_imports else run_imports()
+
+    output = args.output or RESULTS_DIR / f"results-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    print(f"\nResults written to {write_results(results, output, imports)}")
+
+    if args.save_baseline:
+        write_results(results, args.baseline, imports)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    # Import side effects and web/DB modules in solver workers fail the run outright
+    regressions = import_violations(imports)
+    if args.baseline.exists():
+        regressions += compare_to_baseline(results, args.baseline, args.tolerance)
+        regressions += compare_imports_to_baseline(imports, args.baseline, args.tolerance)
+    if regressions:
+        print("\nPERFORMANCE REGRESSIONS:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    if args.baseline.exists():
+        print("\nNo regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
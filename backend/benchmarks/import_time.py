@@ -0,0 +1,150 @@
+"""
+Import-time benchmark for SmartExam Scheduler
+Every module is imported in a fresh interpreter (as a uvicorn worker or a
+spawned solver process would) from an empty working directory. Each
+measurement records wall time, the heavy packages pulled in and any files
+created, so import-time side effects show up as regressions.
+
+    cd backend
+    python -m benchmarks.import_time
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# What each process kind imports at startup
+IMPORT_TARGETS: Dict[str, str] = {
+    'solver': 'app.genetic_algorithm',
+    'database': 'app.database',
+    'data_generator': 'app.data_generator',
+    'api': 'main',
+}
+
+# Import-time growth below this is noise, whatever the relative change
+MIN_REGRESSION_MS = 10.0
+
+# Packages a solver worker process must never load
+SOLVER_FORBIDDEN = ('fastapi', 'starlette', 'pydantic', 'uvicorn', 'sqlite3', 'faker', 'app.database')
+
+HEAVY_PACKAGES = ('numpy',) + SOLVER_FORBIDDEN
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'modules': sorted(sys.modules)}}))
+"""
+
+
+@dataclass
+class ImportResult:
+    """Import cost of one module, median over fresh interpreters"""
+    name: str
+    module: str
+    median_ms: float
+    min_ms: float
+    heavy_packages: List[str]
+    created_files: List[str] = field(default_factory=list)
+
+    @property
+    def key(self) -> str:
+        return f"import/{self.name}"
+
+
+def measure_import(name: str, module: str, repeats: int = 5) -> ImportResult:
+    """Import ``module`` ``repeats`` times, each in a new interpreter and empty cwd"""
+    timings, modules, created = [], [], set()
+    for _ in range(repeats):
+        with tempfile.TemporaryDirectory() as workdir:
+            out = subprocess.run(
+                [sys.executable, '-c', _PROBE.format(module=module)],
+                cwd=workdir, env=dict(os.environ, PYTHONPATH=str(BACKEND_DIR)),
+                capture_output=True, text=True, check=True
+            ).stdout
+            created.update(str(p.relative_to(workdir)) for p in Path(workdir).rglob('*'))
+        probe = json.loads(out.strip().splitlines()[-1])
+        timings.append(probe['seconds'] * 1000)
+        modules = probe['modules']
+
+    loaded = set(modules)
+    return ImportResult(
+        name=name,
+        module=module,
+        median_ms=statistics.median(timings),
+        min_ms=min(timings),
+        heavy_packages=[p for p in HEAVY_PACKAGES if p in loaded],
+        created_files=sorted(created),
+    )
+
+
+def run_imports(repeats: int = 5) -> List[ImportResult]:
+    results = []
+    for name, module in IMPORT_TARGETS.items():
+        result = measure_import(name, module, repeats)
+        print(f"{result.key:40s} {result.median_ms:8.1f} ms (min {result.min_ms:.1f}) "
+              f"loads {', '.join(result.heavy_packages) or '-'}"
+              + (f"  CREATES {', '.join(result.created_files)}" if result.created_files else ""))
+        results.append(result)
+    return results
+
+
+def import_violations(results: List[ImportResult]) -> List[str]:
+    """Import-time side effects and forbidden solver dependencies"""
+    problems = []
+    for result in results:
+        if result.created_files:
+            problems.append(f"{result.key}: importing creates {result.created_files}")
+        if result.name == 'solver':
+            forbidden = [m for m in SOLVER_FORBIDDEN if m in result.heavy_packages]
+            if forbidden:
+                problems.append(f"{result.key}: solver import pulls in {forbidden}")
+    return problems
+
+
+def compare_imports_to_baseline(
+    results: List[ImportResult],
+    baseline_path: Path,
+    tolerance: float = 0.10
+) -> List[str]:
+    """Median import times that grew by more than ``tolerance`` (and MIN_REGRESSION_MS)"""
+    baseline = {
+        entry['key']: entry
+        for entry in json.loads(baseline_path.read_text()).get('imports', [])
+    }
+    regressions = []
+    for result in results:
+        old = baseline.get(result.key)
+        if old is None:
+            continue
+        before, after = old['median_ms'], result.median_ms
+        if after - before > max(tolerance * before, MIN_REGRESSION_MS):
+            regressions.append(
+                f"{result.key}: median_ms {before:.1f} -> {after:.1f} ({(after - before) / before:+.1%})"
+            )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Import-time benchmark")
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    problems = import_violations(run_imports(args.repeats))
+    for line in problems:
+        print(f"  {line}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Benchmark instances for SmartExam Scheduler
+Synthetic tiers are produced by DataGenerator with fixed seeds; standard
+exam timetabling datasets (Toronto, ITC2007) are picked up when present locally
+and streamed through app.datasets
+"""
+
+import contextlib
+import io
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List
+
+from app.data_generator import DataGenerator
+from app.datasets import load_benchmark
+from app.genetic_algorithm import Exam, Room, TimeSlot
+from app.problem import CompiledProblem, compile_problem
+
+
+@dataclass
+class Instance:
+    """A named scheduling problem ready to hand to an engine"""
+    name: str
+    problem: CompiledProblem
+    source: str
+
+
+# Tier sizes follow the growth of a real registrar load (500 -> 100k students)
+TIERS: Dict[str, Dict[str, int]] = {
+    'S': {'num_students': 500, 'num_courses': 40, 'num_rooms': 10},
+    'M': {'num_students': 5000, 'num_courses': 150, 'num_rooms': 25},
+    'L': {'num_students': 20000, 'num_courses': 400, 'num_rooms': 60},
+    'XL': {'num_students': 50000, 'num_courses': 800, 'num_rooms': 120},
+    'XXL': {'num_students': 100000, 'num_courses': 1500, 'num_rooms': 200},
+}
+
+# Tiers produced by the vectorized generator (cohorts, popularity skew)
+VECTORIZED_TIERS = {'XXL'}
+
+DEFAULT_DATA_DIR = Path(__file__).parent / 'data'
+
+
+def build_instance(name: str, data: Dict, source: str) -> Instance:
+    """Turn DataGenerator-style record lists into engine objects"""
+    enrolled: Dict[str, List[str]] = {}
+    for row in data['enrollments']:
+        enrolled.setdefault(row['course_id'], []).append(row['student_id'])
+
+    exams = [
+        Exam(
+            course_id=c['course_id'],
+            course_name=c['course_name'],
+            enrolled_students=enrolled.get(c['course_id'], []),
+            professor_id=c['professor_id']
+        )
+        for c in data['courses']
+    ]
+    rooms = [Room(room_id=r['room_id'], capacity=r['capacity']) for r in data['rooms']]
+    timeslots = [
+        TimeSlot(slot_id=t['timeslot_id'], day=t['day'], time=t['time'])
+        for t in data['timeslots']
+    ]
+    return Instance(name, compile_problem(exams, rooms, timeslots), source)
+
+
+def synthetic_instance(tier: str, seed: int = 0) -> Instance:
+    """Generate a synthetic tier instance without touching disk"""
+    generator = DataGenerator(**TIERS[tier], seed=seed)
+    if tier in VECTORIZED_TIERS:
+        return Instance(f"synthetic-{tier}", generator.generate_problem(),
+                        f"DataGenerator.generate_problem(seed={seed})")
+    with contextlib.redirect_stdout(io.StringIO()):
+        courses = generator.generate_courses()
+        students = generator.generate_students()
+        data = {
+            'courses': courses,
+            'rooms': generator.generate_rooms(),
+            'timeslots': generator.generate_timeslots(),
+            'enrollments': generator.generate_enrollments(students, courses),
+        }
+    return build_instance(f"synthetic-{tier}", data, f"DataGenerator(seed={seed})")
+
+
+def discover_standard_instances(data_dir: Path = DEFAULT_DATA_DIR) -> List[Path]:
+    """List Toronto ``.crs`` and ITC2007 ``.exam`` files available locally"""
+    if not data_dir.is_dir():
+        return []
+    crs = [p for p in sorted(data_dir.glob('*.crs')) if p.with_suffix('.stu').exists()]
+    return crs + sorted(data_dir.glob('*.exam'))
+
+
+def load_standard_instance(path: Path) -> Instance:
+    """Load a Toronto or ITC2007 file by extension"""
+    family = 'toronto' if path.suffix == '.crs' else 'itc2007'
+    return Instance(f"{family}-{path.stem}", load_benchmark(path), str(path))
@@ -0,0 +1,186 @@
+"""
+API load test: status-poll latency while heavy data endpoints are hammered
+
+Starts the API with uvicorn on a throwaway database, loads a synthetic
+dataset, then measures ``GET /api/optimize/status`` latency twice: alone,
+and while ``--clients`` concurrent clients keep requesting the heavy data
+endpoints. A non-blocking server keeps the two p99s close.
+
+    cd backend
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --students 50000 --duration 20 --max-p99-ms 100
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+HEAVY_ENDPOINTS = ['/api/data/enrollments', '/api/data/students', '/api/schedules/latest']
+POLL_ENDPOINT = '/api/optimize/status'
+
+
+def percentiles(latencies: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max in milliseconds"""
+    values = np.asarray(latencies) * 1000
+    return {
+        'requests': len(values),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'p99_ms': float(np.percentile(values, 99)),
+        'max_ms': float(values.max()),
+    }
+
+
+async def poll(client: httpx.AsyncClient, duration: float, interval: float) -> List[float]:
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get(POLL_ENDPOINT)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def hammer(base_url: str, clients: int, duration: float) -> int:
+    deadline = time.perf_counter() + duration
+    
+    async def client_loop(offset: int) -> int:
+        done = 0
+        async with httpx.AsyncClient(base_url=base_url, timeout=120.0) as client:
+            while time.perf_counter() < deadline:
+                response = await client.get(HEAVY_ENDPOINTS[(offset + done) % len(HEAVY_ENDPOINTS)])
+                response.raise_for_status()
+                done += 1
+        return done
+    
+    return sum(await asyncio.gather(*(client_loop(i) for i in range(clients))))
+
+
+def hammer_process(base_url: str, clients: int, duration: float, results: multiprocessing.Queue):
+    """Heavy clients live in their own process so parsing their responses
+    does not delay the status polls being measured"""
+    results.put(asyncio.run(hammer(base_url, clients, duration)))
+
+
+def measure(base_url: str, clients: int, duration: float, interval: float) -> Dict:
+    async def poll_phase() -> List[float]:
+        async with httpx.AsyncClient(base_url=base_url, timeout=120.0) as client:
+            return await poll(client, duration, interval)
+    
+    idle = asyncio.run(poll_phase())
+    
+    warmup = min(1.0, duration / 4)
+    results = multiprocessing.Queue()
+    worker = multiprocessing.Process(
+        target=hammer_process, args=(base_url, clients, duration + warmup, results)
+    )
+    worker.start()
+    time.sleep(warmup)
+    loaded = asyncio.run(poll_phase())
+    heavy_requests = results.get()
+    worker.join()
+    
+    return {
+        'idle': percentiles(idle),
+        'loaded': percentiles(loaded),
+        'heavy_requests': heavy_requests,
+    }
+
+
+def wait_for_server(base_url: str, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("API server exited during startup")
+        try:
+            if httpx.get(f"{base_url}/", timeout=1.0).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("API server did not start")
+
+
+def wait_for_schedule(base_url: str, timeout: float = 600.0):
+    """
+    Wait until the optimization started by ``main`` has saved its schedule
+    Right after the POST the background task may not have set ``running``
+    yet, so the status alone cannot tell a finished run from one not started.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if httpx.get(f"{base_url}/api/schedules/latest").status_code == 200:
+            return
+        status = httpx.get(f"{base_url}{POLL_ENDPOINT}").json()
+        if not status.get('running') and status.get('message', '').startswith('Error'):
+            raise RuntimeError(f"Optimization failed: {status['message']}")
+        time.sleep(0.2)
+    raise RuntimeError("Optimization did not save a schedule")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Status-poll latency under heavy API load")
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--courses', type=int, default=300)
+    parser.add_argument('--clients', type=int, default=4, help="concurrent heavy clients")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds per phase")
+    parser.add_argument('--interval', type=float, default=0.02, help="seconds between status polls")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-p99-ms', type=float, default=None,
+                        help="exit with code 1 when the loaded p99 exceeds this")
+    parser.add_argument('--output', default=None, help="write the results as JSON")
+    args = parser.parse_args(argv)
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ, PYTHONPATH=str(BACKEND_DIR))
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(args.port), '--log-level', 'warning'],
+            cwd=workdir, env=env, stdout=subprocess.DEVNULL
+        )
+        try:
+            wait_for_server(base_url, server)
+            params = {'num_students': args.students, 'num_courses': args.courses,
+                      'num_rooms': max(10, args.courses // 8), 'seed': 0, 'vectorized': True}
+            httpx.post(f"{base_url}/api/generate-data", params=params, timeout=600).raise_for_status()
+            httpx.post(f"{base_url}/api/optimize", json={'population_size': 10, 'generations': 5, 'seed': 0},
+                       timeout=60).raise_for_status()
+            wait_for_schedule(base_url)
+
+            print(f"Measuring {POLL_ENDPOINT} for {args.duration:.0f}s idle, then "
+                  f"{args.duration:.0f}s with {args.clients} clients on {', '.join(HEAVY_ENDPOINTS)}")
+            results = measure(base_url, args.clients, args.duration, args.interval)
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+    for phase in ('idle', 'loaded'):
+        r = results[phase]
+        print(f"{phase:>7}: p50 {r['p50_ms']:7.1f} ms  p95 {r['p95_ms']:7.1f} ms  "
+              f"p99 {r['p99_ms']:7.1f} ms  max {r['max_ms']:7.1f} ms  ({r['requests']} polls)")
+    print(f"Heavy requests served: {results['heavy_requests']}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    if args.max_p99_ms is not None and results['loaded']['p99_ms'] > args.max_p99_ms:
+        print(f"FAIL: loaded p99 above {args.max_p99_ms} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
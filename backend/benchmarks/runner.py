@@ -0,0 +1,291 @@
+"""
+Benchmark runner for SmartExam Scheduler
+Runs every (instance, engine) case in a fresh process so peak RSS is
+attributable to the case, and compares the results against a stored baseline
+"""
+
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict, field
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.decomposition import DecomposedSolver
+from app.exact import ExactSolver, ortools_available
+from app.genetic_algorithm import GeneticAlgorithm
+from app.steady_state import SteadyStateGA
+from benchmarks.instances import (
+    Instance, TIERS, synthetic_instance, load_standard_instance
+)
+
+
+# Engine configurations under test; each maps to GeneticAlgorithm keyword
+# arguments, with an optional 'engine' key selecting a non-default engine
+# class. Add a new entry whenever a new engine mode lands.
+ENGINES: Dict[str, Dict] = {
+    'ga-default': {
+        'population_size': 100, 'crossover_rate': 0.8, 'mutation_rate': 0.2
+    },
+    'ga-small-pop': {
+        'population_size': 30, 'crossover_rate': 0.9, 'mutation_rate': 0.1
+    },
+    'ga-directed': {
+        'population_size': 100, 'crossover_rate': 0.8, 'mutation_rate': 0.2,
+        'mutation_mode': 'directed', 'adaptive_rates': True
+    },
+    'ga-slot': {
+        'population_size': 100, 'crossover_rate': 0.8, 'mutation_rate': 0.2,
+        'encoding': 'slot'
+    },
+    'ga-no-restarts': {
+        'population_size': 100, 'crossover_rate': 0.8, 'mutation_rate': 0.2,
+        'restart_generations': None
+    },
+    'ga-steady': {
+        'engine': 'steady-state', 'workers': None, 'replacement': 'worst',
+        'population_size': 100, 'crossover_rate': 0.8, 'mutation_rate': 0.2
+    },
+    'ga-steady-inline': {
+        'engine': 'steady-state', 'workers': 0, 'replacement': 'worst',
+        'population_size': 100, 'crossover_rate': 0.8, 'mutation_rate': 0.2
+    },
+    'decomposed': {
+        'engine': 'decomposed', 'workers': 4,
+        'population_size': 100, 'crossover_rate': 0.8, 'mutation_rate': 0.2
+    },
+    'exact': {
+        'engine': 'exact', 'hint_generations': 100, 'bounds': True,
+        'population_size': 100, 'crossover_rate': 0.8, 'mutation_rate': 0.2
+    },
+    'decomposed-exact': {
+        'engine': 'decomposed', 'workers': 4, 'cluster_engine': 'exact',
+        'population_size': 100, 'crossover_rate': 0.8, 'mutation_rate': 0.2
+    },
+}
+
+
+def available_engines() -> List[str]:
+    """Engine names whose optional solver dependencies are installed"""
+    return [
+        name for name, params in ENGINES.items()
+        if ortools_available() or 'exact' not in (params.get('engine'), params.get('cluster_engine'))
+    ]
+
+
+# Metrics where a larger value is better; everything else is lower-is-better
+HIGHER_IS_BETTER = {'generations_per_sec', 'evaluations_per_sec'}
+
+RESULTS_DIR = Path(__file__).parent / 'results'
+BASELINE_PATH = Path(__file__).parent / 'baseline.json'
+
+
+@dataclass
+class CaseResult:
+    """Measurements for one engine on one instance"""
+    instance: str
+    engine: str
+    seed: int
+    generations: int
+    evaluations: int
+    wall_time: float
+    generations_per_sec: float
+    evaluations_per_sec: float
+    time_to_feasible: Optional[float]
+    peak_rss_mb: Optional[float]
+    final_fitness: float
+    hard_conflicts: int
+    soft_conflict_score: int
+    extra: Dict = field(default_factory=dict)
+
+    @property
+    def key(self) -> str:
+        return f"{self.instance}/{self.engine}"
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MiB (None on Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _load_instance(spec: str, seed: int) -> Instance:
+    if spec in TIERS:
+        return synthetic_instance(spec, seed=seed)
+    return load_standard_instance(Path(spec))
+
+
+def _evaluations_per_improvement(ga) -> Optional[float]:
+    """Evaluations spent per unit of best-fitness improvement over the run"""
+    history = ga.generation_history
+    if not history:
+        return None
+    gained = history[0]['best_fitness'] - history[-1]['best_fitness']
+    return ga.evaluations / gained if gained > 0 else None
+
+
+def run_case(
+    spec: str,
+    engine: str,
+    generations: int,
+    seed: int,
+    time_limit: Optional[float] = None
+) -> CaseResult:
+    """Run one benchmark case (meant to execute inside a fresh worker process)"""
+    instance = _load_instance(spec, seed)
+    params = dict(ENGINES[engine], time_limit=time_limit)
+    kind = params.pop('engine', 'generational')
+
+    if kind == 'decomposed':
+        ga = DecomposedSolver(instance.problem, generations=generations, seed=seed, **params)
+    elif kind == 'exact':
+        # generations only caps the GA polish after the solve
+        ga = ExactSolver(instance.problem, polish_generations=generations, seed=seed, **params)
+    else:
+        engine_cls = SteadyStateGA if kind == 'steady-state' else GeneticAlgorithm
+        ga = engine_cls.from_problem(
+            instance.problem,
+            generations=generations,
+            seed=seed,
+            **params
+        )
+
+    start = time.perf_counter()
+    feasible_at = []
+
+    def on_generation(stats):
+        if not feasible_at and stats['hard_conflicts'] == 0:
+            feasible_at.append(time.perf_counter() - start)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        best = ga.evolve(callback=on_generation)
+    wall_time = time.perf_counter() - start
+    schedule = ga.get_schedule_dict()
+
+    return CaseResult(
+        instance=instance.name,
+        engine=engine,
+        seed=seed,
+        generations=len(ga.generation_history),
+        evaluations=ga.evaluations,
+        wall_time=wall_time,
+        generations_per_sec=len(ga.generation_history) / wall_time,
+        evaluations_per_sec=ga.evaluations / wall_time,
+        time_to_feasible=feasible_at[0] if feasible_at else None,
+        peak_rss_mb=_peak_rss_mb(),
+        final_fitness=best.fitness,
+        hard_conflicts=best.hard_conflicts,
+        soft_conflict_score=best.soft_conflict_score,
+        extra={
+            'exams': instance.problem.num_exams,
+            'enrollments': instance.problem.num_enrollments,
+            'phase_share': schedule['instrumentation']['summary']['phase_share'],
+            'evaluations_per_improvement': _evaluations_per_improvement(ga),
+            'exact': ga.info if kind == 'exact' else None,
+            'diversity': schedule.get('diversity')
+        },
+    )
+
+
+def run_suite(
+    specs: List[str],
+    engines: List[str],
+    generations: int,
+    seed: int = 0,
+    time_limit: Optional[float] = None
+) -> List[CaseResult]:
+    """
+    Run all cases sequentially, each in its own spawned process
+    With ``time_limit`` every engine gets the same wall-clock budget
+    """
+    results = []
+    ctx = get_context('spawn')
+    for spec in specs:
+        for engine in engines:
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                result = pool.submit(
+                    run_case, spec, engine, generations, seed, time_limit
+                ).result()
+            print(f"{result.key:40s} {result.generations_per_sec:9.2f} gen/s "
+                  f"{result.evaluations_per_sec:11.1f} eval/s "
+                  f"fitness={result.final_fitness:.0f} "
+                  + (f"rss={result.peak_rss_mb:.0f}MiB" if result.peak_rss_mb is not None else "rss=n/a"))
+            results.append(result)
+    return results
+
+
+def environment_info() -> Dict:
+    """Describe the machine and code revision the results came from"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def write_results(results: List[CaseResult], path: Path, imports: Optional[List] = None) -> Path:
+    """Write results (and import-time measurements) as machine-readable JSON"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        'environment': environment_info(),
+        'results': [dict(asdict(r), key=r.key) for r in results],
+        'imports': [dict(asdict(r), key=r.key) for r in imports or []],
+    }
+    path.write_text(json.dumps(payload, indent=2))
+    return path
+
+
+def compare_to_baseline(
+    results: List[CaseResult],
+    baseline_path: Path,
+    tolerance: float = 0.10
+) -> List[str]:
+    """
+    Compare results to a stored baseline
+    Returns one message per metric that moved the wrong way by more than
+    ``tolerance`` (relative)
+    """
+    baseline = {
+        entry['key']: entry
+        for entry in json.loads(baseline_path.read_text())['results']
+    }
+    regressions = []
+    metrics = ['generations_per_sec', 'evaluations_per_sec', 'peak_rss_mb', 'final_fitness']
+
+    for result in results:
+        old = baseline.get(result.key)
+        if old is None:
+            continue
+        for metric in metrics:
+            before, after = old[metric], getattr(result, metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / abs(before)
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            if worse > tolerance:
+                regressions.append(
+                    f"{result.key}: {metric} {before:.2f} -> {after:.2f} ({change:+.1%})"
+                )
+    return regressions
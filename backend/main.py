@@ -3,26 +3,56 @@ FastAPI Backend for SmartExam Scheduler
 Provides REST API endpoints for exam scheduling optimization
 """
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional, Tuple
+from contextlib import asynccontextmanager
 import csv
+from datetime import date
 import io
+import os
 from pathlib import Path
 import shutil
+import time
 
-from app.database import db
+from app.analytics import build_schedule_analytics
+from app.constraints import CONSTRAINT_TYPES, build_constraints
+from app.database import adb, db
 from app.data_generator import DataGenerator
-from app.genetic_algorithm import (
-    GeneticAlgorithm, Exam, Room, TimeSlot
+from app.datasets import load_problem_from_database
+from app.decomposition import DecomposedSolver
+from app.distributed import ManagerBroker
+from app.exact import ExactSolver, ortools_available
+from app.exports import export_timetables
+from app.http_cache import (
+    CachedBody, ResponseCache, cached_response, encode_json, encode_schedule,
+    is_not_modified, not_modified_response, sqlite_timestamp
 )
+from app.genetic_algorithm import GeneticAlgorithm
+from app.schedule_index import ScheduleIndexCache, sort_by_timeslot, timeslot_order
+from app.steady_state import SteadyStateGA
+from app.tuning import successive_halving
+from app.warm_start import build_warm_start
+from app.metrics import (
+    registry, http_request_duration, optimization_jobs, optimization_runs,
+    generations_per_second, evaluations_per_second
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the database when the server starts, not when this module is imported"""
+    await adb.initialize()
+    yield
+    db.close()
+
 
 app = FastAPI(
     title="SmartExam Scheduler API",
     description="Heuristic-based approach to university exam timetabling",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Enable CORS
@@ -35,12 +65,71 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Observe request latency per route template (not per raw path)"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        http_request_duration.observe(
+            time.perf_counter() - start,
+            request.method,
+            route.path if route else "unmatched",
+            status
+        )
+
+
 class OptimizationRequest(BaseModel):
     """Request model for optimization"""
     population_size: int = 100
     generations: int = 1000
     crossover_rate: float = 0.8
     mutation_rate: float = 0.2
+    seed: Optional[int] = None
+    profile: bool = False
+    decompose: bool = False
+    # Decomposition clusters; default one per 40 exams, independent of workers
+    clusters: Optional[int] = Field(None, ge=1)
+    workers: Optional[int] = None
+    mutation_mode: Literal['uniform', 'directed'] = 'uniform'
+    adaptive_rates: bool = False
+    encoding: Literal['direct', 'slot'] = 'direct'
+    engine: Literal['generational', 'steady-state', 'exact'] = 'generational'
+    replacement: Literal['worst', 'tournament'] = 'worst'
+    # Partially restart the population after this many generations without
+    # improvement or once diversity collapses; 0 or null disables restarts
+    restart_generations: Optional[int] = 30
+    # Exact engine: GA generations to hint the solver with, and whether to
+    # also prove separate lower bounds on the hard and soft penalty
+    hint_generations: int = 0
+    bounds: bool = False
+    time_limit: Optional[float] = None
+    distributed: bool = False
+    # Per-constraint weight overrides by name, e.g. {"max_exams_per_day": 40}
+    constraint_weights: Optional[Dict[str, float]] = None
+
+
+class ReoptimizationRequest(OptimizationRequest):
+    """Request model for warm-started re-optimization of a saved schedule"""
+    population_size: int = 30
+    generations: int = 300
+    perturbation_weight: int = 100
+    stall_generations: int = 50
+
+
+class TuningRequest(BaseModel):
+    """Request model for successive-halving parameter tuning"""
+    configurations: int = Field(27, ge=1)
+    min_evaluations: int = Field(1000, ge=1)
+    eta: int = Field(3, ge=2)
+    replicates: int = Field(3, ge=1)
+    workers: Optional[int] = None
+    seed: Optional[int] = None
 
 
 class OptimizationStatus(BaseModel):
@@ -57,6 +146,99 @@ optimization_status = {
     "message": "Ready"
 }
 
+# Parameter tuning runs independently of optimization jobs
+tuning_status = {
+    "running": False,
+    "progress": 0,
+    "message": "Ready",
+    "result": None
+}
+
+# Per-student/per-room lookup indexes of recently used schedules
+schedule_indexes = ScheduleIndexCache(db)
+
+# Serialized schedules and data listings, revalidated with ETags
+response_cache = ResponseCache()
+
+# Remote evaluation broker: SMARTEXAM_BROKER_ADDRESS=PORT listens on 127.0.0.1,
+# HOST:PORT (e.g. 0.0.0.0:50000) on that interface. The broker unpickles what
+# workers send, so it never starts without SMARTEXAM_BROKER_AUTHKEY. Workers
+# join with `python -m app.distributed --connect HOST:PORT --authkey KEY`.
+# A distributed run fails after SMARTEXAM_BROKER_IDLE_TIMEOUT seconds (default
+# 60) without any worker taking its tasks
+BROKER_ADDRESS = os.environ.get("SMARTEXAM_BROKER_ADDRESS")
+BROKER_AUTHKEY = os.environ.get("SMARTEXAM_BROKER_AUTHKEY")
+BROKER_IDLE_TIMEOUT = float(os.environ.get("SMARTEXAM_BROKER_IDLE_TIMEOUT", "60"))
+_broker: Optional[ManagerBroker] = None
+
+
+def broker_address() -> Tuple[str, int]:
+    """(host, port) of SMARTEXAM_BROKER_ADDRESS; loopback unless a host is given"""
+    host, _, port = BROKER_ADDRESS.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def get_broker() -> ManagerBroker:
+    """Start the shared broker on first use"""
+    global _broker
+    if _broker is None:
+        if not BROKER_AUTHKEY:
+            raise RuntimeError("SMARTEXAM_BROKER_AUTHKEY must be set to start the evaluation broker")
+        host, port = broker_address()
+        _broker = ManagerBroker(
+            address=(host, port),
+            authkey=BROKER_AUTHKEY.encode(),
+            idle_timeout=BROKER_IDLE_TIMEOUT
+        )
+        print(f"Evaluation broker listening on {host}:{port}")
+    return _broker
+
+
+def schedule_etag(schedule_id: int) -> str:
+    return f'"schedule-{db.epoch}-{schedule_id}"'
+
+
+def build_schedule_body(schedule_id: int) -> Optional[CachedBody]:
+    """Serialize a stored schedule once; None if it does not exist"""
+    row = db.get_schedule_row(schedule_id)
+    if row is None:
+        return None
+    return CachedBody(
+        encode_schedule(row), schedule_etag(schedule_id), sqlite_timestamp(row['created_at'])
+    )
+
+
+async def schedule_response(request: Request, schedule_id: int) -> Response:
+    """Saved schedules never change, so a matching ETag needs no database query"""
+    entry = response_cache.get(('schedule', schedule_id))
+    if entry is None:
+        etag = schedule_etag(schedule_id)
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+        entry = await adb.run(build_schedule_body, schedule_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Schedule not found")
+        response_cache.put(('schedule', schedule_id), entry)
+    return cached_response(request, entry)
+
+
+async def data_response(request: Request, table: str, query) -> Response:
+    """Listing of a reference table, serialized once per data version"""
+    version, modified = await adb.get_data_version()
+    etag = f'"{table}-{db.epoch}-{version}"'
+    if is_not_modified(request, etag, modified):
+        return not_modified_response(etag, modified)
+    
+    entry = response_cache.get((table, version))
+    if entry is None:
+        def build():
+            rows = query()
+            body = encode_json({"success": True, "data": rows, "count": len(rows)})
+            return CachedBody(body, etag, modified)
+        
+        entry = response_cache.put((table, version), await adb.run(build))
+    return cached_response(request, entry)
+
 
 @app.get("/")
 async def root():
@@ -68,10 +250,19 @@ async def root():
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(
+        registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 @app.get("/api/health")
 async def health_check():
-    """Health check endpoint"""
-    stats = db.get_statistics()
+    """Health check endpoint; reads only the maintained row counts, never the large tables"""
+    stats = await adb.get_statistics()
     return {
         "status": "healthy",
         "database": "connected",
@@ -83,27 +274,40 @@ async def health_check():
 async def generate_synthetic_data(
     num_students: int = 500,
     num_courses: int = 40,
-    num_rooms: int = 10
+    num_rooms: int = 10,
+    seed: Optional[int] = None,
+    vectorized: bool = False
 ):
-    """Generate synthetic test data"""
+    """
+    Generate synthetic test data
+    ``vectorized`` generates cohort-correlated enrollments in bulk and loads
+    them straight into the database, skipping the CSV files
+    """
     try:
         generator = DataGenerator(
             num_students=num_students,
             num_courses=num_courses,
-            num_rooms=num_rooms
+            num_rooms=num_rooms,
+            seed=seed
         )
         
-        data = generator.generate_all("backend/data")
-        
-        # Import into database
-        db.clear_all_data()
-        db.import_csv_data("backend/data")
+        def generate():
+            if vectorized:
+                generator.write_to_database(db)
+            else:
+                generator.generate_all("backend/data")
+                
+                # Import into database
+                db.clear_all_data()
+                db.import_csv_data("backend/data")
+            return db.get_statistics()
         
-        stats = db.get_statistics()
+        stats = await adb.run(generate)
         
         return {
             "success": True,
             "message": "Synthetic data generated successfully",
+            "seed": str(generator.seed),
             "statistics": stats
         }
     except Exception as e:
@@ -116,7 +320,8 @@ async def upload_csv(
     students: UploadFile = File(None),
     rooms: UploadFile = File(None),
     timeslots: UploadFile = File(None),
-    enrollment: UploadFile = File(None)
+    enrollment: UploadFile = File(None),
+    room_unavailability: UploadFile = File(None)
 ):
     """Upload CSV files"""
     try:
@@ -128,7 +333,8 @@ async def upload_csv(
             'students.csv': students,
             'rooms.csv': rooms,
             'timeslots.csv': timeslots,
-            'enrollment.csv': enrollment
+            'enrollment.csv': enrollment,
+            'room_unavailability.csv': room_unavailability
         }
         
         uploaded = []
@@ -141,9 +347,9 @@ async def upload_csv(
         
         # Import into database
         if uploaded:
-            db.import_csv_data("backend/data")
+            await adb.import_csv_data("backend/data")
         
-        stats = db.get_statistics()
+        stats = await adb.get_statistics()
         
         return {
             "success": True,
@@ -156,51 +362,46 @@ async def upload_csv(
 
 
 @app.get("/api/data/courses")
-async def get_courses():
+async def get_courses(request: Request):
     """Get all courses"""
     try:
-        courses = db.get_all_courses()
-        return {"success": True, "data": courses, "count": len(courses)}
+        return await data_response(request, "courses", db.get_all_courses)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/data/students")
-async def get_students():
+async def get_students(request: Request):
     """Get all students"""
     try:
-        students = db.get_all_students()
-        return {"success": True, "data": students, "count": len(students)}
+        return await data_response(request, "students", db.get_all_students)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/data/rooms")
-async def get_rooms():
+async def get_rooms(request: Request):
     """Get all rooms"""
     try:
-        rooms = db.get_all_rooms()
-        return {"success": True, "data": rooms, "count": len(rooms)}
+        return await data_response(request, "rooms", db.get_all_rooms)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/data/timeslots")
-async def get_timeslots():
+async def get_timeslots(request: Request):
     """Get all timeslots"""
     try:
-        timeslots = db.get_all_timeslots()
-        return {"success": True, "data": timeslots, "count": len(timeslots)}
+        return await data_response(request, "timeslots", db.get_all_timeslots)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/data/enrollments")
-async def get_enrollments():
+async def get_enrollments(request: Request):
     """Get all enrollments"""
     try:
-        enrollments = db.get_all_enrollments()
-        return {"success": True, "data": enrollments, "count": len(enrollments)}
+        return await data_response(request, "enrollments", db.get_all_enrollments)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -209,76 +410,125 @@ async def get_enrollments():
 async def get_statistics():
     """Get data statistics"""
     try:
-        stats = db.get_statistics()
+        stats = await adb.get_statistics()
         return {"success": True, "statistics": stats}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-def run_optimization_task(params: OptimizationRequest):
-    """Background task for optimization"""
+def run_optimization_task(params: OptimizationRequest, base_schedule: Optional[dict] = None):
+    """
+    Background task for optimization
+    With ``base_schedule`` the run is warm-started from that saved schedule
+    """
     global optimization_status
     
+    optimization_jobs.dec(1, "queued")
+    optimization_jobs.inc(1, "active")
+    
     try:
         optimization_status["running"] = True
         optimization_status["message"] = "Loading data..."
         optimization_status["progress"] = 0
+        optimization_status["instrumentation"] = None
         
-        # Load data from database
-        courses_data = db.get_all_courses()
-        rooms_data = db.get_all_rooms()
-        timeslots_data = db.get_all_timeslots()
-        
-        # Build Exam objects with enrolled students
-        exams = []
-        for course in courses_data:
-            enrolled = db.get_enrollments_by_course(course['course_id'])
-            exam = Exam(
-                course_id=course['course_id'],
-                course_name=course['course_name'],
-                enrolled_students=enrolled,
-                professor_id=course['professor_id']
-            )
-            exams.append(exam)
-        
-        # Build Room objects
-        rooms = [
-            Room(room_id=r['room_id'], capacity=r['capacity'])
-            for r in rooms_data
-        ]
-        
-        # Build TimeSlot objects
-        timeslots = [
-            TimeSlot(
-                slot_id=t['timeslot_id'],
-                day=t['day'],
-                time=t['time']
-            )
-            for t in timeslots_data
-        ]
+        # Compile the problem straight from the database tables
+        problem = load_problem_from_database(db)
+        problem.constraints = build_constraints(params.constraint_weights)
         
         optimization_status["message"] = "Initializing Genetic Algorithm..."
         optimization_status["progress"] = 10
         
+        warm_start = None
+        extra = {}
+        if base_schedule is not None:
+            warm_start = build_warm_start(problem, base_schedule['schedule_data']['schedule'])
+            extra = {
+                'perturbation_weight': params.perturbation_weight,
+                'stall_generations': params.stall_generations
+            }
+        if params.engine == 'steady-state':
+            extra.update(workers=params.workers, replacement=params.replacement)
+        if params.distributed:
+            extra['broker'] = get_broker()
+        
         # Create and run GA
-        ga = GeneticAlgorithm(
-            exams=exams,
-            rooms=rooms,
-            timeslots=timeslots,
-            population_size=params.population_size,
-            generations=params.generations,
-            crossover_rate=params.crossover_rate,
-            mutation_rate=params.mutation_rate
-        )
+        if params.decompose and base_schedule is None:
+            # Solve conflict-graph clusters in parallel, then merge and repair
+            ga = DecomposedSolver(
+                problem,
+                workers=params.workers,
+                clusters=params.clusters,
+                population_size=params.population_size,
+                generations=params.generations,
+                crossover_rate=params.crossover_rate,
+                mutation_rate=params.mutation_rate,
+                seed=params.seed,
+                mutation_mode=params.mutation_mode,
+                adaptive_rates=params.adaptive_rates,
+                encoding=params.encoding,
+                time_limit=params.time_limit,
+                restart_generations=params.restart_generations,
+                cluster_engine='exact' if params.engine == 'exact' else 'ga'
+            )
+        elif params.engine == 'exact':
+            # CP-SAT, then a GA polish; a saved schedule is used as the hint
+            # and its untouched exams stay fixed
+            ga = ExactSolver(
+                problem,
+                time_limit=params.time_limit,
+                workers=params.workers,
+                seed=params.seed,
+                warm_start=warm_start,
+                hint_generations=params.hint_generations,
+                polish_generations=params.generations,
+                bounds=params.bounds,
+                population_size=params.population_size,
+                crossover_rate=params.crossover_rate,
+                mutation_rate=params.mutation_rate,
+                mutation_mode=params.mutation_mode,
+                adaptive_rates=params.adaptive_rates,
+                encoding=params.encoding,
+                restart_generations=params.restart_generations
+            )
+        else:
+            engine_cls = SteadyStateGA if params.engine == 'steady-state' else GeneticAlgorithm
+            ga = engine_cls.from_problem(
+                problem,
+                population_size=params.population_size,
+                generations=params.generations,
+                crossover_rate=params.crossover_rate,
+                mutation_rate=params.mutation_rate,
+                seed=params.seed,
+                mutation_mode=params.mutation_mode,
+                adaptive_rates=params.adaptive_rates,
+                encoding=params.encoding,
+                time_limit=params.time_limit,
+                restart_generations=params.restart_generations,
+                profile_dir="backend/profiles" if params.profile else None,
+                warm_start=warm_start,
+                **extra
+            )
         
         optimization_status["message"] = "Evolving solutions..."
         
-        # Run optimization with progress callback
+        # Run optimization with progress callback; every engine reports
+        # against its own generation budget (the repair or polish GA for
+        # the decomposed and exact engines)
         def progress_callback(stats):
             gen = stats['generation']
-            total = params.generations
-            optimization_status["progress"] = 10 + (gen / total * 80)
-            optimization_status["message"] = f"Generation {gen}/{total}"
+            if 'bound' in stats:
+                # CP-SAT solutions have no budget to count against
+                optimization_status["message"] = f"Solution {gen + 1} (lower bound {stats['bound']:.0f})"
+            else:
+                total = max(ga.generations, 1)
+                optimization_status["progress"] = 10 + (min(gen, total) / total * 80)
+                optimization_status["message"] = f"Generation {gen}/{total}"
+            if ga.timing_history:
+                timing = ga.timing_history[-1]
+                optimization_status["instrumentation"] = timing
+                generations_per_second.set(1 / timing['seconds'] if timing['seconds'] else 0)
+                evaluations_per_second.set(timing['evaluations_per_sec'])
         
         best_solution = ga.evolve(callback=progress_callback)
         
@@ -287,19 +537,56 @@ def run_optimization_task(params: OptimizationRequest):
         
         # Save to database
         schedule_data = ga.get_schedule_dict()
-        schedule_id = db.save_schedule(
-            f"Schedule_{params.generations}gen",
-            schedule_data
-        )
+        optimization_status["instrumentation"] = schedule_data['instrumentation']['summary']
+        if base_schedule is not None:
+            schedule_data['base_schedule_id'] = base_schedule['id']
+            schedule_name = f"Reoptimized_{base_schedule['id']}"
+        else:
+            schedule_name = f"Schedule_{params.generations}gen"
+        schedule_id = db.save_schedule(schedule_name, schedule_data)
+        schedule_indexes.add(schedule_id, schedule_data)
+        response_cache.put(('schedule', schedule_id), build_schedule_body(schedule_id))
+        db.save_schedule_analytics(schedule_id, build_schedule_analytics(db, schedule_data))
         
         optimization_status["running"] = False
         optimization_status["progress"] = 100
         optimization_status["message"] = "Optimization complete!"
+        optimization_runs.inc(1, "success")
         
     except Exception as e:
         optimization_status["running"] = False
         optimization_status["message"] = f"Error: {str(e)}"
         optimization_status["progress"] = 0
+        optimization_runs.inc(1, "error")
+    
+    finally:
+        optimization_jobs.dec(1, "active")
+        generations_per_second.set(0)
+        evaluations_per_second.set(0)
+
+
+def check_distributed(params: OptimizationRequest):
+    """Reject distributed runs when the broker is not configured"""
+    if params.distributed and not (BROKER_ADDRESS and BROKER_AUTHKEY):
+        raise HTTPException(
+            status_code=400,
+            detail="Distributed evaluation needs SMARTEXAM_BROKER_ADDRESS and SMARTEXAM_BROKER_AUTHKEY to be set."
+        )
+
+
+def check_exact_engine(params: OptimizationRequest):
+    """Reject exact-engine requests the CP-SAT model cannot take"""
+    if not ortools_available():
+        raise HTTPException(
+            status_code=400,
+            detail="The exact engine needs OR-Tools: pip install ortools"
+        )
+    fractional = {name: w for name, w in (params.constraint_weights or {}).items() if w != int(w) or w < 0}
+    if fractional:
+        raise HTTPException(
+            status_code=400,
+            detail=f"The exact engine needs non-negative integer constraint weights: {fractional}"
+        )
 
 
 @app.post("/api/optimize")
@@ -317,15 +604,27 @@ async def optimize_schedule(
         )
     
     # Check if data exists
-    stats = db.get_statistics()
+    stats = await adb.get_statistics()
     if stats['total_courses'] == 0:
         raise HTTPException(
             status_code=400,
             detail="No data available. Please upload or generate data first."
         )
     
+    unknown = set(params.constraint_weights or {}) - set(CONSTRAINT_TYPES)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown constraints: {sorted(unknown)}. Available: {list(CONSTRAINT_TYPES)}"
+        )
+    
+    check_distributed(params)
+    if params.engine == 'exact':
+        check_exact_engine(params)
+    
     # Start optimization in background
     background_tasks.add_task(run_optimization_task, params)
+    optimization_jobs.inc(1, "queued")
     
     return {
         "success": True,
@@ -334,30 +633,138 @@ async def optimize_schedule(
     }
 
 
+@app.post("/api/schedules/{schedule_id}/reoptimize")
+async def reoptimize_schedule(
+    schedule_id: int,
+    params: ReoptimizationRequest,
+    background_tasks: BackgroundTasks
+):
+    """
+    Re-optimize a saved schedule after data changes
+    Only exams touched by the change are moved; the result is saved as a new schedule
+    """
+    if optimization_status["running"]:
+        raise HTTPException(
+            status_code=400,
+            detail="Optimization is already running"
+        )
+    
+    base_schedule = await adb.get_schedule_by_id(schedule_id)
+    if not base_schedule:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    
+    check_distributed(params)
+    if params.engine == 'exact':
+        check_exact_engine(params)
+    
+    background_tasks.add_task(run_optimization_task, params, base_schedule)
+    optimization_jobs.inc(1, "queued")
+    
+    return {
+        "success": True,
+        "message": f"Re-optimization of schedule {schedule_id} started",
+        "status": "running"
+    }
+
+
 @app.get("/api/optimize/status")
 async def get_optimization_status():
     """Get current optimization status"""
     return optimization_status
 
 
+def run_tuning_task(params: TuningRequest):
+    """Background task for parameter tuning on the current dataset"""
+    
+    try:
+        tuning_status["running"] = True
+        tuning_status["message"] = "Loading data..."
+        tuning_status["progress"] = 0
+        tuning_status["result"] = None
+        
+        problem = load_problem_from_database(db)
+        
+        def progress_callback(stats):
+            tuning_status["progress"] = int(stats['progress'] * 100)
+            tuning_status["message"] = (
+                f"Rung {stats['rung']}: {stats['completed']}/{stats['total']} trials "
+                f"({stats['budget']} evaluations each)"
+            )
+        
+        tuning_status["message"] = "Racing configurations..."
+        tuning_status["result"] = successive_halving(
+            problem,
+            configurations=params.configurations,
+            min_evaluations=params.min_evaluations,
+            eta=params.eta,
+            replicates=params.replicates,
+            workers=params.workers,
+            seed=params.seed,
+            callback=progress_callback
+        )
+        
+        tuning_status["running"] = False
+        tuning_status["progress"] = 100
+        tuning_status["message"] = "Tuning complete!"
+        
+    except Exception as e:
+        tuning_status["running"] = False
+        tuning_status["message"] = f"Error: {str(e)}"
+        tuning_status["progress"] = 0
+
+
+@app.post("/api/tune")
+async def tune_parameters(
+    params: TuningRequest,
+    background_tasks: BackgroundTasks
+):
+    """Start successive-halving tuning of the GA parameters"""
+    if tuning_status["running"]:
+        raise HTTPException(
+            status_code=400,
+            detail="Tuning is already running"
+        )
+    
+    stats = await adb.get_statistics()
+    if stats['total_courses'] == 0:
+        raise HTTPException(
+            status_code=400,
+            detail="No data available. Please upload or generate data first."
+        )
+    
+    background_tasks.add_task(run_tuning_task, params)
+    
+    return {
+        "success": True,
+        "message": "Tuning started",
+        "status": "running"
+    }
+
+
+@app.get("/api/tune/status")
+async def get_tuning_status():
+    """Get tuning progress and, once finished, the winning configuration"""
+    return tuning_status
+
+
 @app.get("/api/schedules")
 async def get_all_schedules():
     """Get all saved schedules"""
     try:
-        schedules = db.get_all_schedules()
+        schedules = await adb.get_all_schedules()
         return {"success": True, "schedules": schedules, "count": len(schedules)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/schedules/latest")
-async def get_latest_schedule():
+async def get_latest_schedule(request: Request):
     """Get the most recent schedule"""
     try:
-        schedule = db.get_latest_schedule()
-        if not schedule:
+        schedule_id = await adb.get_latest_schedule_id()
+        if schedule_id is None:
             raise HTTPException(status_code=404, detail="No schedules found")
-        return {"success": True, "schedule": schedule}
+        return await schedule_response(request, schedule_id)
     except HTTPException:
         raise
     except Exception as e:
@@ -365,19 +772,105 @@ async def get_latest_schedule():
 
 
 @app.get("/api/schedules/{schedule_id}")
-async def get_schedule(schedule_id: int):
+async def get_schedule(request: Request, schedule_id: int):
     """Get a specific schedule by ID"""
     try:
-        schedule = db.get_schedule_by_id(schedule_id)
-        if not schedule:
-            raise HTTPException(status_code=404, detail="Schedule not found")
-        return {"success": True, "schedule": schedule}
+        return await schedule_response(request, schedule_id)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def get_schedule_index(schedule_id: int):
+    """Cached lookup index of a schedule, or 404"""
+    index = await adb.run(schedule_indexes.get, schedule_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    return index
+
+
+@app.get("/api/schedules/{schedule_id}/students/{student_id}")
+async def get_student_timetable(schedule_id: int, student_id: str):
+    """Exams of one student in a schedule, in timeslot order"""
+    exams = (await get_schedule_index(schedule_id)).student(student_id)
+    if exams is None:
+        raise HTTPException(status_code=404, detail=f"Student {student_id} has no exams in this schedule")
+    return {"success": True, "student_id": student_id, "exams": exams, "count": len(exams)}
+
+
+@app.get("/api/schedules/{schedule_id}/rooms/{room_id}")
+async def get_room_timetable(schedule_id: int, room_id: str):
+    """Exams held in one room in a schedule, in timeslot order"""
+    exams = (await get_schedule_index(schedule_id)).room(room_id)
+    if exams is None:
+        raise HTTPException(status_code=404, detail=f"Room {room_id} is not used in this schedule")
+    return {"success": True, "room_id": room_id, "exams": exams, "count": len(exams)}
+
+
+
+@app.get("/api/schedules/{schedule_id}/analytics")
+async def get_schedule_analytics(schedule_id: int):
+    """
+    Precomputed dashboard aggregates of a schedule
+    Stored as JSON when the schedule is saved and served without decoding;
+    schedules saved before analytics existed are aggregated on first request
+    """
+    analytics = await adb.get_schedule_analytics(schedule_id)
+    if analytics is None:
+        schedule = await adb.get_schedule_by_id(schedule_id)
+        if not schedule:
+            raise HTTPException(status_code=404, detail="Schedule not found")
+        analytics = await adb.run(
+            lambda: db.save_schedule_analytics(
+                schedule_id, build_schedule_analytics(db, schedule['schedule_data'])
+            )
+        )
+    body = f'{{"success": true, "schedule_id": {schedule_id}, "analytics": {analytics}}}'
+    return Response(content=body, media_type="application/json")
+
+
+@app.get("/api/schedules/{schedule_id}/export")
+async def export_schedule_timetables(
+    schedule_id: int,
+    audience: Literal['students', 'professors'] = 'students',
+    format: Literal['csv', 'zip'] = 'csv',
+    file_format: Literal['csv', 'ics'] = 'csv',
+    start_date: Optional[date] = None
+):
+    """
+    Stream every student's or professor's personal timetable
+    ``csv`` is one file with a row per person and exam; ``zip`` holds one
+    CSV or iCalendar file per person. ``start_date`` anchors the .ics dates
+    (first exam day, default today). Only the schedule entries are held in
+    memory; enrollments stream from their own cursor on one export thread.
+    """
+    schedule = await adb.get_schedule_by_id(schedule_id)
+    if not schedule:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    timeslots = await adb.get_all_timeslots()
+    entries = sort_by_timeslot(schedule['schedule_data'].get('schedule', []), timeslot_order(timeslots))
+    
+    def chunks():
+        enrollments = db.iter_enrollments_by_student() if audience == 'students' else None
+        return export_timetables(
+            schedule_id, entries, audience, format, file_format,
+            enrollments=enrollments,
+            start_date=start_date,
+            days=[t['day'] for t in timeslots]
+        )
+    
+    if format == 'zip':
+        media_type, filename = "application/zip", f"schedule_{schedule_id}_{audience}_{file_format}.zip"
+    else:
+        media_type, filename = "text/csv", f"schedule_{schedule_id}_{audience}.csv"
+    return StreamingResponse(
+        adb.iterate(chunks),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
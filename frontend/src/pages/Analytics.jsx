@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { BarChart3, TrendingDown } from 'lucide-react';
-import { getLatestSchedule } from '../services/api';
+import { getAllSchedules, getScheduleAnalytics } from '../services/api';
 import {
   LineChart,
   Line,
@@ -15,7 +15,7 @@ import {
 } from 'recharts';
 
 const Analytics = () => {
-  const [schedule, setSchedule] = useState(null);
+  const [analytics, setAnalytics] = useState(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
@@ -24,8 +24,13 @@ const Analytics = () => {
 
   const loadSchedule = async () => {
     try {
-      const response = await getLatestSchedule();
-      setSchedule(response.data.schedule);
+      // Only the latest schedule's precomputed aggregates, not the full schedule
+      const schedules = await getAllSchedules();
+      const latest = schedules.data.schedules[0];
+      if (latest) {
+        const response = await getScheduleAnalytics(latest.id);
+        setAnalytics(response.data.analytics);
+      }
     } catch (error) {
       console.error('Error loading schedule:', error);
     } finally {
@@ -41,7 +46,7 @@ const Analytics = () => {
     );
   }
 
-  if (!schedule) {
+  if (!analytics) {
     return (
       <div className="text-center py-12">
         <BarChart3 className="w-16 h-16 text-gray-300 mx-auto mb-4" />
@@ -51,8 +56,8 @@ const Analytics = () => {
     );
   }
 
-  const scheduleData = schedule.schedule_data || {};
-  const history = scheduleData.history || [];
+  const history = analytics.convergence || [];
+  const summary = analytics.summary || {};
 
   return (
     <div className="fade-in max-w-7xl">
@@ -142,33 +147,49 @@ const Analytics = () => {
         </div>
       </div>
 
+      {/* Room Utilization */}
+      <div className="mt-6 bg-white rounded-xl shadow-lg p-6 border border-gray-200">
+        <h2 className="text-xl font-bold text-gray-900 mb-6">Room Utilization</h2>
+        <ResponsiveContainer width="100%" height={300}>
+          <BarChart data={analytics.rooms || []}>
+            <CartesianGrid strokeDasharray="3 3" />
+            <XAxis dataKey="room_id" />
+            <YAxis domain={[0, 1]} />
+            <Tooltip />
+            <Legend />
+            <Bar dataKey="mean_seat_utilization" fill="#3b82f6" name="Seat Utilization" />
+            <Bar dataKey="slot_occupancy" fill="#8b5cf6" name="Slot Occupancy" />
+          </BarChart>
+        </ResponsiveContainer>
+      </div>
+
       {/* Statistics */}
       <div className="mt-6 bg-gradient-to-r from-blue-50 to-purple-50 rounded-xl p-6 border border-blue-200">
         <h3 className="text-lg font-bold text-gray-900 mb-4">Optimization Summary</h3>
         <div className="grid grid-cols-2 md:grid-cols-4 gap-4">
           <div>
             <p className="text-sm text-gray-600">Total Generations</p>
-            <p className="text-2xl font-bold text-gray-900">{history.length}</p>
+            <p className="text-2xl font-bold text-gray-900">{summary.generations}</p>
           </div>
           <div>
             <p className="text-sm text-gray-600">Initial Fitness</p>
             <p className="text-2xl font-bold text-gray-900">
-              {history[0]?.best_fitness?.toFixed(2) || 'N/A'}
+              {summary.initial_fitness?.toFixed(2) || 'N/A'}
             </p>
           </div>
           <div>
             <p className="text-sm text-gray-600">Final Fitness</p>
             <p className="text-2xl font-bold text-gray-900">
-              {history[history.length - 1]?.best_fitness?.toFixed(2) || 'N/A'}
+              {summary.final_fitness?.toFixed(2) || 'N/A'}
             </p>
           </div>
           <div>
             <p className="text-sm text-gray-600">Improvement</p>
             <p className="text-2xl font-bold text-green-600">
-              {history.length > 0
+              {summary.generations > 0
                 ? (
-                    ((history[0]?.best_fitness - history[history.length - 1]?.best_fitness) /
-                      history[0]?.best_fitness) *
+                    ((summary.initial_fitness - summary.final_fitness) /
+                      summary.initial_fitness) *
                     100
                   ).toFixed(1)
                 : 0}
@@ -40,5 +40,6 @@ export const getOptimizationStatus = () =>
 export const getAllSchedules = () => api.get('/api/schedules');
 export const getLatestSchedule = () => api.get('/api/schedules/latest');
 export const getScheduleById = (id) => api.get(`/api/schedules/${id}`);
+export const getScheduleAnalytics = (id) => api.get(`/api/schedules/${id}/analytics`);
 
 export default api;